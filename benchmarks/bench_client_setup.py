@@ -0,0 +1,129 @@
+"""
+Measure the client setup latency saved by the shared client factory.
+
+Creates Storage and BigQuery clients and the Drive service the way tasks
+did before (a new client per call) and through scripts.gcp_clients (one
+client per process), and reports the time per call of both. Anonymous
+credentials are used unless --adc is given, so nothing is sent to Google.
+The "http" case sends requests to a local keep-alive server with a new
+session per request versus the shared pooled session, which shows the
+connection setup that reuse avoids (TLS handshakes against Google APIs
+add to it).
+
+Usage:
+    python benchmarks/bench_client_setup.py --calls 50
+    python benchmarks/bench_client_setup.py --calls 50 --adc  # include application default credentials lookup
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+import google.auth
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+from google.cloud import storage
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'dags'))
+
+from scripts import gcp_clients
+
+PROJECT_ID = "benchmark-project"
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def time_calls(create: Callable[[], Any], calls: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    create()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls - 1):
+        create()
+    rest = time.perf_counter() - start
+    return {
+        "first_ms": round(first * 1000, 3),
+        "per_call_ms": round((first + rest) / calls * 1000, 3)
+    }
+
+def benchmark(calls: int, adc: bool = False) -> Dict[str, Any]:
+    """
+    Time client creation per call, uncached and through the factory.
+
+    Args:
+        calls: Clients requested per kind
+        adc: Resolve application default credentials, as tasks do, instead
+            of using anonymous credentials
+
+    Returns:
+        Dict[str, Any]: Timings per client kind and the factory statistics
+    """
+    credentials = AnonymousCredentials()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    shared_session = gcp_clients.pooled_session(credentials)
+    cases = {
+        "storage": (
+            lambda: storage.Client(project=PROJECT_ID, credentials=credentials),
+            lambda: gcp_clients.get_storage_client(PROJECT_ID, credentials)
+        ) if not adc else (
+            lambda: storage.Client(project=PROJECT_ID, credentials=google.auth.default()[0]),
+            lambda: gcp_clients.get_storage_client(PROJECT_ID)
+        ),
+        "bigquery": (
+            lambda: bigquery.Client(project=PROJECT_ID, credentials=credentials),
+            lambda: gcp_clients.get_bigquery_client(PROJECT_ID, credentials)
+        ) if not adc else (
+            lambda: bigquery.Client(project=PROJECT_ID, credentials=google.auth.default()[0]),
+            lambda: gcp_clients.get_bigquery_client(PROJECT_ID)
+        ),
+        "drive": (
+            lambda: build("drive", "v3", credentials=credentials, static_discovery=True, cache_discovery=False),
+            lambda: gcp_clients.get_drive_service(credentials)
+        ),
+        "http": (
+            lambda: gcp_clients.pooled_session(credentials).get(url).content,
+            lambda: shared_session.get(url).content
+        )
+    }
+    results = {}
+    for name, (uncached, factory) in cases.items():
+        before = time_calls(uncached, calls)
+        after = time_calls(factory, calls)
+        results[name] = {
+            "uncached": before,
+            "factory": after,
+            "saved_per_call_ms": round(before["per_call_ms"] - after["per_call_ms"], 3)
+        }
+    server.shutdown()
+    return {
+        "benchmark": "client_setup",
+        "calls": calls,
+        "results": results,
+        "factory_stats": gcp_clients.client_stats()
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--adc", action="store_true", help="Use application default credentials")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.calls, args.adc), indent=2))
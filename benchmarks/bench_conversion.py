@@ -0,0 +1,257 @@
+"""
+Benchmark the staging conversion paths against a local GCS stand-in.
+
+Generates synthetic aws_data_desafio.csv and lista_precios.json inputs, runs
+convert_to_parquet for each file with the in-memory pandas path
+(read_file_data + save_as_parquet) and the streaming path, each in its own
+process, and reports rows/sec, peak RSS and Parquet size. The data quality
+profile is computed during conversion as in process_file, and the paths
+must agree on the converted data and the DQ results. The Hive layout
+writes through pyarrow's GCS filesystem and is not covered.
+
+Results are written as JSON with the git commit and library versions, so
+runs can be compared; with --baseline the run is compared against an
+earlier result file and regressions beyond --tolerance fail the command.
+
+Usage:
+    python benchmarks/bench_conversion.py --rows 1000000 10000000
+    python benchmarks/bench_conversion.py --rows 1000000 --baseline benchmarks/results/conversion-abc1234.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'dags'))
+
+from local_gcs import LocalStorageClient
+from synthetic_data import generate_billing_csv, generate_prices_file
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+TABLE_NAMES = {"aws_data_desafio.csv": "stage_aws_billing", "lista_precios.json": "stage_aws_prices"}
+PATHS = ["pandas", "streaming"]
+PRICES_ROWS_RATIO = 0.01  # Price list SKUs per billing row
+
+def _convert(root: str, file_name: str, path: str, results) -> None:
+    import pyarrow.parquet as pq
+    from scripts import aws_billing_raw_to_stage as stage
+    from scripts.dq_rules import DQ_RULES, DQProfile
+
+    file_config = dict(next(f for f in stage.FILES if f["name"] == file_name))
+    file_config["streaming"] = path == "streaming"
+    base_name = file_name.split(".")[0]
+    client = LocalStorageClient(root)
+    parquet_path = f"{base_name}/bench/{path}.parquet"
+
+    profile = DQProfile(DQ_RULES.get(TABLE_NAMES[file_name], []))
+    start = time.perf_counter()
+    stage.convert_to_parquet(
+        client,
+        file_config,
+        f"{base_name}/bench/{file_name}",
+        client.bucket(stage.STAGE_BUCKET_NAME),
+        parquet_path,
+        profile=profile
+    )
+    elapsed = time.perf_counter() - start
+
+    output = client.bucket(stage.STAGE_BUCKET_NAME).blob(parquet_path).path
+    rows = pq.ParquetFile(output).metadata.num_rows
+    results.put({
+        "file": file_name,
+        "path": path,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "output_mb": round(os.path.getsize(output) / 1024 / 1024, 2),
+        "output": output,
+        "dq_results": profile.results()
+    })
+
+def check_equivalent(file_name: str, outputs: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Check that every conversion path produced the same data and DQ results.
+
+    The schemas must be equal. Dictionary-encoded columns are compared by
+    value, as the paths build their dictionaries in a different order, and
+    floats up to rounding, since pandas parses JSON numbers with a faster,
+    less precise routine.
+
+    Args:
+        file_name: Converted file
+        outputs: Result of _convert by conversion path
+
+    Raises:
+        AssertionError: If two paths disagree
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    (first, expected), *others = outputs.items()
+    expected_table = pq.read_table(expected["output"])
+    for path, result in others:
+        table = pq.read_table(result["output"])
+        assert table.schema == expected_table.schema, f"{file_name}: {path} schema differs from {first}"
+        assert table.num_rows == expected_table.num_rows, f"{file_name}: {path} row count differs from {first}"
+        assert result["dq_results"] == expected["dq_results"], f"{file_name}: {path} DQ results differ from {first}"
+        for name in table.column_names:
+            column, expected_column = table.column(name), expected_table.column(name)
+            if pa.types.is_dictionary(column.type):
+                column, expected_column = column.cast(pa.string()), expected_column.cast(pa.string())
+            assert column.null_count == expected_column.null_count, \
+                f"{file_name}: {path} nulls of {name} differ from {first}"
+            if pa.types.is_floating(column.type):
+                same = np.allclose(column.to_numpy(), expected_column.to_numpy(), rtol=1e-12, atol=0, equal_nan=True)
+            else:
+                same = column.equals(expected_column)
+            assert same, f"{file_name}: {path} values of {name} differ from {first}"
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def environment() -> Dict[str, Any]:
+    import pandas as pd
+    import pyarrow as pa
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__
+    }
+
+def benchmark(row_counts: List[int], paths: List[str], repeat: int = 1) -> Dict[str, Any]:
+    """
+    Run every conversion path on inputs of each size.
+
+    Each conversion runs ``repeat`` times in a fresh process; the fastest
+    run is kept, with the highest peak RSS seen.
+
+    Args:
+        row_counts: Billing row counts to benchmark
+        paths: Conversion paths to run ("pandas", "streaming")
+        repeat: Runs per conversion
+
+    Returns:
+        Dict[str, Any]: Run metadata and one result entry per file, path and size
+    """
+    from scripts.aws_billing_raw_to_stage import RAW_BUCKET_NAME
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as root:
+            raw = LocalStorageClient(root).bucket(RAW_BUCKET_NAME)
+            inputs = {
+                "aws_data_desafio.csv": lambda p: generate_billing_csv(p, rows),
+                "lista_precios.json": lambda p: generate_prices_file(p, max(1, int(rows * PRICES_ROWS_RATIO)))
+            }
+            for file_name, generate in inputs.items():
+                source = raw.blob(f"{file_name.split('.')[0]}/bench/{file_name}").path
+                os.makedirs(os.path.dirname(source), exist_ok=True)
+                generate(source)
+                input_mb = round(os.path.getsize(source) / 1024 / 1024, 1)
+                outputs = {}
+                for path in paths:
+                    runs = []
+                    for _ in range(repeat):
+                        queue = ctx.Queue()
+                        proc = ctx.Process(target=_convert, args=(root, file_name, path, queue))
+                        proc.start()
+                        proc.join()
+                        if proc.exitcode != 0:
+                            raise RuntimeError(f"{path} conversion of {file_name} failed with exit code {proc.exitcode}")
+                        runs.append(queue.get())
+                    result = min(runs, key=lambda run: run["seconds"])
+                    outputs[path] = {key: result.pop(key) for key in ("output", "dq_results")}
+                    result["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+                    result["input_mb"] = input_mb
+                    result["repeat"] = repeat
+                    results.append(result)
+                    print(json.dumps(result), file=sys.stderr)
+                check_equivalent(file_name, outputs)
+    return {
+        "benchmark": "conversion",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "environment": environment(),
+        "results": results
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare a run against a baseline run.
+
+    Args:
+        current: Result of benchmark()
+        baseline: Earlier result of benchmark()
+        tolerance: Relative slowdown or memory growth reported as a regression
+
+    Returns:
+        List[Dict[str, Any]]: One entry per result present in both runs, with
+            throughput and peak RSS ratios and a regression flag
+    """
+    key = lambda result: (result["file"], result["path"], result["rows"])
+    previous = {key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if not before:
+            continue
+        speed = result["rows_per_sec"] / before["rows_per_sec"] if before["rows_per_sec"] else None
+        memory = result["peak_rss_mb"] / before["peak_rss_mb"] if before["peak_rss_mb"] else None
+        comparison.append({
+            "file": result["file"],
+            "path": result["path"],
+            "rows": result["rows"],
+            "rows_per_sec_ratio": round(speed, 3) if speed else None,
+            "peak_rss_ratio": round(memory, 3) if memory else None,
+            "regression": bool(
+                (speed and speed < 1 - tolerance) or (memory and memory > 1 + tolerance)
+            )
+        })
+    return comparison
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per conversion, the fastest is kept")
+    parser.add_argument("--output", help="Result file, under benchmarks/results/ by default")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = benchmark(args.rows, args.paths, args.repeat)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"conversion-{report['git_commit'] or 'nogit'}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+    if any(entry["regression"] for entry in report.get("comparison", [])):
+        sys.exit(1)
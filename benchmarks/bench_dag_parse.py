@@ -0,0 +1,134 @@
+"""
+Check the parse-time cost of the third_party_data_pipeline DAG file.
+
+Imports the DAG file in a fresh interpreter, as the scheduler's DAG file
+processor does, after importing the Airflow modules every DAG file needs
+(they are already loaded in the processor). It reports the import time of
+the file, the modules it pulled in and the Airflow Variables it read, and
+fails when:
+    - a heavy library (pandas, pyarrow, Google clients, ...) is imported,
+    - a Variable is read at parse time,
+    - the median import time or the number of new modules is over budget.
+
+Usage:
+    python benchmarks/bench_dag_parse.py --runs 5 --budget-seconds 0.3 --max-modules 60
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+DAG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags", "third_party_data_pipeline.py")
+
+# Libraries that must only be imported inside task callables
+FORBIDDEN_MODULES = [
+    "pandas",
+    "pyarrow",
+    "duckdb",
+    "google.cloud.storage",
+    "google.cloud.bigquery",
+    "googleapiclient",
+    "httplib2",
+    "airflow.providers.google"
+]
+
+# Runs in the child interpreter: prints the measurements of one import as JSON
+PROBE = """
+import importlib.util, json, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[1])))  # The DAG folder, as Airflow sets it
+import airflow
+from airflow import DAG
+from airflow.models import Variable
+from airflow.operators.python import PythonOperator
+from airflow.utils.task_group import TaskGroup
+
+reads = []
+original_get = Variable.get
+def counting_get(key, *args, **kwargs):
+    reads.append(key)
+    return original_get(key, *args, **kwargs)
+Variable.get = counting_get
+
+before = set(sys.modules)
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("parse_probe_dag", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "new_modules": sorted(set(sys.modules) - before),
+    "variable_reads": reads,
+    "tasks": len(module.dag.tasks)
+}))
+"""
+
+def probe(dag_file: str) -> Dict[str, Any]:
+    completed = subprocess.run([sys.executable, "-c", PROBE, dag_file], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {dag_file} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def forbidden(modules: List[str]) -> List[str]:
+    return sorted(
+        module for module in modules
+        if any(module == name or module.startswith(f"{name}.") for name in FORBIDDEN_MODULES)
+    )
+
+def check(dag_file: str, runs: int, budget_seconds: float, max_modules: int) -> Dict[str, Any]:
+    """
+    Import the DAG file ``runs`` times and compare against the budgets.
+
+    Args:
+        dag_file: Path of the DAG file
+        runs: Fresh interpreters to import the file in
+        budget_seconds: Maximum median import time
+        max_modules: Maximum number of modules first imported by the file
+
+    Returns:
+        Dict[str, Any]: Measurements and the list of budget violations
+    """
+    results = [probe(dag_file) for _ in range(runs)]
+    median = statistics.median(result["seconds"] for result in results)
+    new_modules = results[-1]["new_modules"]
+    heavy = forbidden(new_modules)
+    variable_reads = results[-1]["variable_reads"]
+
+    violations = []
+    if heavy:
+        violations.append(f"heavy modules imported at parse time: {', '.join(heavy)}")
+    if variable_reads:
+        violations.append(f"Variables read at parse time: {', '.join(variable_reads)}")
+    if median > budget_seconds:
+        violations.append(f"median import time {median:.3f}s over the budget of {budget_seconds}s")
+    if len(new_modules) > max_modules:
+        violations.append(f"{len(new_modules)} modules imported, over the budget of {max_modules}")
+    return {
+        "benchmark": "dag_parse",
+        "dag_file": os.path.relpath(dag_file),
+        "runs": runs,
+        "median_seconds": round(median, 4),
+        "max_seconds": round(max(result["seconds"] for result in results), 4),
+        "tasks": results[-1]["tasks"],
+        "new_module_count": len(new_modules),
+        "new_modules": new_modules,
+        "variable_reads": variable_reads,
+        "violations": violations
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dag-file", default=DAG_FILE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, default=0.3)
+    parser.add_argument("--max-modules", type=int, default=60)
+    args = parser.parse_args()
+
+    report = check(args.dag_file, args.runs, args.budget_seconds, args.max_modules)
+    print(json.dumps(report, indent=2))
+    if report["violations"]:
+        print("\n".join(report["violations"]), file=sys.stderr)
+        sys.exit(1)
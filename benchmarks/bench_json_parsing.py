@@ -0,0 +1,110 @@
+"""
+Compare the pandas and incremental parsing paths for lista_precios.json.
+
+Each path runs in its own process so that peak RSS is measured in isolation.
+
+Usage:
+    python benchmarks/bench_json_parsing.py --rows 500000 --format array
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'dags'))
+
+from synthetic_data import generate_prices_file
+
+def run_pandas(source: str, target: str, fmt: str) -> int:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = pd.read_json(source, lines=fmt == "ndjson")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, target, compression="snappy")
+    return table.num_rows
+
+def write_incremental(source: str, target: str, schema=None) -> int:
+    import pyarrow.parquet as pq
+    from scripts.json_stream import iter_inferred_batches, iter_json_records, iter_record_batches
+
+    rows = 0
+    writer = None
+    with open(source, "rb") as f:
+        records = iter_json_records(f)
+        batches = iter_inferred_batches(records) if schema is None else iter_record_batches(records, schema)
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pq.ParquetWriter(target, batch.schema, compression="snappy")
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows
+
+def run_incremental(source: str, target: str, fmt: str) -> int:
+    from scripts.json_stream import JSONSchemaWidened
+
+    # As stream_json_to_parquet does: one pass with the schema of the first
+    # batch, a second one only if later records widen it
+    try:
+        return write_incremental(source, target)
+    except JSONSchemaWidened as widened:
+        return write_incremental(source, target, widened.schema)
+
+def _measure(name: str, source: str, target: str, fmt: str, results) -> None:
+    runner = {"pandas": run_pandas, "incremental": run_incremental}[name]
+    start = time.perf_counter()
+    rows = runner(source, target, fmt)
+    elapsed = time.perf_counter() - start
+    results.put({
+        "path": name,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    })
+
+def benchmark(rows: int, fmt: str) -> Dict[str, Any]:
+    """
+    Run both parsing paths against the same synthetic file.
+
+    Args:
+        rows: Number of SKUs in the synthetic file
+        fmt: "array" or "ndjson"
+
+    Returns:
+        Dict[str, Any]: Input size and one result entry per path
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "lista_precios.json")
+        generate_prices_file(source, rows, fmt=fmt)
+        results = []
+        for name in ("pandas", "incremental"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(name, source, os.path.join(tmp, f"{name}.parquet"), fmt, queue))
+            proc.start()
+            results.append(queue.get())
+            proc.join()
+        return {
+            "benchmark": "json_parsing",
+            "format": fmt,
+            "input_mb": round(os.path.getsize(source) / 1024 / 1024, 1),
+            "results": results
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--format", choices=["array", "ndjson"], default="array")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rows, args.format), indent=2))
@@ -0,0 +1,86 @@
+"""
+Measure the memory and file-size effect of dictionary typing on a billing file.
+
+Reads a synthetic aws_data_desafio.csv with and without the
+dictionary_columns of FILES and reports pandas memory, Arrow memory and
+Parquet size for both.
+
+Usage:
+    python benchmarks/bench_parquet_encoding.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'dags'))
+
+from scripts.aws_billing_raw_to_stage import (
+    DICTIONARY_TYPE,
+    FILES,
+    PARQUET_ROW_GROUP_SIZE,
+    PARQUET_WRITE_OPTIONS
+)
+from synthetic_data import generate_billing_csv
+
+def measure(path: str, dictionary_columns) -> Dict[str, Any]:
+    df = pd.read_csv(path, dtype={"account_id": str, **{col: "category" for col in dictionary_columns}})
+    df["start_date"] = pd.to_datetime(df["start_date"], format='%Y-%m-%d', errors='coerce')
+    fields = []
+    for col, dtype in df.dtypes.items():
+        if col == "start_date":
+            fields.append(pa.field(col, pa.date32()))
+        elif isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(col, DICTIONARY_TYPE))
+        elif pd.api.types.is_float_dtype(dtype):
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    table = pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+    parquet_path = f"{path}.{'dict' if dictionary_columns else 'plain'}.parquet"
+    if dictionary_columns:
+        pq.write_table(table, parquet_path, row_group_size=PARQUET_ROW_GROUP_SIZE, **PARQUET_WRITE_OPTIONS)
+    else:
+        pq.write_table(table, parquet_path, compression="snappy")
+    return {
+        "pandas_mb": round(df.memory_usage(deep=True).sum() / 1024 / 1024, 1),
+        "arrow_mb": round(table.nbytes / 1024 / 1024, 1),
+        "parquet_mb": round(os.path.getsize(parquet_path) / 1024 / 1024, 2)
+    }
+
+def benchmark(rows: int) -> Dict[str, Any]:
+    """
+    Compare plain string typing against the dictionary typing layer.
+
+    Args:
+        rows: Number of synthetic billing rows
+
+    Returns:
+        Dict[str, Any]: Measurements for both typings and the reduction ratios
+    """
+    dictionary_columns = next(f for f in FILES if f["name"] == "aws_data_desafio.csv")["dictionary_columns"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "aws_data_desafio.csv")
+        generate_billing_csv(path, rows)
+        plain = measure(path, [])
+        compact = measure(path, dictionary_columns)
+    return {
+        "benchmark": "parquet_encoding",
+        "rows": rows,
+        "plain": plain,
+        "dictionary": compact,
+        "reduction": {key: round(1 - compact[key] / plain[key], 3) for key in plain if plain[key]}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rows), indent=2))
@@ -0,0 +1,177 @@
+"""
+Local filesystem stand-in for the google.cloud.storage objects the staging
+code uses, so conversion paths can be benchmarked without GCS.
+
+Buckets are directories under a root and blobs are files inside them. Only
+the calls made by the conversion code and the tests are implemented.
+"""
+import base64
+import io
+import os
+import shutil
+import threading
+from typing import IO, List, Optional
+
+import google_crc32c
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+class LocalBlobWriter(io.BufferedWriter):
+    """
+    Writes a blob the way a resumable upload does: the object only appears
+    once the writer is closed, and leaving the writer's context on an
+    exception terminates the upload without creating it.
+    """
+
+    def __init__(self, blob: "LocalBlob", buffer_size: int):
+        self.blob = blob
+        self.upload_path = f"{blob.path}.upload"
+        super().__init__(io.FileIO(self.upload_path, "wb"), buffer_size=buffer_size)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        with self.blob.bucket.client.lock:
+            os.replace(self.upload_path, self.blob.path)
+            self.blob.written()
+
+    def terminate(self) -> None:
+        if not self.closed:
+            super().close()
+            os.remove(self.upload_path)
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.terminate()
+        else:
+            self.close()
+
+class LocalBlob:
+    """
+    Object of a LocalBucket. Like a storage.Blob, its ``generation`` is the
+    one fetched by get_blob (None for a blob that was not fetched), and
+    reads and writes can be made conditional on the current generation.
+    """
+
+    def __init__(self, bucket: "LocalBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.path, name)
+        self.generation = None
+
+    @property
+    def size(self) -> Optional[int]:
+        return os.path.getsize(self.path) if self.exists() else None
+
+    @property
+    def crc32c(self) -> Optional[str]:
+        if not self.exists():
+            return None
+        checksum = google_crc32c.Checksum()
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                checksum.update(chunk)
+        return base64.b64encode(checksum.digest()).decode()
+
+    def current_generation(self) -> int:
+        """Generation of the object, 0 if it does not exist"""
+        if not self.exists():
+            return 0
+        return self.bucket.client.generations.get(self.path, 1)
+
+    def check_generation(self, if_generation_match: Optional[int]) -> None:
+        if if_generation_match is not None and if_generation_match != self.current_generation():
+            raise PreconditionFailed(f"Generation of {self.name} is not {if_generation_match}")
+
+    def written(self) -> None:
+        generations = self.bucket.client.generations
+        generations[self.path] = generations.get(self.path, 1) + 1
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def open(self, mode: str = "r", chunk_size: Optional[int] = None, ignore_flush: bool = False, **kwargs) -> IO:
+        if "w" in mode:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return LocalBlobWriter(self, chunk_size or io.DEFAULT_BUFFER_SIZE)
+        return open(self.path, mode, buffering=chunk_size or -1)
+
+    def download_as_bytes(self, if_generation_match: Optional[int] = None, **kwargs) -> bytes:
+        with self.bucket.client.lock:
+            if not self.exists():
+                raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+            self.check_generation(if_generation_match)
+            with open(self.path, "rb") as f:
+                return f.read()
+
+    def upload_from_file(self, file_obj: IO, rewind: bool = False, if_generation_match: Optional[int] = None, **kwargs) -> None:
+        if rewind:
+            file_obj.seek(0)
+        with self.bucket.client.lock:
+            self.check_generation(if_generation_match)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "wb") as f:
+                shutil.copyfileobj(file_obj, f)
+            self.written()
+
+    def upload_from_string(
+        self,
+        data,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None,
+        **kwargs
+    ) -> None:
+        self.upload_from_file(io.BytesIO(data.encode() if isinstance(data, str) else data), if_generation_match=if_generation_match)
+
+    def compose(self, sources: List["LocalBlob"]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self.bucket.client.lock:
+            with open(self.path, "wb") as f:
+                for source in sources:
+                    with open(source.path, "rb") as part:
+                        shutil.copyfileobj(part, f)
+            self.written()
+
+    def delete(self) -> None:
+        os.remove(self.path)
+        self.bucket.client.generations.pop(self.path, None)
+
+class LocalBucket:
+    def __init__(self, client: "LocalStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.path = os.path.join(client.root, name)
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+    def get_blob(self, name: str) -> Optional[LocalBlob]:
+        blob = self.blob(name)
+        with self.client.lock:
+            if not blob.exists():
+                return None
+            blob.generation = blob.current_generation()
+        return blob
+
+    def list_blobs(self, prefix: str = "", max_results: Optional[int] = None, **kwargs) -> List[LocalBlob]:
+        names = [
+            os.path.relpath(os.path.join(directory, file_name), self.path).replace(os.sep, "/")
+            for directory, _, file_names in os.walk(self.path)
+            for file_name in file_names
+        ]
+        return [self.blob(name) for name in sorted(names) if name.startswith(prefix)][:max_results]
+
+class LocalStorageClient:
+    """Drop-in for storage.Client backed by directories under ``root``"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.generations = {}  # By object path, for the objects written through this client
+        self.lock = threading.RLock()
+
+    def bucket(self, name: str) -> LocalBucket:
+        return LocalBucket(self, name)
+
+    def list_blobs(self, bucket_or_name, prefix: str = "", max_results: Optional[int] = None, **kwargs) -> List[LocalBlob]:
+        bucket = self.bucket(bucket_or_name) if isinstance(bucket_or_name, str) else bucket_or_name
+        return bucket.list_blobs(prefix=prefix, max_results=max_results)
@@ -0,0 +1,198 @@
+"""
+Synthetic inputs shaped like the files the pipeline ingests.
+
+aws_data_desafio.csv follows the billing schema of FILES and
+lista_precios.json the price list record shape. Cardinalities follow a
+mid-size AWS organisation: a few hundred accounts, a handful of regions,
+pricing terms and units, tens of instance types and a few thousand products,
+with start_date spread over a year. Instance types are only set for
+compute services and a small share of rows miss their service_code, so the
+null-related DQ checks and the price joins see realistic data.
+
+Files are written in chunks, so 100M-row inputs can be generated in
+bounded memory. Generation is seeded and reproducible.
+
+Usage:
+    python benchmarks/synthetic_data.py billing /tmp/aws_data_desafio.csv --rows 10000000
+    python benchmarks/synthetic_data.py prices /tmp/lista_precios.json --rows 50000 --format ndjson
+"""
+import argparse
+import csv
+import itertools
+import json
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+BILLING_COLUMNS = [
+    "account_id",
+    "instance_type",
+    "net_cost",
+    "pricing_term",
+    "pricing_unit",
+    "product_code",
+    "product_name",
+    "region",
+    "service_code",
+    "start_date",
+    "tag_application",
+    "usage_amount",
+    "usage_type"
+]
+
+ACCOUNTS = 300
+APPLICATIONS = 120
+PRODUCTS_PER_SERVICE = 400
+DAYS = 365
+START_DATE = date(2024, 1, 1)
+MISSING_SERVICE_CODE_RATE = 0.01
+WRITE_CHUNK_ROWS = 100000
+
+REGIONS = [
+    "us-east-1", "us-east-2", "us-west-1", "us-west-2", "eu-west-1",
+    "eu-central-1", "sa-east-1", "ap-southeast-1", "ap-northeast-1"
+]
+PRICING_TERMS = ["OnDemand", "Reserved", "Spot"]
+# Service code -> (pricing units, instance types); services without
+# instance types leave the column empty
+SERVICES = {
+    "AmazonEC2": (["Hrs"], [
+        f"{family}.{size}"
+        for family in ["t3", "m5", "m6i", "c5", "c6g", "r5", "r6i"]
+        for size in ["micro", "large", "xlarge", "2xlarge", "4xlarge"]
+    ]),
+    "AmazonRDS": (["Hrs", "GB-Mo"], [
+        f"db.{family}.{size}" for family in ["t3", "m5", "r5"] for size in ["medium", "large", "xlarge"]
+    ]),
+    "AmazonElastiCache": (["Hrs"], ["cache.t3.micro", "cache.m5.large", "cache.r6g.xlarge"]),
+    "AmazonS3": (["GB-Mo", "Requests"], []),
+    "AWSLambda": (["Requests", "Lambda-GB-Second"], []),
+    "AmazonDynamoDB": (["GB-Mo", "ReadCapacityUnit-Hrs", "WriteCapacityUnit-Hrs"], []),
+    "AmazonCloudFront": (["GB", "Requests"], []),
+    "AmazonCloudWatch": (["Metrics", "GB"], [])
+}
+UNIT_FACTORS = {
+    "Hrs": 1,
+    "GB-Mo": 1,
+    "GB": 1,
+    "Requests": 1000000,
+    "Lambda-GB-Second": 1,
+    "ReadCapacityUnit-Hrs": 1,
+    "WriteCapacityUnit-Hrs": 1,
+    "Metrics": 1
+}
+
+def build_catalog(seed: int = 42) -> List[Dict[str, Optional[str]]]:
+    """
+    Build the product catalog shared by the billing rows and the price list.
+
+    Args:
+        seed: Random seed
+
+    Returns:
+        List[Dict[str, Optional[str]]]: One entry per priced SKU with the
+            price list join keys and a list price
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for service, (units, instance_types) in SERVICES.items():
+        for i in range(PRODUCTS_PER_SERVICE):
+            unit = units[i % len(units)]
+            catalog.append({
+                "product_code": service,
+                "product_name": f"{service} {unit} product {i}",
+                "pricing_term": rng.choice(PRICING_TERMS),
+                "pricing_unit": unit,
+                "instance_type": rng.choice(instance_types) if instance_types and unit == "Hrs" else None,
+                "precio_lista": round(rng.lognormvariate(-2, 1.5), 6)
+            })
+    return catalog
+
+def generate_billing_csv(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Write a synthetic billing export with the aws_data_desafio.csv columns.
+
+    Args:
+        path: Output file path
+        rows: Number of rows
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    catalog = build_catalog(seed)
+    accounts = [f"{rng.randrange(10 ** 11, 10 ** 12)}" for _ in range(ACCOUNTS)]
+    # Skewed usage: a few products and accounts account for most rows
+    product_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(catalog))))
+    account_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(ACCOUNTS)))
+    dates = [(START_DATE + timedelta(days=day)).isoformat() for day in range(DAYS)]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(BILLING_COLUMNS)
+        written = 0
+        while written < rows:
+            chunk = min(WRITE_CHUNK_ROWS, rows - written)
+            products = rng.choices(catalog, cum_weights=product_weights, k=chunk)
+            owners = rng.choices(accounts, cum_weights=account_weights, k=chunk)
+            records = []
+            for product, account in zip(products, owners):
+                region = rng.choice(REGIONS)
+                usage_amount = round(rng.lognormvariate(2, 2), 6)
+                missing_service = rng.random() < MISSING_SERVICE_CODE_RATE
+                records.append([
+                    account,
+                    product["instance_type"] or "",
+                    round(usage_amount / UNIT_FACTORS[product["pricing_unit"]] * product["precio_lista"]
+                          * rng.uniform(0.5, 1.05), 6),
+                    product["pricing_term"],
+                    product["pricing_unit"],
+                    product["product_code"],
+                    product["product_name"],
+                    region,
+                    "" if missing_service else product["product_code"],
+                    rng.choice(dates),
+                    f"app-{rng.randrange(APPLICATIONS)}",
+                    usage_amount,
+                    f"{region}:{product['product_code']}-{product['pricing_unit']}"
+                ])
+            writer.writerows(records)
+            written += chunk
+
+def generate_prices_file(path: str, rows: Optional[int] = None, fmt: str = "array", seed: int = 42) -> None:
+    """
+    Write a synthetic price list with the lista_precios.json record shape.
+
+    Args:
+        path: Output file path
+        rows: Number of SKUs, the catalog size by default; larger values
+            repeat the catalog with distinct product names
+        fmt: "array" for a JSON array, "ndjson" for newline-delimited records
+        seed: Random seed
+    """
+    catalog = build_catalog(seed)
+    rows = len(catalog) if rows is None else rows
+    with open(path, "w") as f:
+        if fmt == "array":
+            f.write("[")
+        for i in range(rows):
+            record = dict(catalog[i % len(catalog)])
+            if i >= len(catalog):
+                record["product_name"] = f"{record['product_name']} v{i // len(catalog)}"
+            if fmt == "array":
+                f.write(("," if i else "") + json.dumps(record))
+            else:
+                f.write(json.dumps(record) + "\n")
+        if fmt == "array":
+            f.write("]")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=["billing", "prices"])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--format", choices=["array", "ndjson"], default="array")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.kind == "billing":
+        generate_billing_csv(args.path, args.rows or 1000000, seed=args.seed)
+    else:
+        generate_prices_file(args.path, args.rows, fmt=args.format, seed=args.seed)
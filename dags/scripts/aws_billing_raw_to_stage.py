@@ -1,14 +1,38 @@
 from google.cloud import storage
 from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import pyarrow.parquet as pq
+import hashlib
 import io
+import itertools
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import re
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple, Union
 from airflow.exceptions import AirflowException
 
+from scripts.bigquery_partitions import NULL_PARTITION, STAGING_TASK_ID, pull_staging_results, replace_partitions, split_partitions
+from scripts.bq_job_graph import run_job_graph
+from scripts.bq_metrics import JobRecorder, metrics_table_id
+from scripts.concurrency import DEFAULT_MAX_WORKERS, run_concurrently
+from scripts.dq_rules import DQ_RULES, DQProfile
+from scripts.gcp_clients import get_bigquery_client, get_storage_client
+from scripts.json_stream import JSON_BATCH_ROWS, JSONSchemaWidened, iter_inferred_batches, iter_json_records, iter_record_batches
+from scripts.run_checkpoints import PARQUET_WRITTEN, TABLE_LOADED, completed_stage, load_checkpoints, record_stage
+from scripts.run_dates import backfill_requested, date_path, run_dates
+from scripts.source_manifest import clear_load_fingerprints, force_refresh_requested, is_unchanged, load_manifest, update_manifest
+from scripts.tracing import span, trace
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +46,60 @@ RAW_BUCKET_NAME = "melithirdparty-raw"
 STAGE_BUCKET_NAME = "melithirdparty-stage"
 DATASET_ID = "billing_staging"
 
+# Stage table of each file, by file name without extension
+TABLE_NAMES = {
+    "aws_data_desafio": "stage_aws_billing",
+    "lista_precios": "stage_aws_prices"
+}
+
+# Incremental load settings
+INCOMING_TABLE_SUFFIX = "__incoming"
+INCOMING_TABLE_EXPIRATION = timedelta(days=1)
+DAY_PATH_KEYS = ["source_year", "source_month", "source_day"]  # Columns a backfill load reads the YYYY/MM/DD day folder into
+
+# Streaming conversion settings
+STREAM_BATCH_SIZE = 64 * 1024 * 1024  # Bytes of CSV decoded per record batch / row group
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024   # GCS read/resumable upload chunk, multiple of 256 KiB
+SHARD_MAX_OPEN_FILES = 8              # Shard Parquet files written at the same time, each holding an upload chunk
+
+# Cells read as NULL by the streaming CSV reader, the same as pd.read_csv's default na_values
+CSV_NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+# Parquet layout settings
+PARQUET_ROW_GROUP_SIZE = 1000000  # Maximum rows per row group
+PARQUET_WRITE_OPTIONS = {
+    "compression": "snappy",
+    "use_dictionary": True,
+    "write_statistics": True,
+    "data_page_size": 1024 * 1024
+}
+
+# Hive-partitioned layout settings
+HIVE_LAYOUT_DIR = "partitioned"                # {base_name}/partitioned/start_date=YYYY-MM-DD/part-N.parquet
+HIVE_TARGET_FILE_SIZE = 256 * 1024 * 1024      # Target bytes per part file
+HIVE_MIN_ROWS_PER_GROUP = 128 * 1024           # Rows buffered per partition before a row group is flushed
+HIVE_MAX_PARTITIONS = 10000
+HIVE_NULL_FILE_SUFFIX = "_null.parquet"       # {base_name}/partitioned_null.parquet holds the rows without a date
+EXTERNAL_TABLE_SUFFIX = "_ext"
+
+# Version of the Parquet conversion, part of the fingerprint of converted data;
+# bump it whenever a code change alters the Parquet output or the DQ counts
+CONVERSION_VERSION = 4
+
+# Low-cardinality string columns are read and written dictionary-encoded
+DICTIONARY_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+BQ_TO_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "FLOAT": pa.float64(),
+    "INTEGER": pa.int64(),
+    "BOOLEAN": pa.bool_(),
+    "DATE": pa.date32()
+}
+
 FILES = [
     {
         "name": "aws_data_desafio.csv",
@@ -39,11 +117,29 @@ FILES = [
             bigquery.SchemaField("tag_application", "STRING"),
             bigquery.SchemaField("usage_amount", "FLOAT"),
             bigquery.SchemaField("usage_type", "STRING")
-        ]
+        ],
+        "dictionary_columns": [
+            "instance_type",
+            "pricing_term",
+            "pricing_unit",
+            "product_code",
+            "region",
+            "service_code",
+            "usage_type"
+        ],
+        "streaming": True,
+        "batch_size": STREAM_BATCH_SIZE,
+        "load_mode": "incremental",
+        "partition_field": "start_date",
+        "layout": "single",  # "hive" writes start_date=YYYY-MM-DD/part-N.parquet under HIVE_LAYOUT_DIR
+        "shard_months": None  # Months of start_date per mapped staging task (converted once when planning), None to stage the file in one task
     },
     {
         "name": "lista_precios.json",
-        "schema": []  # autodetect
+        "schema": [],  # autodetect
+        "dictionary_columns": ["instance_type", "pricing_term", "pricing_unit", "product_code"],
+        "streaming": True,
+        "batch_rows": JSON_BATCH_ROWS
     }
 ]
 
@@ -51,6 +147,9 @@ def initialize_clients() -> Dict:
     """
     Initialize Google Cloud clients.
     
+    The clients come from the process-wide factory, so repeated calls reuse
+    them and their pooled connections.
+    
     Returns:
         Dict: Dictionary containing initialized clients
         
@@ -59,15 +158,21 @@ def initialize_clients() -> Dict:
     """
     try:
         return {
-            'storage': storage.Client(),
-            'bigquery': bigquery.Client(project=PROJECT_ID)
+            'storage': get_storage_client(),
+            'bigquery': get_bigquery_client(project=PROJECT_ID)
         }
     except Exception as e:
         error_msg = f"Failed to initialize clients: {str(e)}"
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
-def read_file_data(storage_client: storage.Client, file_name: str, source_path: str) -> pd.DataFrame:
+def read_file_data(
+    storage_client: storage.Client,
+    file_name: str,
+    source_path: str,
+    dictionary_columns: Optional[List[str]] = None,
+    string_columns: Optional[List[str]] = None
+) -> pd.DataFrame:
     """
     Read file data from GCS and convert to DataFrame.
     
@@ -75,6 +180,9 @@ def read_file_data(storage_client: storage.Client, file_name: str, source_path:
         storage_client: Google Cloud Storage client
         file_name: Name of the file to read
         source_path: Path to the file in GCS
+        dictionary_columns: Low-cardinality columns read as categoricals
+        string_columns: CSV columns read as text, so IDs made of digits such
+            as account_id keep their leading zeros instead of becoming numbers
         
     Returns:
         pd.DataFrame: DataFrame containing the file data
@@ -85,16 +193,26 @@ def read_file_data(storage_client: storage.Client, file_name: str, source_path:
     try:
         raw_bucket = storage_client.bucket(RAW_BUCKET_NAME)
         blob = raw_bucket.blob(source_path)
-        data = blob.download_as_bytes()
-
-        if file_name.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(data))
-            if "start_date" in df.columns:
-                df["start_date"] = pd.to_datetime(df["start_date"], format='%Y-%m-%d', errors='coerce')
-        elif file_name.endswith(".json"):
-            df = pd.read_json(io.BytesIO(data))
-        else:
-            raise ValueError(f"Unsupported file format: {file_name}")
+        with span("download") as download:
+            data = blob.download_as_bytes()
+            download.set(bytes=len(data))
+
+        dictionary_columns = dictionary_columns or []
+        with span("parse", bytes=len(data)) as parse:
+            if file_name.endswith(".csv"):
+                dtypes = {col: str for col in string_columns or []}
+                dtypes.update({col: "category" for col in dictionary_columns})
+                df = pd.read_csv(io.BytesIO(data), dtype=dtypes)
+                if "start_date" in df.columns:
+                    df["start_date"] = pd.to_datetime(df["start_date"], format='%Y-%m-%d', errors='coerce')
+            elif file_name.endswith(".json"):
+                df = pd.read_json(io.BytesIO(data))
+                for col in dictionary_columns:
+                    if col in df.columns:
+                        df[col] = df[col].astype("category")
+            else:
+                raise ValueError(f"Unsupported file format: {file_name}")
+            parse.set(rows=len(df))
 
         return df
     except Exception as e:
@@ -102,7 +220,13 @@ def read_file_data(storage_client: storage.Client, file_name: str, source_path:
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
-def save_as_parquet(df: pd.DataFrame, stage_bucket: storage.Bucket, parquet_path: str) -> None:
+def save_as_parquet(
+    df: pd.DataFrame,
+    stage_bucket: storage.Bucket,
+    parquet_path: str,
+    profile: Optional[DQProfile] = None,
+    schema: Optional[pa.Schema] = None
+) -> None:
     """
     Save DataFrame as Parquet file in GCS.
     
@@ -110,62 +234,927 @@ def save_as_parquet(df: pd.DataFrame, stage_bucket: storage.Bucket, parquet_path
         df: DataFrame to save
         stage_bucket: GCS bucket for staging
         parquet_path: Path to save the Parquet file
+        profile: Data quality profile updated with the written table
+        schema: Arrow schema of the file, from build_arrow_schema, so the
+            Parquet types are the streaming path's; inferred from the
+            DataFrame dtypes if not given
         
     Raises:
         AirflowException: If saving fails
     """
     try:
-        # Define explicit schema for Parquet, especially for date types
-        # Convert pandas datetime64[ns] to date32 for BigQuery compatibility
-        schema_fields = []
-        for col, dtype in df.dtypes.items():
-            if col == "start_date":
-                schema_fields.append(pa.field("start_date", pa.date32()))
-            elif pd.api.types.is_integer_dtype(dtype):
-                schema_fields.append(pa.field(col, pa.int64())) # Use int64 for other integers
-            elif pd.api.types.is_float_dtype(dtype):
-                schema_fields.append(pa.field(col, pa.float64()))
-            elif pd.api.types.is_bool_dtype(dtype):
-                schema_fields.append(pa.field(col, pa.bool_()))
-            else: # Default to string for objects, categories, etc.
-                 schema_fields.append(pa.field(col, pa.string()))
-
-        parquet_schema = pa.schema(schema_fields)
-
-        # Convert DataFrame to PyArrow Table with explicit schema
-        table = pa.Table.from_pandas(df, schema=parquet_schema, preserve_index=False)
-
-        parquet_buffer = io.BytesIO()
-        pq.write_table(table, parquet_buffer, compression="snappy")
-        parquet_buffer.seek(0)
+        with span("encode", rows=len(df)) as encode:
+            parquet_schema = schema
+            if parquet_schema is None:
+                # Define explicit schema for Parquet, especially for date types
+                # Convert pandas datetime64[ns] to date32 for BigQuery compatibility
+                schema_fields = []
+                for col, dtype in df.dtypes.items():
+                    if col == "start_date":
+                        schema_fields.append(pa.field("start_date", pa.date32()))
+                    elif pd.api.types.is_integer_dtype(dtype):
+                        schema_fields.append(pa.field(col, pa.int64())) # Use int64 for other integers
+                    elif pd.api.types.is_float_dtype(dtype):
+                        schema_fields.append(pa.field(col, pa.float64()))
+                    elif pd.api.types.is_bool_dtype(dtype):
+                        schema_fields.append(pa.field(col, pa.bool_()))
+                    elif isinstance(dtype, pd.CategoricalDtype):
+                        schema_fields.append(pa.field(col, DICTIONARY_TYPE))
+                    else: # Default to string for objects, etc.
+                         schema_fields.append(pa.field(col, pa.string()))
+
+                parquet_schema = pa.schema(schema_fields)
+
+            # Convert DataFrame to PyArrow Table with explicit schema
+            table = pa.Table.from_pandas(df, schema=parquet_schema, preserve_index=False)
+            if profile is not None:
+                profile.update(table)
+
+            parquet_buffer = io.BytesIO()
+            pq.write_table(table, parquet_buffer, row_group_size=PARQUET_ROW_GROUP_SIZE, **PARQUET_WRITE_OPTIONS)
+            parquet_buffer.seek(0)
+            encode.set(bytes=parquet_buffer.getbuffer().nbytes)
 
         stage_blob = stage_bucket.blob(parquet_path)
-        stage_blob.upload_from_file(parquet_buffer, rewind=True)
+        with span("upload", bytes=parquet_buffer.getbuffer().nbytes):
+            stage_blob.upload_from_file(parquet_buffer, rewind=True)
         logger.info(f"Parquet file uploaded: gs://{STAGE_BUCKET_NAME}/{parquet_path}")
     except Exception as e:
         error_msg = f"Failed to save Parquet file: {str(e)}"
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
-def load_to_bigquery(
-    bq_client: bigquery.Client,
+def build_arrow_schema(
+    bq_schema: List[bigquery.SchemaField],
+    dictionary_columns: Optional[List[str]] = None
+) -> pa.Schema:
+    """
+    Build the Arrow schema matching a BigQuery schema.
+    
+    Args:
+        bq_schema: BigQuery schema fields of the file
+        dictionary_columns: String columns typed as dictionaries
+        
+    Returns:
+        pa.Schema: Arrow schema with the same column order and types
+    """
+    dictionary_columns = set(dictionary_columns or [])
+    return pa.schema([
+        pa.field(
+            field.name,
+            DICTIONARY_TYPE if field.name in dictionary_columns else BQ_TO_ARROW_TYPES[field.field_type]
+        )
+        for field in bq_schema
+    ])
+
+def dictionary_encode_columns(batch: pa.RecordBatch, columns: List[str]) -> pa.RecordBatch:
+    """
+    Dictionary-encode the given string columns of a record batch.
+    
+    Args:
+        batch: Record batch
+        columns: Columns to encode, ignored if absent
+        
+    Returns:
+        pa.RecordBatch: Record batch with those columns as dictionaries
+    """
+    arrays = []
+    fields = []
+    for field, column in zip(batch.schema, batch.columns):
+        if field.name in columns and pa.types.is_string(field.type):
+            column = pc.dictionary_encode(column)
+            field = field.with_type(column.type)
+        arrays.append(column)
+        fields.append(field)
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+def conform_batch(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Select, parse and cast the columns of a record batch to the target schema.
+    
+    Args:
+        batch: Record batch as read from the source file
+        schema: Target Arrow schema
+        
+    Returns:
+        pa.RecordBatch: Record batch matching the target schema
+    """
+    columns = []
+    for field in schema:
+        index = batch.schema.get_field_index(field.name)
+        if index < 0:
+            raise ValueError(f"Missing column in source file: {field.name}")
+        column = batch.column(index)
+        if field.name == "start_date" and not pa.types.is_date(column.type):
+            # Unparseable dates become nulls, as pd.to_datetime(errors='coerce') does
+            column = pc.strptime(column, format="%Y-%m-%d", unit="s", error_is_null=True)
+        columns.append(column.cast(field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def write_parquet_stream(
+    batches: Iterator[pa.RecordBatch],
+    stage_bucket: storage.Bucket,
+    parquet_path: str,
+    schema: Optional[pa.Schema] = None
+) -> int:
+    """
+    Write record batches to a Parquet file in GCS through a resumable upload.
+    
+    Each batch becomes at least one row group, so only the current batch and
+    one upload chunk are held in memory. Reading, parsing and encoding
+    overlap, so the "convert" span splits its time into ``parse_seconds``
+    (waiting for the next batch: download, decode, conform) and
+    ``encode_seconds`` (Parquet encoding and upload).
+    
+    Args:
+        batches: Record batches to write, all with the same schema
+        stage_bucket: GCS bucket for staging
+        parquet_path: Path to save the Parquet file
+        schema: Schema of the file, taken from the first batch if not given
+        
+    Returns:
+        int: Number of rows written
+    """
+    with span("convert") as convert:
+        def timed(source: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+            while True:
+                started = time.perf_counter()
+                batch = next(source, None)
+                convert.add(parse_seconds=time.perf_counter() - started)
+                if batch is None:
+                    return
+                yield batch
+
+        batches = timed(iter(batches))
+        first = next(batches, None)
+        if schema is None:
+            if first is None:
+                raise ValueError(f"No records to write to {parquet_path}")
+            schema = first.schema
+
+        rows = 0
+        stage_blob = stage_bucket.blob(parquet_path)
+        with stage_blob.open("wb", chunk_size=STREAM_CHUNK_SIZE, ignore_flush=True) as sink:
+            with pq.ParquetWriter(sink, schema, **PARQUET_WRITE_OPTIONS) as writer:
+                for batch in itertools.chain([first] if first is not None else [], batches):
+                    started = time.perf_counter()
+                    writer.write_batch(batch, row_group_size=PARQUET_ROW_GROUP_SIZE)
+                    convert.add(encode_seconds=time.perf_counter() - started)
+                    rows += batch.num_rows
+            convert.set(rows=rows, bytes=sink.tell())
+    return rows
+
+@contextmanager
+def open_csv_batches(
+    storage_client: storage.Client,
     file_config: Dict[str, Any],
+    source_path: str,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[Tuple[pa.Schema, Iterator[pa.RecordBatch]]]:
+    """
+    Open a CSV file in GCS as a stream of record batches in the file schema.
+    
+    Empty cells and the CSV_NULL_VALUES tokens are read as NULL in every
+    column, strings included, as read_file_data does with pandas.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        file_config: Configuration for the file
+        source_path: Path to the CSV file in the raw bucket
+        batch_size: Bytes of CSV decoded per record batch
+        
+    Yields:
+        Tuple[pa.Schema, Iterator[pa.RecordBatch]]: Target schema and conformed batches
+    """
+    schema = build_arrow_schema(file_config["schema"], file_config.get("dictionary_columns"))
+    # Dates are parsed after reading so that invalid values become nulls instead of failing the read
+    column_types = {
+        field.name: pa.string() if field.name == "start_date" else field.type
+        for field in schema
+    }
+
+    raw_blob = storage_client.bucket(RAW_BUCKET_NAME).blob(source_path)
+    with raw_blob.open("rb", chunk_size=STREAM_CHUNK_SIZE) as source:
+        reader = pacsv.open_csv(
+            source,
+            read_options=pacsv.ReadOptions(block_size=batch_size),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                null_values=CSV_NULL_VALUES,
+                strings_can_be_null=True
+            )
+        )
+        yield schema, (conform_batch(batch, schema) for batch in reader)
+
+def stream_csv_to_parquet(
+    storage_client: storage.Client,
+    file_config: Dict[str, Any],
+    source_path: str,
+    stage_bucket: storage.Bucket,
+    parquet_path: str,
+    batch_size: int = STREAM_BATCH_SIZE,
+    profile: Optional[DQProfile] = None,
+    shard: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Convert a CSV file in GCS to Parquet without materializing it in memory.
+    
+    The CSV is read from a GCS read stream in record batches of roughly
+    ``batch_size`` bytes, each batch is written as one Parquet row group and
+    the output goes through a resumable upload, so peak memory is bounded by
+    the batch size rather than by the file size.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        file_config: Configuration for the file
+        source_path: Path to the CSV file in the raw bucket
+        stage_bucket: GCS bucket for staging
+        parquet_path: Path to save the Parquet file
+        batch_size: Bytes of CSV decoded per record batch
+        profile: Data quality profile updated with every batch written
+        shard: Optional date shard, only its rows are written
+        
+    Returns:
+        int: Number of rows written
+        
+    Raises:
+        AirflowException: If the conversion fails
+    """
+    try:
+        with open_csv_batches(storage_client, file_config, source_path, batch_size) as (schema, batches):
+            if shard is not None:
+                batches = filter_shard(batches, file_config["partition_field"], shard)
+            if profile is not None:
+                batches = profile.observe(batches)
+            rows = write_parquet_stream(batches, stage_bucket, parquet_path, schema=schema)
+
+        logger.info(f"Parquet file streamed ({rows} rows): gs://{STAGE_BUCKET_NAME}/{parquet_path}")
+        return rows
+    except Exception as e:
+        error_msg = f"Failed to stream {source_path} to Parquet: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
+
+def date_shards(dates: Iterable[date], months: int, include_null: bool = False) -> List[Dict[str, Any]]:
+    """
+    Split partition dates into ranges of ``months`` calendar months.
+    
+    Ranges are aligned to multiples of ``months`` (quarters for 3, years
+    for 12), so a date always falls into the same shard from one run to
+    the next. Ranges without any date are left out.
+    
+    Args:
+        dates: Partition dates of the file
+        months: Months per shard
+        include_null: Whether rows without a date exist; the first shard takes them
+        
+    Returns:
+        List[Dict[str, Any]]: Shards with ISO "start" (inclusive), "end"
+            (exclusive) and "include_null"
+    """
+    shards = []
+    for index in sorted({(value.year * 12 + value.month - 1) // months * months for value in dates}):
+        shards.append({**shard_range(index, months), "include_null": include_null and not shards})
+    return shards
+
+def shard_range(index: int, months: int) -> Dict[str, str]:
+    """
+    Date range of the shard starting at a month.
+    
+    Args:
+        index: First month of the shard as ``year * 12 + month - 1``
+        months: Months per shard
+        
+    Returns:
+        Dict[str, str]: ISO "start" (inclusive) and "end" (exclusive)
+    """
+    end = index + months
+    return {
+        "start": date(index // 12, index % 12 + 1, 1).isoformat(),
+        "end": date(end // 12, end % 12 + 1, 1).isoformat()
+    }
+
+def shard_suffix(shard: Dict[str, Any]) -> str:
+    """
+    Name of a date shard used in its Parquet path and manifest.
+    
+    Args:
+        shard: Shard as returned by date_shards or convert_shards
+        
+    Returns:
+        str: "YYYY-MM-DD_YYYY-MM-DD" range, "undated" for the shard of a
+            file without any dated row
+    """
+    if shard["start"] is None:
+        return "undated"
+    return f"{shard['start']}_{shard['end']}"
+
+def shard_label(shard: Dict[str, Any]) -> str:
+    """
+    Human-readable range of a date shard, for task names and messages.
+    
+    Args:
+        shard: Shard as returned by date_shards or convert_shards
+        
+    Returns:
+        str: "YYYY-MM-DD..YYYY-MM-DD", "undated" for the shard of a file
+            without any dated row
+    """
+    return shard_suffix(shard) if shard["start"] is None else f"{shard['start']}..{shard['end']}"
+
+def filter_shard(
+    batches: Iterator[pa.RecordBatch],
+    partition_field: str,
+    shard: Dict[str, Any]
+) -> Iterator[pa.RecordBatch]:
+    """
+    Keep the rows of record batches that fall into a date shard.
+    
+    Args:
+        batches: Conformed record batches
+        partition_field: Date column the shard ranges over
+        shard: Shard as returned by date_shards or convert_shards
+        
+    Yields:
+        pa.RecordBatch: Non-empty batches with the rows of the shard
+    """
+    undated = shard["start"] is None
+    if not undated:
+        start = pa.scalar(date.fromisoformat(shard["start"]), pa.date32())
+        end = pa.scalar(date.fromisoformat(shard["end"]), pa.date32())
+    for batch in batches:
+        column = batch.column(partition_field)
+        mask = pc.is_null(column) if undated else pc.and_(pc.greater_equal(column, start), pc.less(column, end))
+        if shard.get("include_null") and not undated:
+            mask = pc.or_kleene(mask, pc.is_null(column))
+        batch = batch.filter(pc.fill_null(mask, False))
+        if batch.num_rows:
+            yield batch
+
+def convert_shards(
+    storage_client: storage.Client,
+    file_config: Dict[str, Any],
+    source_path: str,
+    stage_bucket: storage.Bucket,
+    parquet_prefix: str
+) -> List[Dict[str, Any]]:
+    """
+    Convert a CSV file to the Parquet data of each of its date shards in one pass.
+    
+    Rows are routed to the shard of their date as they are read, so the
+    file is read once however many shards it has, instead of once to plan
+    the shards and once more by every shard. With the single-file layout
+    the rows of each shard are buffered and written to
+    ``{parquet_prefix}__{shard_suffix}.parquet`` a row group at a time, and
+    the rows without a date to ``{parquet_prefix}__undated.parquet``, which
+    the first shard loads too. The buffers hold at most one record batch
+    worth of rows in total, the largest is written out when they are full,
+    and at most SHARD_MAX_OPEN_FILES files are open at once; a shard whose
+    file was closed to open another one goes on in a new file,
+    ``{parquet_prefix}__{shard_suffix}.N.parquet``. The Hive layout is
+    written once and each shard loads the partitions in its range. Each
+    shard gets its own data quality profile. A file whose rows all lack a
+    date has a single shard holding them, see shard_suffix.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        file_config: Configuration for the file, with "shard_months"
+        source_path: Path to the CSV file in the raw bucket
+        stage_bucket: GCS bucket for staging
+        parquet_prefix: Path prefix of the Parquet files (single-file layout)
+        
+    Returns:
+        List[Dict[str, Any]]: Shards as returned by date_shards, each with
+            its "parquet_uris", "dq_results" and "dq_num_rows"; empty if
+            the file has no rows
+    """
+    file_name = file_config["name"]
+    months = file_config["shard_months"]
+    partition_field = file_config["partition_field"]
+    rules = DQ_RULES.get(TABLE_NAMES[file_name.split(".")[0]], [])
+    hive = file_config.get("layout") == "hive"
+    prefix = hive_uri_prefix(file_name.split(".")[0])
+    # By first month of the shard, None for the rows without a date
+    profiles = {}
+    buffers = {}         # Rows not written yet
+    buffer_sizes = {}    # Bytes of the buffered rows
+    parquet_paths = {}   # Files written, in row order
+    writers = OrderedDict()  # Open (sink, writer) pairs, least recently written first
+
+    def parquet_path(index: Optional[int], part: int = 0) -> str:
+        suffix = "undated" if index is None else shard_suffix(shard_range(index, months))
+        return f"{parquet_prefix}__{suffix}{f'.{part}' if part else ''}.parquet"
+
+    def close_writer(index: Optional[int]) -> None:
+        sink, writer = writers.pop(index)
+        writer.close()
+        sink.close()
+
+    def flush(index: Optional[int]) -> None:
+        rows = pa.Table.from_batches(buffers.pop(index), schema)
+        del buffer_sizes[index]
+        if index in writers:
+            writers.move_to_end(index)
+        else:
+            if len(writers) >= SHARD_MAX_OPEN_FILES:
+                close_writer(next(iter(writers)))
+            paths = parquet_paths.setdefault(index, [])
+            paths.append(parquet_path(index, len(paths)))
+            sink = stage_bucket.blob(paths[-1]).open("wb", chunk_size=STREAM_CHUNK_SIZE, ignore_flush=True)
+            writers[index] = (sink, pq.ParquetWriter(sink, schema, **PARQUET_WRITE_OPTIONS))
+        writers[index][1].write_table(rows, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+    batch_size = file_config.get("batch_size", STREAM_BATCH_SIZE)
+    with open_csv_batches(storage_client, file_config, source_path, batch_size) as (schema, batches), \
+            span("convert", layout=file_config.get("layout", "single"), shard_months=months) as convert, \
+            ExitStack() as stack:
+        stack.callback(lambda: [close_writer(index) for index in list(writers)])
+
+        def routed() -> Iterator[pa.RecordBatch]:
+            for batch in batches:
+                column = batch.column(partition_field)
+                month = pc.add(pc.multiply(pc.year(column), 12), pc.subtract(pc.month(column), 1))
+                starts = pc.multiply(pc.divide(month, months), months)
+                for index in pc.unique(starts).to_pylist():
+                    rows = batch.filter(pc.is_null(starts) if index is None else pc.fill_null(pc.equal(starts, index), False))
+                    profiles.setdefault(index, DQProfile(rules)).update(rows)
+                    if not hive:
+                        buffers.setdefault(index, []).append(rows)
+                        buffer_sizes[index] = buffer_sizes.get(index, 0) + rows.nbytes
+                while sum(buffer_sizes.values()) > batch_size:
+                    flush(max(buffer_sizes, key=buffer_sizes.get))
+                yield batch
+
+        if hive:
+            partitions = write_hive_partitioned(routed(), schema, prefix, partition_field)
+        else:
+            for _ in routed():
+                pass
+            for index in list(buffers):
+                flush(index)
+        convert.set(shards=len([index for index in profiles if index is not None]))
+
+    def uris(index: Optional[int]) -> List[str]:
+        return [f"gs://{STAGE_BUCKET_NAME}/{path}" for path in parquet_paths[index]]
+
+    indexes = sorted(index for index in profiles if index is not None)
+    if not indexes and None in profiles:
+        logger.info(f"No row of {file_name} has a {partition_field}, staging them as one undated shard")
+        profile = profiles[None]
+        return [{
+            "start": None,
+            "end": None,
+            "include_null": True,
+            "parquet_uris": [hive_null_uri(prefix)] if hive else uris(None),
+            "dq_results": profile.results(),
+            "dq_num_rows": profile.num_rows
+        }]
+
+    shards = date_shards([date(index // 12, index % 12 + 1, 1) for index in indexes], months, include_null=None in profiles)
+    for shard, index in zip(shards, indexes):
+        profile = profiles[index]
+        if shard["include_null"]:
+            profile.merge(profiles[None])
+        if hive:
+            shard_partitions = [
+                value for value in partitions
+                if value != NULL_PARTITION and shard["start"] <= value < shard["end"]
+            ]
+            shard_uris = hive_partition_uris(prefix, partition_field, shard_partitions + ([NULL_PARTITION] if shard["include_null"] else []))
+        else:
+            shard_uris = uris(index) + (uris(None) if shard["include_null"] else [])
+        shard.update(parquet_uris=shard_uris, dq_results=profile.results(), dq_num_rows=profile.num_rows)
+    return shards
+
+def hive_uri_prefix(base_name: str) -> str:
+    """
+    GCS prefix of the Hive-partitioned layout of a file.
+    
+    Args:
+        base_name: File name without extension
+        
+    Returns:
+        str: gs:// prefix without trailing slash
+    """
+    return f"gs://{STAGE_BUCKET_NAME}/{base_name}/{HIVE_LAYOUT_DIR}"
+
+def hive_null_uri(uri_prefix: str) -> str:
+    """
+    URI of the Parquet file holding the rows without a date of a Hive-partitioned dataset.
+    
+    The file sits next to the dataset, not inside it: a path without a
+    valid ``{field}=YYYY-MM-DD`` key would break the external table and the
+    Hive-partitioned loads over the dataset.
+    
+    Args:
+        uri_prefix: gs:// prefix of the dataset
+        
+    Returns:
+        str: gs:// URI of the file
+    """
+    return f"{uri_prefix}{HIVE_NULL_FILE_SUFFIX}"
+
+def write_hive_partitioned(
+    batches: Iterator[pa.RecordBatch],
+    schema: pa.Schema,
+    uri_prefix: str,
+    partition_field: str,
+    target_file_size: int = HIVE_TARGET_FILE_SIZE,
+    filesystem: Optional[pafs.FileSystem] = None
+) -> List[str]:
+    """
+    Write record batches as a Hive-partitioned Parquet dataset in GCS.
+    
+    Rows land in ``{partition_field}=YYYY-MM-DD/part-N.parquet`` files, so
+    every file holds a single date and the layout is sorted by date. Rows
+    per file are derived from ``target_file_size`` and the encoded size of
+    the first batch. Partitions present in the new data replace the
+    existing files of those partitions; other partitions are kept. Rows
+    without a date are written, with the partition column, to the single
+    file at hive_null_uri, which they replace.
+    
+    Args:
+        batches: Record batches in ``schema``
+        schema: Schema of the batches
+        uri_prefix: gs:// prefix of the dataset
+        partition_field: Date column used for partitioning
+        target_file_size: Approximate bytes per part file
+        filesystem: Filesystem the prefix lives in, GCS by default
+        
+    Returns:
+        List[str]: Written partitions as ISO dates (NULL_PARTITION for rows without a date)
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return []
+
+    # Estimate rows per file from the Parquet size of the first batch
+    probe = io.BytesIO()
+    pq.write_table(pa.Table.from_batches([first]), probe, **PARQUET_WRITE_OPTIONS)
+    bytes_per_row = max(1, probe.getbuffer().nbytes // max(1, first.num_rows))
+    max_rows_per_file = max(HIVE_MIN_ROWS_PER_GROUP, target_file_size // bytes_per_row)
+
+    filesystem = filesystem or pafs.GcsFileSystem()
+    partitions = set()
+    null_rows = 0
+
+    with ExitStack() as stack:
+        null_writer = None
+
+        def tracked() -> Iterator[pa.RecordBatch]:
+            nonlocal null_writer, null_rows
+            for batch in itertools.chain([first], batches):
+                column = batch.column(partition_field)
+                if column.null_count:
+                    if null_writer is None:
+                        sink = stack.enter_context(
+                            filesystem.open_output_stream(hive_null_uri(uri_prefix).replace("gs://", "", 1))
+                        )
+                        null_writer = stack.enter_context(pq.ParquetWriter(sink, schema, **PARQUET_WRITE_OPTIONS))
+                    null_writer.write_batch(batch.filter(pc.is_null(column)), row_group_size=PARQUET_ROW_GROUP_SIZE)
+                    null_rows += column.null_count
+                    batch = batch.filter(pc.is_valid(column))
+                partitions.update(pc.unique(batch.column(partition_field)).to_pylist())
+                if batch.num_rows:
+                    yield batch
+
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            pa.RecordBatchReader.from_batches(schema, tracked()),
+            base_dir=uri_prefix.replace("gs://", "", 1),
+            filesystem=filesystem,
+            format=file_format,
+            file_options=file_format.make_write_options(**PARQUET_WRITE_OPTIONS),
+            partitioning=ds.partitioning(pa.schema([schema.field(partition_field)]), flavor="hive"),
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="delete_matching",
+            max_rows_per_file=max_rows_per_file,
+            min_rows_per_group=HIVE_MIN_ROWS_PER_GROUP,
+            max_rows_per_group=min(PARQUET_ROW_GROUP_SIZE, max_rows_per_file),
+            max_partitions=HIVE_MAX_PARTITIONS
+        )
+
+    dates = sorted(partitions)
+    if null_rows:
+        logger.info(f"Wrote {null_rows} row(s) without {partition_field} to {hive_null_uri(uri_prefix)}")
+    logger.info(f"Wrote {len(dates)} partition(s) under {uri_prefix}")
+    return [value.isoformat() for value in dates] + ([NULL_PARTITION] if null_rows else [])
+
+def hive_partition_uris(uri_prefix: str, partition_field: str, partitions: List[str]) -> List[str]:
+    """
+    URIs of the given partitions of a Hive-partitioned dataset.
+    
+    Args:
+        uri_prefix: gs:// prefix of the dataset
+        partition_field: Partition column
+        partitions: Partitions as ISO dates, possibly with NULL_PARTITION
+        
+    Returns:
+        List[str]: One ``.../{field}=YYYY-MM-DD/*`` URI per partition, and
+            the hive_null_uri file for NULL_PARTITION
+    """
+    return [
+        hive_null_uri(uri_prefix) if value == NULL_PARTITION else f"{uri_prefix}/{partition_field}={value}/*"
+        for value in partitions
+    ]
+
+def create_external_table(
+    bq_client: bigquery.Client,
     table_id: str,
-    uri: str
+    uri_prefix: str,
+    partition_field: str,
+    connection_id: Optional[str] = None
 ) -> None:
     """
-    Load data from GCS to BigQuery.
+    Define an external (or BigLake) table over a Hive-partitioned dataset.
+    
+    Queries must filter on the partition column, so BigQuery only reads the
+    files of the requested dates and no load job is needed. Rows without a
+    date live outside the dataset, see hive_null_uri, and are only in the
+    loaded table.
     
     Args:
         bq_client: BigQuery client
-        file_config: Configuration for the file
-        table_id: Target table ID
-        uri: GCS URI of the Parquet file
+        table_id: External table ID
+        uri_prefix: gs:// prefix of the dataset
+        partition_field: Date partition column encoded in the paths
+        connection_id: Cloud resource connection, makes it a BigLake table
+    """
+    hive_options = bigquery.HivePartitioningOptions()
+    hive_options.mode = "CUSTOM"
+    hive_options.source_uri_prefix = f"{uri_prefix}/{{{partition_field}:DATE}}"
+    hive_options.require_partition_filter = True
+
+    external_config = bigquery.ExternalConfig(bigquery.ExternalSourceFormat.PARQUET)
+    external_config.source_uris = [f"{uri_prefix}/*"]
+    external_config.hive_partitioning = hive_options
+    if connection_id:
+        external_config.connection_id = connection_id
+
+    table = bigquery.Table(table_id)
+    table.external_data_configuration = external_config
+    bq_client.create_table(table, exists_ok=True)
+    logger.info(f"External table available: {table_id}")
+
+def stream_json_to_parquet(
+    storage_client: storage.Client,
+    source_path: str,
+    stage_bucket: storage.Bucket,
+    parquet_path: str,
+    batch_rows: int = JSON_BATCH_ROWS,
+    dictionary_columns: Optional[List[str]] = None,
+    profile: Optional[DQProfile] = None
+) -> int:
+    """
+    Convert a JSON array or NDJSON file in GCS to Parquet incrementally.
+    
+    Records are decoded one at a time from a GCS read stream and grouped into
+    Arrow record batches of ``batch_rows`` rows that go straight into the
+    Parquet writer, so the document is never held in memory as a whole.
+    The schema is inferred from the first batch, with the types
+    pd.read_json gives. If a later record adds a key or widens a type, the
+    upload is abandoned and the file read again with the schema of every
+    record, so keys and types that only appear late are still kept.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        source_path: Path to the JSON file in the raw bucket
+        stage_bucket: GCS bucket for staging
+        parquet_path: Path to save the Parquet file
+        batch_rows: Records per record batch / row group
+        dictionary_columns: String columns written dictionary-encoded
+        profile: Data quality profile updated with every batch written
+        
+    Returns:
+        int: Number of rows written
         
     Raises:
-        AirflowException: If loading fails
+        AirflowException: If the conversion fails
     """
+    raw_blob = storage_client.bucket(RAW_BUCKET_NAME).blob(source_path)
+
+    def convert(schema: Optional[pa.Schema], attempt_profile: Optional[DQProfile]) -> int:
+        with raw_blob.open("rb", chunk_size=STREAM_CHUNK_SIZE) as source:
+            records = iter_json_records(source)
+            if schema is None:
+                batches = iter_inferred_batches(records, batch_rows=batch_rows)
+            else:
+                batches = iter_record_batches(records, schema, batch_rows=batch_rows)
+            batches = (dictionary_encode_columns(batch, dictionary_columns or []) for batch in batches)
+            if attempt_profile is not None:
+                batches = attempt_profile.observe(batches)
+            return write_parquet_stream(batches, stage_bucket, parquet_path)
+
     try:
+        # Each attempt profiles into its own profile, so the batches of an
+        # abandoned attempt are not counted
+        attempt_profile = DQProfile(profile.rules) if profile is not None else None
+        try:
+            rows = convert(None, attempt_profile)
+        except JSONSchemaWidened as widened:
+            logger.info(f"Schema of {source_path} widened after the first batch, converting it again")
+            attempt_profile = DQProfile(profile.rules) if profile is not None else None
+            rows = convert(widened.schema, attempt_profile)
+        if profile is not None:
+            profile.merge(attempt_profile)
+
+        logger.info(f"Parquet file streamed ({rows} rows): gs://{STAGE_BUCKET_NAME}/{parquet_path}")
+        return rows
+    except Exception as e:
+        error_msg = f"Failed to stream {source_path} to Parquet: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
+
+def incoming_table_id(table_id: str, run_id: Optional[str] = None, shard: Optional[Dict[str, Any]] = None) -> str:
+    """
+    ID of the table an incremental load stages its data in.
+    
+    The table is scoped to the DAG run, and to the date shard, so runs and
+    shards loading at the same time never truncate each other's data
+    between their load and their MERGE.
+    
+    Args:
+        table_id: Target table ID
+        run_id: Airflow run ID, None outside Airflow
+        shard: Optional date shard, see date_shards
+        
+    Returns:
+        str: ``{table_id}__incoming``, with a suffix for the run and the shard
+    """
+    suffix = ""
+    if run_id:
+        # Table names only take letters, digits and underscores; the hash
+        # keeps run IDs that only differ in other characters apart
+        digest = hashlib.sha1(run_id.encode()).hexdigest()[:8]
+        suffix += f"_{re.sub(r'[^0-9A-Za-z_]', '_', run_id)}_{digest}"
+    if shard:
+        suffix += f"_{shard_suffix(shard).replace('-', '')}"
+    return f"{table_id}{INCOMING_TABLE_SUFFIX}{suffix}"
+
+def plan_incremental_load(
+    bq_client: bigquery.Client,
+    file_config: Dict[str, Any],
+    table_id: str,
+    uri: Union[str, List[str]],
+    hive_prefix: Optional[str] = None,
+    incoming_table_id: Optional[str] = None,
+    memo: Optional[Dict[str, Any]] = None,
+    day_prefix: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the replacement of only the partitions present in a Parquet file.
+    
+    The file is loaded into a short-lived ``__incoming`` table, the distinct
+    partition values are read from it and a single MERGE swaps exactly those
+    partitions in the target. The target is created once and never dropped,
+    so the cost follows the size of the new data, not of the history. With
+    a Hive-partitioned layout, the file of rows without a date (see
+    hive_null_uri) is appended to the incoming table by a second load.
+    
+    With ``day_prefix`` the URIs are the files of several days, in
+    ``YYYY/MM/DD`` folders under it, and a partition may be in more than
+    one of them. The load reads the folder of each row into DAY_PATH_KEYS
+    and the MERGE only takes the rows of each partition from the latest
+    day holding it, as if the days had been loaded in order.
+    
+    Args:
+        bq_client: BigQuery client
+        file_config: Configuration for the file, with "partition_field"
+        table_id: Target table ID
+        uri: GCS URI(s) of the Parquet data
+        hive_prefix: gs:// prefix when the URIs point into a Hive-partitioned
+            layout, whose partition column comes from the paths
+        incoming_table_id: Table the data is loaded into first, ``{table_id}__incoming``
+            by default; runs and date shards loaded at the same time each
+            need their own, see incoming_table_id
+        memo: Filled with "partitions", the replaced partitions as ISO dates
+            (NULL_PARTITION for the NULL partition), once they are known
+        day_prefix: gs:// prefix of the day folders of the URIs of a backfill
+        
+    Returns:
+        List[Dict[str, Any]]: Job definitions for run_job_graph: load, partitions and merge
+    """
+    partition_field = file_config["partition_field"]
+    incoming_id = incoming_table_id or f"{table_id}{INCOMING_TABLE_SUFFIX}"
+    memo = {} if memo is None else memo
+    uris = [uri] if isinstance(uri, str) else list(uri)
+    if not uris:
+        raise ValueError(f"No Parquet data to load into {table_id}")
+    # Hive-partitioned URIs take the date from their paths, the others hold it
+    hive_uris = [value for value in uris if hive_prefix and value.startswith(f"{hive_prefix}/")]
+    plain_uris = [value for value in uris if value not in hive_uris]
+    if day_prefix and hive_uris:
+        raise ValueError(f"Loads of several days require the single-file layout: {table_id}")
+
+    def submit_load(source_uris: List[str], hive: bool, truncate: bool) -> bigquery.LoadJob:
+        table = bigquery.Table(table_id, schema=file_config["schema"])
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY,
+            field=partition_field
+        )
+        bq_client.create_table(table, exists_ok=True)
+
+        # Load the new data next to the target
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE if truncate
+            else bigquery.WriteDisposition.WRITE_APPEND
+        )
+        if hive:
+            # Column types come from the Parquet files, the date from the paths
+            hive_options = bigquery.HivePartitioningOptions()
+            hive_options.mode = "CUSTOM"
+            hive_options.source_uri_prefix = f"{hive_prefix}/{{{partition_field}:DATE}}"
+            job_config.hive_partitioning = hive_options
+        elif day_prefix:
+            # Column types come from the Parquet files, the day of each row from its folder
+            hive_options = bigquery.HivePartitioningOptions()
+            hive_options.mode = "CUSTOM"
+            hive_options.source_uri_prefix = day_prefix + "".join(f"/{{{key}:INTEGER}}" for key in DAY_PATH_KEYS)
+            job_config.hive_partitioning = hive_options
+        elif truncate:
+            job_config.schema = file_config["schema"]
+        return bq_client.load_table_from_uri(source_uris, incoming_id, job_config=job_config)
+
+    def expire_incoming(job: bigquery.LoadJob) -> None:
+        incoming = bq_client.get_table(incoming_id)
+        incoming.expires = datetime.utcnow() + INCOMING_TABLE_EXPIRATION
+        bq_client.update_table(incoming, ["expires"])
+
+    # Work out which partitions the new data touches
+    def submit_partitions() -> bigquery.QueryJob:
+        return bq_client.query(f"SELECT DISTINCT {partition_field} AS partition FROM `{incoming_id}`")
+
+    def read_partitions(job: bigquery.QueryJob) -> None:
+        values = [row.partition for row in job.result()]
+        memo["partitions"] = [value.isoformat() for value in sorted(value for value in values if value is not None)] \
+            + ([NULL_PARTITION] if None in values else [])
+
+    def submit_merge() -> bigquery.QueryJob:
+        dates, include_null = split_partitions(memo["partitions"])
+        columns = ", ".join(field.name for field in file_config["schema"])
+        source_sql = f"SELECT {columns} FROM `{incoming_id}`"
+        if day_prefix:
+            # Only the latest day holding a partition replaces it
+            latest = ", ".join(f"{key} DESC" for key in DAY_PATH_KEYS)
+            source_sql = f"""
+            SELECT {columns} FROM (
+                SELECT *, DENSE_RANK() OVER (PARTITION BY {partition_field} ORDER BY {latest}) AS day_rank
+                FROM `{incoming_id}`
+            )
+            WHERE day_rank = 1
+            """
+        return replace_partitions(
+            bq_client,
+            table_id,
+            source_sql,
+            partition_field,
+            dates,
+            include_null=include_null,
+            wait=False
+        )
+
+    loads = []
+    if hive_uris:
+        loads.append({"name": f"{incoming_id}:load", "submit": lambda: submit_load(hive_uris, hive=True, truncate=True)})
+    if plain_uris:
+        # Appended after the Hive-partitioned data, if any
+        loads.append({
+            "name": f"{incoming_id}:load_undated" if loads else f"{incoming_id}:load",
+            "submit": lambda: submit_load(plain_uris, hive=False, truncate=not hive_uris),
+            "depends_on": [job["name"] for job in loads]
+        })
+    loads[0]["on_done"] = expire_incoming
+    return loads + [
+        {
+            "name": f"{incoming_id}:partitions",
+            "submit": submit_partitions,
+            "depends_on": [loads[-1]["name"]],
+            "on_done": read_partitions
+        },
+        {"name": f"{table_id}:merge", "submit": submit_merge, "depends_on": [f"{incoming_id}:partitions"]}
+    ]
+
+def plan_table_load(
+    bq_client: bigquery.Client,
+    file_config: Dict[str, Any],
+    table_id: str,
+    uri: Union[str, List[str]]
+) -> List[Dict[str, Any]]:
+    """
+    Plan the replacement of a whole table with a Parquet file.
+    
+    Args:
+        bq_client: BigQuery client
+        file_config: Configuration for the file
+        table_id: Target table ID
+        uri: GCS URI(s) of the Parquet data
+        
+    Returns:
+        List[Dict[str, Any]]: Job definition of the load for run_job_graph
+    """
+    def submit_load() -> bigquery.LoadJob:
         # Delete existing table if it exists
         try:
             bq_client.get_table(table_id)
@@ -196,27 +1185,283 @@ def load_to_bigquery(
                 field="start_date"
             ) if file_config["name"] == "aws_data_desafio.csv" else None
         )
+        return bq_client.load_table_from_uri(uri, table_id, job_config=job_config)
+
+    return [{"name": f"{table_id}:load", "submit": submit_load}]
+
+def plan_load(
+    bq_client: bigquery.Client,
+    file_config: Dict[str, Any],
+    table_id: str,
+    uri: Union[str, List[str]],
+    hive_prefix: Optional[str] = None,
+    incoming_table_id: Optional[str] = None,
+    memo: Optional[Dict[str, Any]] = None,
+    day_prefix: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the load of data from GCS to BigQuery.
+    
+    Files with ``"load_mode": "incremental"`` only replace the partitions
+    they contain, see plan_incremental_load; other files replace the whole
+    table, see plan_table_load.
+    
+    Args:
+        bq_client: BigQuery client
+        file_config: Configuration for the file
+        table_id: Target table ID
+        uri: GCS URI(s) of the Parquet data
+        hive_prefix: gs:// prefix of a Hive-partitioned layout the URIs point into
+        incoming_table_id: Staging table of an incremental load, see plan_incremental_load
+        memo: Filled with "partitions", the replaced partitions, None if the
+            whole table is replaced
+        day_prefix: gs:// prefix of the day folders of the URIs of a
+            backfill, see plan_incremental_load
+        
+    Returns:
+        List[Dict[str, Any]]: Job definitions for run_job_graph
+    """
+    if file_config.get("load_mode") == "incremental":
+        return plan_incremental_load(
+            bq_client, file_config, table_id, uri, hive_prefix, incoming_table_id, memo, day_prefix
+        )
+    if memo is not None:
+        memo["partitions"] = None
+    return plan_table_load(bq_client, file_config, table_id, uri)
 
-        load_job = bq_client.load_table_from_uri(uri, table_id, job_config=job_config)
-        load_job.result()
-        logger.info(f"Data loaded to BigQuery: {table_id}")
+def load_to_bigquery(
+    bq_client: bigquery.Client,
+    file_config: Dict[str, Any],
+    table_id: str,
+    uri: Union[str, List[str]],
+    hive_prefix: Optional[str] = None,
+    recorder: Optional[JobRecorder] = None,
+    incoming_table_id: Optional[str] = None
+) -> Optional[List[str]]:
+    """
+    Load data from GCS to BigQuery, see plan_load.
+    
+    Args:
+        bq_client: BigQuery client
+        file_config: Configuration for the file
+        table_id: Target table ID
+        uri: GCS URI(s) of the Parquet data
+        hive_prefix: gs:// prefix of a Hive-partitioned layout the URIs point into
+        recorder: Optional recorder of the statistics of the jobs run
+        incoming_table_id: Staging table of an incremental load, see plan_incremental_load
+        
+    Returns:
+        Optional[List[str]]: Replaced partitions, None if the whole table was replaced
+        
+    Raises:
+        AirflowException: If loading fails
+    """
+    memo = {}
+    try:
+        run_job_graph(
+            plan_load(bq_client, file_config, table_id, uri, hive_prefix, incoming_table_id, memo),
+            recorder=recorder
+        )
+        partitions = memo["partitions"]
+        if partitions is None:
+            logger.info(f"Data loaded to BigQuery: {table_id}")
+        else:
+            logger.info(f"Data loaded to BigQuery: {table_id} ({len(partitions)} partition(s) replaced)")
+        return partitions
     except Exception as e:
         error_msg = f"Failed to load data to BigQuery: {str(e)}"
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
+def convert_to_parquet(
+    storage_client: storage.Client,
+    file_config: Dict[str, Any],
+    source_path: str,
+    stage_bucket: storage.Bucket,
+    parquet_path: str,
+    profile: Optional[DQProfile] = None,
+    shard: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """
+    Convert a raw file to Parquet with the path and layout configured for it.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        file_config: Configuration for the file
+        source_path: Path to the file in the raw bucket
+        stage_bucket: GCS bucket for staging
+        parquet_path: Path to save the Parquet file (single-file layout)
+        profile: Data quality profile fed with the converted data, so the
+            checks need no scan of the loaded table
+        shard: Optional date shard (streaming CSV only), only its rows are converted
+        
+    Returns:
+        List[str]: GCS URIs of the Parquet data written
+    """
+    file_name = file_config["name"]
+    if shard is not None and not (file_config.get("streaming") and file_name.endswith(".csv")):
+        raise ValueError(f"Date shards require streaming CSV conversion: {file_name}")
+    if file_config.get("layout") == "hive":
+        if not (file_config.get("streaming") and file_name.endswith(".csv")):
+            raise ValueError(f"Hive layout requires streaming CSV conversion: {file_name}")
+        prefix = hive_uri_prefix(file_name.split(".")[0])
+        batch_size = file_config.get("batch_size", STREAM_BATCH_SIZE)
+        with open_csv_batches(storage_client, file_config, source_path, batch_size) as (schema, batches), \
+                span("convert", layout="hive") as convert:
+            if shard is not None:
+                batches = filter_shard(batches, file_config["partition_field"], shard)
+            if profile is not None:
+                batches = profile.observe(batches)
+            partitions = write_hive_partitioned(batches, schema, prefix, file_config["partition_field"])
+            convert.set(partitions=len(partitions))
+        uris = hive_partition_uris(prefix, file_config["partition_field"], partitions)
+        if not uris:
+            raise ValueError(f"No rows to write for {file_name}")
+        return uris
+
+    if file_config.get("streaming") and file_name.endswith(".json"):
+        # Parse records incrementally, memory bounded by the batch rows
+        stream_json_to_parquet(
+            storage_client,
+            source_path,
+            stage_bucket,
+            parquet_path,
+            batch_rows=file_config.get("batch_rows", JSON_BATCH_ROWS),
+            dictionary_columns=file_config.get("dictionary_columns"),
+            profile=profile
+        )
+    elif file_config.get("streaming"):
+        # Convert batch by batch, memory bounded by the batch size
+        stream_csv_to_parquet(
+            storage_client,
+            file_config,
+            source_path,
+            stage_bucket,
+            parquet_path,
+            batch_size=file_config.get("batch_size", STREAM_BATCH_SIZE),
+            profile=profile,
+            shard=shard
+        )
+    else:
+        # Read and process file, with the types of the configured schema if there is one
+        schema = None
+        string_columns = None
+        if file_config["schema"]:
+            schema = build_arrow_schema(file_config["schema"], file_config.get("dictionary_columns"))
+            string_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+        df = read_file_data(storage_client, file_name, source_path, file_config.get("dictionary_columns"), string_columns)
+        
+        # Save as Parquet
+        save_as_parquet(df, stage_bucket, parquet_path, profile=profile, schema=schema)
+    return [f"gs://{STAGE_BUCKET_NAME}/{parquet_path}"]
+
+def conversion_fingerprint(file_config: Dict[str, Any]) -> str:
+    """
+    Fingerprint of how a file is converted and loaded.
+    
+    Hashes CONVERSION_VERSION with the file configuration, schema
+    included, so Parquet data and loads recorded in the manifest are not
+    reused once the conversion code or the configuration changes.
+    
+    Args:
+        file_config: Configuration for the file
+        
+    Returns:
+        str: SHA-256 hex digest
+    """
+    config = {
+        key: [field.to_api_repr() for field in value] if key == "schema" else value
+        for key, value in file_config.items()
+    }
+    payload = json.dumps({"version": CONVERSION_VERSION, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def parquet_uris_exist(storage_client: storage.Client, uris: List[str]) -> bool:
+    """
+    Check that every Parquet URI still has data in GCS.
+    
+    Args:
+        storage_client: Google Cloud Storage client
+        uris: Object URIs or ``.../*`` wildcard URIs
+        
+    Returns:
+        bool: True if all objects (or at least one object per wildcard) exist
+    """
+    for uri in uris:
+        bucket_name, _, path = uri.replace("gs://", "", 1).partition("/")
+        bucket = storage_client.bucket(bucket_name)
+        if path.endswith("*"):
+            if next(iter(storage_client.list_blobs(bucket, prefix=path.rstrip("*"), max_results=1)), None) is None:
+                return False
+        elif not bucket.blob(path).exists():
+            return False
+    return bool(uris)
+
+def table_exists(bq_client: bigquery.Client, table_id: str) -> bool:
+    """
+    Check whether a BigQuery table exists.
+    
+    Args:
+        bq_client: BigQuery client
+        table_id: Table ID
+        
+    Returns:
+        bool: True if the table exists
+    """
+    try:
+        bq_client.get_table(table_id)
+        return True
+    except NotFound:
+        return False
+
 def process_file(
     clients: Dict,
     file_config: Dict[str, Any],
-    today: str
-) -> None:
+    day_path: str,
+    force_refresh: bool = False,
+    recorder: Optional[JobRecorder] = None,
+    shard: Optional[Dict[str, Any]] = None,
+    backfill: bool = False,
+    run_id: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Process a single file through the pipeline.
+    Process a single file, or one date shard of it, through the pipeline.
+    
+    A retry of the same DAG run resumes at the first stage the run has not
+    completed for the file, per the run's checkpoint: a loaded file returns
+    the result of its load, and a converted one reuses its Parquet data,
+    as long as the raw object is unchanged.
+    
+    The source manifest is checked before each step: conversion is skipped
+    when Parquet data built from a raw object with the same crc32c, and
+    with the same conversion_fingerprint, still exists, and the load is
+    skipped when the table already holds that data.
+    The data quality checks of the stage table are computed while
+    converting and kept in the manifest next to the Parquet URIs.
+    With the Hive layout an external table over the partitioned files is
+    kept defined next to the loaded table. A date shard has its own Parquet
+    data, manifest and incoming table, so the shards of a file can be
+    processed at the same time and each replaces only its own partitions;
+    its data is normally converted with the other shards when planning,
+    see file_shards.
+    A backfill day is only converted, with a manifest of its own, and is
+    loaded together with the other days of the range, see load_backfill.
     
     Args:
         clients: Dictionary of initialized clients
         file_config: Configuration for the file
-        today: Date string in YYYY/MM/DD format
+        day_path: Date folder of the raw file (YYYY/MM/DD)
+        force_refresh: Convert and load even if the inputs are unchanged
+        recorder: Optional recorder of the statistics of the BigQuery jobs run
+        shard: Optional date shard (see date_shards) of an incrementally loaded file
+        backfill: Convert without loading, as one day of a backfill
+        run_id: Airflow run ID whose checkpoint records the completed stages
+        
+    Returns:
+        Dict[str, Any]: Loaded table, the partitions that changed in it (an
+            empty list if nothing changed, None if the whole table did) and
+            the data quality results of the loaded data. A backfill day has
+            no partitions yet but its Parquet URIs, file and date folder.
         
     Raises:
         AirflowException: If processing fails
@@ -224,50 +1469,652 @@ def process_file(
     try:
         file_name = file_config["name"]
         base_name = file_name.split(".")[0]
-        source_path = f"{base_name}/{today}/{file_name}"
-        parquet_path = f"{base_name}/{today}/{base_name}.parquet"
+        if shard is not None and file_config.get("load_mode") != "incremental":
+            raise ValueError(f"Date shards require incremental loading: {file_name}")
+        if backfill and file_config.get("layout") == "hive":
+            raise ValueError(f"Backfills require the single-file layout, days would replace each other's partitions: {file_name}")
+        unit_name = f"{base_name}__{shard_suffix(shard)}" if shard else base_name
+        manifest_name = f"{unit_name}__{day_path.replace('/', '')}" if backfill else unit_name
+        source_path = f"{base_name}/{day_path}/{file_name}"
+        parquet_path = f"{base_name}/{day_path}/{unit_name}.parquet"
 
-        # Read and process file
-        df = read_file_data(clients['storage'], file_name, source_path)
-        
-        # Save as Parquet
+        raw_bucket = clients['storage'].bucket(RAW_BUCKET_NAME)
         stage_bucket = clients['storage'].bucket(STAGE_BUCKET_NAME)
-        save_as_parquet(df, stage_bucket, parquet_path)
-        
+        raw_blob = raw_bucket.get_blob(source_path)
+        if raw_blob is None:
+            raise ValueError(f"Raw file not found: gs://{RAW_BUCKET_NAME}/{source_path}")
+        manifest = {} if force_refresh else load_manifest(raw_bucket, manifest_name)
+        checkpoint_key = f"{source_path}#{shard_suffix(shard)}" if shard else source_path
+        checkpoints = load_checkpoints(raw_bucket, run_id)
+
         # Load to BigQuery with new table names
-        table_mapping = {
-            "aws_data_desafio": "stage_aws_billing",
-            "lista_precios": "stage_aws_prices"
-        }
-        table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_mapping[base_name]}"
-        uri = f"gs://{STAGE_BUCKET_NAME}/{parquet_path}"
-        load_to_bigquery(clients['bigquery'], file_config, table_id, uri)
+        table_name = TABLE_NAMES[base_name]
+        table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+        incoming_id = incoming_table_id(table_id, run_id, shard)
+        hive_prefix = hive_uri_prefix(base_name) if file_config.get("layout") == "hive" else None
+        conversion = conversion_fingerprint(file_config)
+
+        loaded = completed_stage(checkpoints, checkpoint_key, TABLE_LOADED)
+        if loaded and not backfill and loaded["source_crc32c"] == raw_blob.crc32c:
+            logger.info(f"{file_name} already loaded by this run into {table_id}")
+            return loaded["result"]
+
+        written = completed_stage(checkpoints, checkpoint_key, PARQUET_WRITTEN)
+        uris = manifest.get("parquet_uris")
+        dq_results = manifest.get("dq_results")
+        if written and written["source_crc32c"] == raw_blob.crc32c and written.get("conversion") == conversion \
+                and parquet_uris_exist(clients['storage'], written["parquet_uris"]):
+            uris = written["parquet_uris"]
+            dq_results = written["dq_results"]
+            logger.info(f"{file_name} already converted by this run, reusing Parquet data {', '.join(uris)}")
+        elif is_unchanged(manifest, {"parquet_source_crc32c": raw_blob.crc32c, "parquet_conversion": conversion}) \
+                and uris \
+                and dq_results is not None \
+                and parquet_uris_exist(clients['storage'], uris):
+            logger.info(f"{file_name} unchanged, reusing Parquet data {', '.join(uris)}")
+        else:
+            profile = DQProfile(DQ_RULES.get(table_name, []))
+            uris = convert_to_parquet(
+                clients['storage'],
+                file_config,
+                source_path,
+                stage_bucket,
+                parquet_path,
+                profile=profile,
+                shard=shard
+            )
+            manifest = update_manifest(
+                raw_bucket,
+                manifest_name,
+                parquet_uris=uris,
+                parquet_source_crc32c=raw_blob.crc32c,
+                parquet_conversion=conversion,
+                dq_results=profile.results(),
+                dq_num_rows=profile.num_rows
+            )
+            dq_results = manifest["dq_results"]
+            record_stage(
+                raw_bucket,
+                run_id,
+                checkpoint_key,
+                PARQUET_WRITTEN,
+                source_crc32c=raw_blob.crc32c,
+                conversion=conversion,
+                parquet_uris=uris,
+                dq_results=dq_results
+            )
+        if backfill:
+            return {
+                "table_id": table_id,
+                "partitions": None,
+                "dq_results": dq_results,
+                "file_name": file_name,
+                "day_path": day_path,
+                "parquet_uris": uris,
+                "backfill": True
+            }
+        if hive_prefix:
+            create_external_table(
+                clients['bigquery'],
+                f"{table_id}{EXTERNAL_TABLE_SUFFIX}",
+                hive_prefix,
+                file_config["partition_field"]
+            )
+
+        if not force_refresh \
+                and is_unchanged(manifest, {
+                    "loaded_source_crc32c": raw_blob.crc32c,
+                    "loaded_conversion": conversion,
+                    "loaded_table_id": table_id
+                }) \
+                and table_exists(clients['bigquery'], table_id):
+            logger.info(f"{file_name} unchanged, {table_id} is up to date")
+            return {"table_id": table_id, "partitions": [], "dq_results": dq_results}
+
+        partitions = load_to_bigquery(
+            clients['bigquery'], file_config, table_id, uris, hive_prefix, recorder, incoming_id
+        )
+        update_manifest(
+            raw_bucket,
+            manifest_name,
+            loaded_source_crc32c=raw_blob.crc32c,
+            loaded_conversion=conversion,
+            loaded_table_id=table_id
+        )
+        result = {"table_id": table_id, "partitions": partitions, "dq_results": dq_results}
+        record_stage(raw_bucket, run_id, checkpoint_key, TABLE_LOADED, source_crc32c=raw_blob.crc32c, result=result)
+        return result
         
     except Exception as e:
-        error_msg = f"Failed to process file {file_config['name']}: {str(e)}"
+        shard_info = f" ({shard_label(shard)})" if shard else ""
+        error_msg = f"Failed to process file {file_config['name']}{shard_info}: {str(e)}"
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
-def run_pipeline(**context) -> None:
+def file_shards(
+    clients: Dict,
+    file_config: Dict[str, Any],
+    day_path: str,
+    force_refresh: bool = False,
+    run_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
-    Run the complete pipeline for all files.
+    Date shards of a file configured with ``"shard_months"``.
+    
+    The file is converted once for all its shards, see convert_shards. The
+    Parquet data and DQ results of each shard are kept in the manifest of
+    the shard and in the run's checkpoint, where process_file picks them up
+    instead of reading the raw file again. The shards are kept in the
+    manifest of the file, so unchanged files are not read again.
     
     Args:
+        clients: Dictionary of initialized clients
+        file_config: Configuration for the file
+        day_path: Date folder of the raw file (YYYY/MM/DD)
+        force_refresh: Convert the file even if its shards are in the manifest
+        run_id: Airflow run ID whose checkpoint records the converted shards
+        
+    Returns:
+        List[Dict[str, Any]]: Shards as returned by convert_shards, empty
+            if the file has no rows
+    """
+    file_name = file_config["name"]
+    if not (file_config.get("streaming") and file_name.endswith(".csv")) \
+            or file_config.get("load_mode") != "incremental":
+        raise ValueError(f"Date shards require streaming CSV conversion and incremental loading: {file_name}")
+
+    base_name = file_name.split(".")[0]
+    source_path = f"{base_name}/{day_path}/{file_name}"
+    raw_bucket = clients['storage'].bucket(RAW_BUCKET_NAME)
+    raw_blob = raw_bucket.get_blob(source_path)
+    if raw_blob is None:
+        raise ValueError(f"Raw file not found: gs://{RAW_BUCKET_NAME}/{source_path}")
+
+    months = file_config["shard_months"]
+    conversion = conversion_fingerprint(file_config)
+    manifest = {} if force_refresh else load_manifest(raw_bucket, base_name)
+    if is_unchanged(manifest, {
+                "shards_source_crc32c": raw_blob.crc32c,
+                "shard_months": months,
+                "shards_conversion": conversion
+            }) \
+            and manifest.get("shards") is not None:
+        return manifest["shards"]
+
+    with span("convert_shards", file=file_name):
+        converted = convert_shards(
+            clients['storage'],
+            file_config,
+            source_path,
+            clients['storage'].bucket(STAGE_BUCKET_NAME),
+            f"{base_name}/{day_path}/{base_name}"
+        )
+    shards = []
+    for shard in converted:
+        uris = shard.pop("parquet_uris")
+        dq_results = shard.pop("dq_results")
+        dq_num_rows = shard.pop("dq_num_rows")
+        update_manifest(
+            raw_bucket,
+            f"{base_name}__{shard_suffix(shard)}",
+            parquet_uris=uris,
+            parquet_source_crc32c=raw_blob.crc32c,
+            parquet_conversion=conversion,
+            dq_results=dq_results,
+            dq_num_rows=dq_num_rows
+        )
+        record_stage(
+            raw_bucket,
+            run_id,
+            f"{source_path}#{shard_suffix(shard)}",
+            PARQUET_WRITTEN,
+            source_crc32c=raw_blob.crc32c,
+            conversion=conversion,
+            parquet_uris=uris,
+            dq_results=dq_results
+        )
+        shards.append(shard)
+    update_manifest(
+        raw_bucket,
+        base_name,
+        shards=shards,
+        shards_source_crc32c=raw_blob.crc32c,
+        shard_months=months,
+        shards_conversion=conversion
+    )
+    logger.info(f"{file_name} converted into {len(shards)} shard(s) of {months} month(s)")
+    return shards
+
+def plan_staging_units(
+    clients: Dict,
+    day_paths: List[str],
+    force_refresh: bool = False,
+    backfill: bool = False,
+    run_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Independent units of staging work.
+    
+    A run of one day has one unit per file, or per date shard of a file
+    configured with ``"shard_months"``. A backfill has one unit per file
+    and day, each only converted, see load_backfill. Each unit holds the
+    keyword arguments of run_staging_unit, so a list of units can be
+    expanded into mapped tasks directly.
+    
+    Args:
+        clients: Dictionary of initialized clients
+        day_paths: Date folders of the raw files (YYYY/MM/DD)
+        force_refresh: Ignore the shards kept in the manifests
+        backfill: Plan the days of a backfill
+        run_id: Airflow run ID whose checkpoint records the converted shards
+        
+    Returns:
+        List[Dict[str, Any]]: Units with "unit" (a display name), "file_name",
+            "day_path", "shard" (None for a whole file) and "backfill"
+    """
+    units = []
+    for file_config in FILES:
+        file_name = file_config["name"]
+        if backfill:
+            for day_path in day_paths:
+                units.append({
+                    "unit": f"{file_name} {day_path.replace('/', '-')}",
+                    "file_name": file_name,
+                    "day_path": day_path,
+                    "shard": None,
+                    "backfill": True
+                })
+            continue
+
+        for day_path in day_paths:
+            shards = file_shards(clients, file_config, day_path, force_refresh, run_id) if file_config.get("shard_months") else []
+            for shard in shards or [None]:
+                units.append({
+                    "unit": f"{file_name} {shard_label(shard)}" if shard else file_name,
+                    "file_name": file_name,
+                    "day_path": day_path,
+                    "shard": shard,
+                    "backfill": False
+                })
+    return units
+
+def list_staging_units(force_refresh: bool = False, **context) -> List[Dict[str, Any]]:
+    """
+    Plan the staging units of a DAG run for dynamically mapped staging tasks.
+    
+    The days come from the run (see run_dates) and are fixed here, so every
+    mapped task (and its retries) stages the same raw files.
+    
+    Args:
+        force_refresh: Ignore the manifests, also set by a DAG run
+            triggered with ``{"force_refresh": true}``
         context: Airflow context dictionary containing execution context
         
+    Returns:
+        List[Dict[str, Any]]: Units as returned by plan_staging_units
+        
     Raises:
-        AirflowException: If pipeline execution fails
+        AirflowException: If planning fails
+    """
+    try:
+        with trace("plan_staging", context):
+            with span("setup_clients"):
+                clients = initialize_clients()
+            units = plan_staging_units(
+                clients,
+                [date_path(day) for day in run_dates(context)],
+                force_refresh or force_refresh_requested(context),
+                backfill_requested(context),
+                context.get('run_id')
+            )
+            logger.info(f"Planned {len(units)} staging unit(s): {', '.join(unit['unit'] for unit in units)}")
+            return units
+    except Exception as e:
+        error_msg = f"Failed to plan staging: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
+
+def file_config_by_name(file_name: str) -> Dict[str, Any]:
+    """
+    Configuration of a file in FILES.
+    
+    Args:
+        file_name: File name (e.g. "aws_data_desafio.csv")
+        
+    Returns:
+        Dict[str, Any]: File configuration
+        
+    Raises:
+        ValueError: If the file is not configured
+    """
+    for file_config in FILES:
+        if file_config["name"] == file_name:
+            return file_config
+    raise ValueError(f"Unknown file: {file_name}")
+
+def run_staging_unit(
+    unit: str,
+    file_name: str,
+    day_path: str,
+    shard: Optional[Dict[str, Any]] = None,
+    backfill: bool = False,
+    force_refresh: bool = False,
+    **context
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert and load one staging unit, as one mapped task of a DAG run.
+    
+    The statistics of the BigQuery jobs run are written to the job metrics
+    table and the stages are traced and summarized in XCom, per unit.
+    
+    Args:
+        unit: Display name of the unit, the key of the result
+        file_name: File to stage
+        day_path: Date folder of the raw file (YYYY/MM/DD)
+        shard: Optional date shard of the file
+        backfill: Only convert, as one day of a backfill
+        force_refresh: Ignore the source manifests, also set by a DAG run
+            triggered with ``{"force_refresh": true}``
+        context: Airflow context dictionary containing execution context
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Result of process_file by unit, pushed to
+            XCom in the same shape as run_pipeline, see get_staging_result
+        
+    Raises:
+        AirflowException: If staging fails
+    """
+    try:
+        with trace("convert_to_parquet", context):
+            with span("setup_clients"):
+                clients = initialize_clients()
+            recorder = JobRecorder(context.get('run_id'))
+            try:
+                with span("process_file", file=file_name, shard=shard_suffix(shard) if shard else None):
+                    result = process_file(
+                        clients,
+                        file_config_by_name(file_name),
+                        day_path,
+                        force_refresh or force_refresh_requested(context),
+                        recorder,
+                        shard,
+                        backfill,
+                        context.get('run_id')
+                    )
+                return {unit: result}
+            finally:
+                recorder.flush(clients['bigquery'], metrics_table_id(PROJECT_ID, DATASET_ID))
+    except Exception as e:
+        error_msg = f"Staging {unit} failed: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
+
+def backfill_days(results: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Converted days of each file that a backfill loads.
+    
+    Every day of an incrementally loaded file is loaded; a day's file may
+    repeat the dates of earlier days, so each partition is taken from the
+    latest day holding it, see plan_incremental_load. A file loaded as a
+    whole table is replaced by its last day.
+    
+    Args:
+        results: process_file results of the backfill days
+        
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Results of the days to load by file name, in date order
+    """
+    days_by_file = {}
+    for result in sorted(results, key=lambda result: result["day_path"]):
+        days_by_file.setdefault(result["file_name"], []).append(result)
+    return {
+        file_name: days if file_config_by_name(file_name).get("load_mode") == "incremental" else days[-1:]
+        for file_name, days in sorted(days_by_file.items())
+    }
+
+def plan_backfill_load(
+    bq_client: bigquery.Client,
+    results: List[Dict[str, Any]],
+    memo: Dict[str, Any],
+    run_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the load of the Parquet data converted for the days of a backfill.
+    
+    Each file goes into its table with a single multi-URI load job (and one
+    MERGE when incremental, taking each partition from the latest day)
+    instead of one load per day, see backfill_days. The tables are loaded
+    concurrently.
+    
+    Args:
+        bq_client: BigQuery client
+        results: process_file results of the backfill days
+        memo: Filled with the load outcome of each file by name, see plan_load
+        run_id: Airflow run ID, scopes the incoming tables to the run
+        
+    Returns:
+        List[Dict[str, Any]]: Job definitions for run_job_graph
+    """
+    jobs = []
+    for file_name, days in backfill_days(results).items():
+        uris = [uri for day in days for uri in day["parquet_uris"]]
+        logger.info(f"Backfilling {days[0]['table_id']} from {len(days)} day(s) with one load of {len(uris)} URI(s)")
+        jobs += plan_load(
+            bq_client,
+            file_config_by_name(file_name),
+            days[0]["table_id"],
+            uris,
+            incoming_table_id=incoming_table_id(days[0]["table_id"], run_id),
+            memo=memo.setdefault(file_name, {}),
+            day_prefix=f"gs://{STAGE_BUCKET_NAME}/{file_name.split('.')[0]}"
+        )
+    return jobs
+
+def backfill_load_results(
+    storage_client: storage.Client,
+    results: List[Dict[str, Any]],
+    memo: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Outcome of a finished backfill load.
+    
+    The load fingerprints of the files are cleared from their manifests, so
+    the next daily run loads its data again over the backfilled partitions.
+    
+    The data quality results of a file loaded from a single day are that
+    day's. Days that repeat a partition are loaded only in part (see
+    backfill_days), so the sum of their counts would not match the loaded
+    rows; those files get no results and are checked with a query.
+    
+    Args:
+        storage_client: GCS client
+        results: process_file results of the backfill days
+        memo: Memo filled by plan_backfill_load
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: By file name, the loaded table, the
+            partitions replaced in it (None if the whole table was) and
+            the data quality results of the loaded rows, None if unknown
+    """
+    loaded = {}
+    for file_name, days in backfill_days(results).items():
+        clear_load_fingerprints(storage_client.bucket(RAW_BUCKET_NAME), file_name.split(".")[0])
+        loaded[file_name] = {
+            "table_id": days[0]["table_id"],
+            "partitions": memo[file_name]["partitions"],
+            "dq_results": days[0].get("dq_results") if len(days) == 1 else None
+        }
+    return loaded
+
+def load_backfill(
+    clients: Dict,
+    results: List[Dict[str, Any]],
+    recorder: Optional[JobRecorder] = None,
+    run_id: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the Parquet data converted for the days of a backfill.
+    
+    See plan_backfill_load and backfill_load_results.
+    
+    Args:
+        clients: Dictionary of initialized clients
+        results: process_file results of the backfill days
+        recorder: Optional recorder of the statistics of the BigQuery jobs run
+        run_id: Airflow run ID, scopes the incoming tables to the run
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Loaded table, replaced partitions and data quality results by file name
+    """
+    memo = {}
+    run_job_graph(plan_backfill_load(clients['bigquery'], results, memo, run_id), recorder=recorder)
+    return backfill_load_results(clients['storage'], results, memo)
+
+def backfill_results(context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Results of the mapped staging tasks of a backfill run.
+    
+    Args:
+        context: Airflow context dictionary
+        
+    Returns:
+        List[Dict[str, Any]]: process_file results of the converted days, empty if the run is not a backfill
     """
+    return [result for result in pull_staging_results(context, STAGING_TASK_ID) if result.get("backfill")]
+
+def run_backfill_load(**context) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Load the days converted by the mapped staging tasks of a backfill run.
+    
+    Args:
+        context: Airflow context dictionary containing execution context
+        
+    Returns:
+        Optional[Dict[str, Dict[str, Any]]]: Result of load_backfill, pushed
+            to XCom and read by get_staging_result; None if the run is not
+            a backfill
+        
+    Raises:
+        AirflowException: If loading fails
+    """
+    results = backfill_results(context)
+    if not results:
+        logger.info("Not a backfill run, the staging tasks loaded their data")
+        return None
+
     try:
-        # Initialize clients
-        clients = initialize_clients()
+        with trace("load_backfill", context):
+            with span("setup_clients"):
+                clients = initialize_clients()
+            recorder = JobRecorder(context.get('run_id'))
+            try:
+                return load_backfill(clients, results, recorder, context.get('run_id'))
+            finally:
+                recorder.flush(clients['bigquery'], metrics_table_id(PROJECT_ID, DATASET_ID))
+    except Exception as e:
+        error_msg = f"Backfill load failed: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
+
+def plan_backfill(memo: Dict[str, Any], **context) -> Dict[str, Any]:
+    """
+    Plan the load of a backfill run as a job graph for BigQueryJobGraphOperator.
+    
+    Args:
+        memo: Load outcome of each file, filled as the jobs finish
+        context: Airflow context dictionary containing execution context
         
-        # Get today's date in YYYY/MM/DD format
-        today = datetime.now().strftime("%Y/%m/%d")
+    Returns:
+        Dict[str, Any]: Job graph plan, see BigQueryJobGraphOperator; its
+            result is that of run_backfill_load
+    """
+    results = backfill_results(context)
+    clients = initialize_clients()
+    if not results:
+        logger.info("Not a backfill run, the staging tasks loaded their data")
+    return {
+        "jobs": plan_backfill_load(clients['bigquery'], results, memo, context.get('run_id')),
+        "client": clients['bigquery'],
+        "metrics_table": metrics_table_id(PROJECT_ID, DATASET_ID),
+        "result": lambda timings: backfill_load_results(clients['storage'], results, memo) if results else None
+    }
+
+def run_pipeline(
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    force_refresh: bool = False,
+    **context
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the complete pipeline for all files in one process.
+    
+    The staging units (files, date shards or backfill days) are processed
+    concurrently with shared clients, at most ``max_workers`` at a time,
+    and every failed unit is reported; the days of a backfill are then
+    loaded together. The DAG runs each unit as its own mapped task
+    instead, see list_staging_units and run_staging_unit. The statistics of
+    the BigQuery jobs run are written to the job metrics table and the
+    time, bytes and rows of each stage are traced and summarized in XCom.
+    A retry of the run skips the stages each unit already completed, see
+    process_file.
+    
+    Args:
+        max_workers: Maximum number of units processed at the same time
+        force_refresh: Ignore the source manifests, also set by a DAG run
+            triggered with ``{"force_refresh": true}``
+        context: Airflow context dictionary containing execution context
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Result of process_file by unit (of
+            load_backfill by file for a backfill), pushed to XCom so
+            downstream tasks know which partitions changed
         
-        # Process each file
-        for file_config in FILES:
-            process_file(clients, file_config, today)
+    Raises:
+        AirflowException: If pipeline execution fails
+    """
+    try:
+        with trace("convert_to_parquet", context):
+            # Initialize clients
+            with span("setup_clients"):
+                clients = initialize_clients()
+            
+            force_refresh = force_refresh or force_refresh_requested(context)
+            backfill = backfill_requested(context)
+            recorder = JobRecorder(context.get('run_id'))
+            units = plan_staging_units(
+                clients,
+                [date_path(day) for day in run_dates(context)],
+                force_refresh,
+                backfill,
+                context.get('run_id')
+            )
+
+            def process(unit: Dict[str, Any]) -> Dict[str, Any]:
+                shard = unit["shard"]
+                with span("process_file", file=unit["file_name"], shard=shard_suffix(shard) if shard else None):
+                    return process_file(
+                        clients,
+                        file_config_by_name(unit["file_name"]),
+                        unit["day_path"],
+                        force_refresh,
+                        recorder,
+                        shard,
+                        unit["backfill"],
+                        context.get('run_id')
+                    )
+            
+            # Process units concurrently
+            try:
+                results = run_concurrently(
+                    process,
+                    units,
+                    max_workers=max_workers,
+                    key=lambda unit: unit["unit"]
+                )
+                if backfill:
+                    return load_backfill(clients, list(results.values()), recorder, context.get('run_id'))
+                return results
+            finally:
+                recorder.flush(clients['bigquery'], metrics_table_id(PROJECT_ID, DATASET_ID))
             
     except Exception as e:
         error_msg = f"Pipeline execution failed: {str(e)}"
@@ -0,0 +1,204 @@
+from google.cloud import bigquery
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import logging
+
+from scripts.bq_metrics import submit_query
+
+logger = logging.getLogger(__name__)
+
+# Constants
+NULL_PARTITION = "__NULL__"          # Marker for the NULL partition in partition lists
+STAGING_TASK_ID = "convert_to_parquet"
+BACKFILL_LOAD_TASK_ID = "load_backfill"
+
+def split_partitions(partitions: List[str]) -> Tuple[List[date], bool]:
+    """
+    Parse a partition list as produced by the staging step.
+
+    Args:
+        partitions: ISO dates, possibly with NULL_PARTITION
+
+    Returns:
+        Tuple[List[date], bool]: Sorted dates and whether the NULL partition is included
+    """
+    dates = sorted({date.fromisoformat(value) for value in partitions if value != NULL_PARTITION})
+    return dates, NULL_PARTITION in partitions
+
+def merge_staging_results(results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Combine the results of the staging units (date shards) of one table.
+
+    Args:
+        results: process_file results for the same table
+
+    Returns:
+        Optional[Dict[str, Any]]: Result with the union of the changed
+            partitions (None if any unit replaced the whole table) and the
+            summed data quality counts (None if any unit has none), None if
+            there are no results
+    """
+    if len(results) <= 1:
+        return results[0] if results else None
+
+    partitions = None
+    if all(result.get("partitions") is not None for result in results):
+        partitions = sorted({value for result in results for value in result["partitions"]})
+
+    dq_results = None
+    if all(result.get("dq_results") is not None for result in results):
+        totals = {}
+        for result in results:
+            for row in result["dq_results"]:
+                totals[row["check_name"]] = totals.get(row["check_name"], 0) + row["num_issues"]
+        dq_results = [{"check_name": name, "num_issues": count} for name, count in totals.items()]
+
+    return {"table_id": results[0]["table_id"], "partitions": partitions, "dq_results": dq_results}
+
+def pull_staging_results(context: Dict[str, Any], task_id: str = STAGING_TASK_ID) -> List[Dict[str, Any]]:
+    """
+    Every result pushed by a staging task of this DAG run.
+
+    The staging task is mapped over files and date shards, so its XCom is
+    a sequence of ``{unit: result}`` dicts, one per mapped task; a single
+    dict (an unmapped run_pipeline) is read the same way.
+
+    Args:
+        context: Airflow context dictionary
+        task_id: Task whose XCom holds the staging results
+
+    Returns:
+        List[Dict[str, Any]]: Results of every unit, empty if there are none
+    """
+    ti = context.get("ti")
+    pulled = ti.xcom_pull(task_ids=task_id) if ti else None
+    if isinstance(pulled, Mapping):
+        pulled = [pulled]
+    elif not isinstance(pulled, Sequence) or isinstance(pulled, str):
+        return []
+    return [
+        result
+        for results in pulled if isinstance(results, Mapping)
+        for result in results.values() if isinstance(result, dict)
+    ]
+
+def get_staging_result(
+    context: Dict[str, Any],
+    table_name: str,
+    task_id: str = STAGING_TASK_ID
+) -> Optional[Dict[str, Any]]:
+    """
+    Result of the staging task of this DAG run for a stage table.
+
+    The results of every unit of the table are merged. In a backfill run
+    the days are loaded by BACKFILL_LOAD_TASK_ID, whose results are used
+    instead.
+
+    Args:
+        context: Airflow context dictionary
+        table_name: Stage table name (e.g. "stage_aws_billing")
+        task_id: Task whose XCom holds the staging results
+
+    Returns:
+        Optional[Dict[str, Any]]: Merged process_file result for the table,
+            None if there is none
+    """
+    results = pull_staging_results(context, BACKFILL_LOAD_TASK_ID) or pull_staging_results(context, task_id)
+    return merge_staging_results([
+        result for result in results
+        if str(result.get("table_id", "")).endswith(f".{table_name}")
+    ])
+
+def get_changed_partitions(
+    context: Dict[str, Any],
+    table_name: str,
+    task_id: str = STAGING_TASK_ID
+) -> Optional[List[str]]:
+    """
+    Partitions of a stage table changed by the staging task of this DAG run.
+
+    Args:
+        context: Airflow context dictionary
+        table_name: Stage table name (e.g. "stage_aws_billing")
+        task_id: Task whose XCom holds the staging results
+
+    Returns:
+        Optional[List[str]]: Changed partitions, None if unknown or the whole
+            table changed (callers should then rebuild everything)
+    """
+    result = get_staging_result(context, table_name, task_id)
+    return result.get("partitions") if result else None
+
+def build_replace_partitions_merge(target_table: str, source_sql: str, partition_column: str) -> str:
+    """
+    Build a MERGE that atomically replaces a set of partitions.
+
+    Rows of the target whose partition value is in ``@partitions`` (or is
+    NULL when ``@include_null`` is set) are deleted and every source row is
+    inserted, in one statement, so readers never see the partitions empty.
+    The source columns must match the target columns in order.
+
+    Args:
+        target_table: Fully qualified target table
+        source_sql: Query or table reference producing the new rows
+        partition_column: Column the target is partitioned by
+
+    Returns:
+        str: MERGE statement using the ``@partitions`` and ``@include_null`` parameters
+    """
+    return f"""
+    MERGE `{target_table}` T
+    USING ({source_sql}) S
+    ON FALSE
+    WHEN NOT MATCHED BY SOURCE
+        AND (T.{partition_column} IN UNNEST(@partitions) OR (@include_null AND T.{partition_column} IS NULL))
+        THEN DELETE
+    WHEN NOT MATCHED THEN INSERT ROW
+    """
+
+def replace_partitions(
+    client: bigquery.Client,
+    target_table: str,
+    source_sql: str,
+    partition_column: str,
+    partitions: List,
+    include_null: bool = False,
+    partition_type: str = "DATE",
+    query_parameters: Optional[List] = None,
+    wait: bool = True,
+    max_bytes_billed: Optional[int] = None
+) -> bigquery.QueryJob:
+    """
+    Replace the given partitions of a table with the rows of a query.
+
+    Args:
+        client: BigQuery client
+        target_table: Fully qualified target table
+        source_sql: Query producing the new rows of those partitions
+        partition_column: Column the target is partitioned by
+        partitions: Partition values to replace
+        include_null: Also replace the NULL partition
+        partition_type: BigQuery type of the partition values
+        query_parameters: Extra parameters used by ``source_sql``
+        wait: Wait for the MERGE to complete, otherwise return it running
+        max_bytes_billed: Optional byte budget checked with a dry run first
+
+    Returns:
+        bigquery.QueryJob: MERGE job
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter("partitions", partition_type, partitions),
+            bigquery.ScalarQueryParameter("include_null", "BOOL", include_null)
+        ] + (query_parameters or [])
+    )
+    job = submit_query(
+        client,
+        build_replace_partitions_merge(target_table, source_sql, partition_column),
+        job_config=job_config,
+        max_bytes_billed=max_bytes_billed
+    )
+    if wait:
+        job.result()
+        logger.info(f"Replaced {len(partitions) + int(include_null)} partition(s) of {target_table}")
+    return job
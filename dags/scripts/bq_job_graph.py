@@ -0,0 +1,264 @@
+from typing import Any, Dict, List, Optional
+import logging
+import time
+
+from scripts.bq_metrics import JobRecorder
+from scripts.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Constants
+POLL_INTERVAL_SECONDS = 1.0
+
+class JobGraphError(Exception):
+    """Raised when jobs of a graph fail; their dependents are not run"""
+
+    def __init__(self, failures: Dict[str, Exception], skipped: List[str]):
+        self.failures = failures
+        self.skipped = skipped
+        details = "; ".join(f"{name}: {str(error)}" for name, error in failures.items())
+        message = f"{len(failures)} job(s) failed: {details}"
+        if skipped:
+            message += f" (skipped dependents: {', '.join(skipped)})"
+        super().__init__(message)
+
+def validate_job_graph(jobs: List[Dict[str, Any]]) -> None:
+    """
+    Check that job names are unique and dependencies exist and are acyclic.
+
+    Args:
+        jobs: Job definitions (see JobGraph)
+
+    Raises:
+        ValueError: If the graph is invalid
+    """
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate job names in: {', '.join(names)}")
+
+    dependencies = {job["name"]: set(job.get("depends_on", [])) for job in jobs}
+    for name, depends_on in dependencies.items():
+        unknown = depends_on - dependencies.keys()
+        if unknown:
+            raise ValueError(f"Job {name} depends on unknown job(s): {', '.join(sorted(unknown))}")
+
+    resolved = set()
+    while len(resolved) < len(dependencies):
+        ready = [name for name, depends_on in dependencies.items() if name not in resolved and depends_on <= resolved]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(dependencies.keys() - resolved))}")
+        resolved.update(ready)
+
+class JobGraph:
+    """
+    Run of a job graph that can stop while its jobs run and resume later.
+
+    Every job whose dependencies have finished is submitted right away and
+    running jobs are polled without blocking on any single one. When a job
+    fails, its dependents are skipped but independent jobs still run to
+    completion. Each job wait is recorded as a span of the current trace.
+
+    state() returns the progress (finished jobs, timings, IDs of the
+    running jobs) as JSON-compatible data; a JobGraph built from the same
+    definitions with that state picks the running jobs up by ID and goes
+    on, which lets a deferred Airflow task wait in the triggerer instead of
+    a worker.
+
+    Each job definition is a dictionary with:
+        name: Unique job name
+        submit: Callable starting the job and returning it (a QueryJob or
+            LoadJob), or None when there is nothing to run
+        depends_on: Optional names of jobs that must finish first
+        on_done: Optional callable run with the job after it succeeded
+    """
+
+    def __init__(
+        self,
+        jobs: List[Dict[str, Any]],
+        recorder: Optional[JobRecorder] = None,
+        state: Optional[Dict[str, Any]] = None,
+        client: Optional[Any] = None
+    ):
+        """
+        Args:
+            jobs: Job definitions
+            recorder: Optional recorder of the statistics of every finished job
+            state: Progress returned by state() to resume from
+            client: BigQuery client the running jobs of ``state`` are fetched with
+
+        Raises:
+            ValueError: If the graph is invalid
+        """
+        validate_job_graph(jobs)
+        state = state or {}
+        self.recorder = recorder
+        self.started_at = state.get("started_at", time.time())
+        self.timings = state.get("timings", {})
+        self.done = set(state.get("done", []))
+        self.failures = {name: Exception(message) for name, message in state.get("failures", {}).items()}
+        self.skipped = list(state.get("skipped", []))
+        definitions = {job["name"]: job for job in jobs}
+        self.running = {
+            name: (client.get_job(ref["job_id"], project=ref["project"], location=ref["location"]), definitions[name])
+            for name, ref in state.get("running", {}).items()
+        }
+        finished = self.done | self.failures.keys() | set(self.skipped) | self.running.keys()
+        self.pending = {name: job for name, job in definitions.items() if name not in finished}
+
+    @property
+    def finished(self) -> bool:
+        """Whether every job has finished or been skipped"""
+        return not self.pending and not self.running
+
+    def ready(self) -> bool:
+        """Whether a pending job can be submitted now"""
+        return any(set(job.get("depends_on", [])) <= self.done for job in self.pending.values())
+
+    def elapsed(self) -> float:
+        """Seconds since the graph started"""
+        return time.time() - self.started_at
+
+    def _finish(self, name: str, job: Any, state: str, error: Optional[Exception] = None) -> None:
+        offset = self.timings[name]["start_offset_seconds"]
+        self.timings[name] = {
+            "job_id": getattr(job, "job_id", None),
+            "state": state,
+            "start_offset_seconds": round(offset, 3),
+            "seconds": round(self.elapsed() - offset, 3)
+        }
+        logger.info(f"Job {name} {state} after {self.timings[name]['seconds']}s")
+        if self.recorder is not None and job is not None:
+            self.timings[name].update(self.recorder.record(name, job))
+        if job is not None:
+            record_span(
+                "load_job_wait" if getattr(job, "job_type", None) == "load" else "query_wait",
+                int((self.started_at + offset) * 1e9),
+                self.timings[name]["seconds"],
+                error=str(error) if error else None,
+                job=name,
+                job_id=job.job_id,
+                bytes=getattr(job, "total_bytes_processed", None) or getattr(job, "input_file_bytes", None)
+            )
+
+    def advance(self) -> None:
+        """Submit the jobs that are ready and poll the running ones, once"""
+        # Skip jobs that can no longer run, submit the ones that are ready
+        for name, definition in list(self.pending.items()):
+            depends_on = set(definition.get("depends_on", []))
+            if depends_on & (self.failures.keys() | set(self.skipped)):
+                self.skipped.append(name)
+                del self.pending[name]
+            elif depends_on <= self.done:
+                del self.pending[name]
+                self.timings[name] = {"start_offset_seconds": self.elapsed()}
+                try:
+                    job = definition["submit"]()
+                except Exception as e:
+                    logger.error(f"Failed submitting job {name}: {str(e)}")
+                    self._finish(name, None, "failed")
+                    self.failures[name] = e
+                    continue
+                if job is None:
+                    self._finish(name, None, "done")
+                    self.done.add(name)
+                else:
+                    logger.info(f"Submitted job {name}: {job.job_id}")
+                    self.running[name] = (job, definition)
+
+        # Poll the running jobs
+        for name, (job, definition) in list(self.running.items()):
+            try:
+                if not job.done():
+                    continue
+                job.result()  # Raises the job error, if any
+                if definition.get("on_done"):
+                    definition["on_done"](job)
+                self._finish(name, job, "done")
+                self.done.add(name)
+            except Exception as e:
+                logger.error(f"Job {name} failed: {str(e)}")
+                self._finish(name, job, "failed", e)
+                self.failures[name] = e
+            del self.running[name]
+
+    def advance_until_waiting(self) -> None:
+        """Advance until the graph is finished or only waits for running jobs"""
+        self.advance()
+        while not self.finished and (not self.running or self.ready()):
+            self.advance()
+
+    def running_jobs(self) -> List[Dict[str, str]]:
+        """References of the running jobs: job_id, project and location"""
+        return [
+            {"job_id": job.job_id, "project": job.project, "location": job.location}
+            for job, _ in self.running.values()
+        ]
+
+    def state(self) -> Dict[str, Any]:
+        """Progress of the graph as JSON-compatible data, see JobGraph"""
+        return {
+            "started_at": self.started_at,
+            "timings": self.timings,
+            "done": sorted(self.done),
+            "failures": {name: str(error) for name, error in self.failures.items()},
+            "skipped": self.skipped,
+            "running": dict(zip(self.running, self.running_jobs()))
+        }
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Timings of a finished graph.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Timings of each job by name
+
+        Raises:
+            JobGraphError: If any job failed
+        """
+        logger.info(
+            f"Job graph finished in {self.elapsed():.3f}s, "
+            f"{sum(timing.get('seconds', 0) for timing in self.timings.values()):.3f}s of job time"
+        )
+        if self.failures:
+            raise JobGraphError(self.failures, self.skipped)
+        return self.timings
+
+def run_job_graph(
+    jobs: List[Dict[str, Any]],
+    poll_interval: float = POLL_INTERVAL_SECONDS,
+    timeout: Optional[float] = None,
+    recorder: Optional[JobRecorder] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run BigQuery jobs concurrently, each as soon as its dependencies are done.
+
+    The wall time is set by the longest dependency chain rather than the
+    sum of all jobs. See JobGraph for the job definitions.
+
+    Args:
+        jobs: Job definitions
+        poll_interval: Seconds between polls of the running jobs
+        timeout: Optional limit in seconds for the whole graph, after which
+            running jobs are cancelled
+        recorder: Optional recorder of the statistics of every finished job
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings of each job by name: BigQuery job
+            ID, final state, start offset from the start of the graph and
+            duration in seconds, plus the job statistics when recorded
+
+    Raises:
+        ValueError: If the graph is invalid
+        JobGraphError: If any job failed
+        TimeoutError: If the graph did not finish within ``timeout``
+    """
+    graph = JobGraph(jobs, recorder=recorder)
+    while not graph.finished:
+        graph.advance_until_waiting()
+        if timeout is not None and graph.elapsed() > timeout and graph.running:
+            for job, _ in graph.running.values():
+                job.cancel()
+            raise TimeoutError(f"Job graph did not finish within {timeout}s: {', '.join(graph.running)}")
+        if graph.running:
+            time.sleep(poll_interval)
+    return graph.result()
@@ -0,0 +1,223 @@
+from google.cloud import bigquery
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Constants
+METRICS_TABLE_NAME = "bq_job_metrics"
+METRICS_SCHEMA = [
+    bigquery.SchemaField("recorded_at", "TIMESTAMP"),
+    bigquery.SchemaField("run_id", "STRING"),
+    bigquery.SchemaField("job_name", "STRING"),
+    bigquery.SchemaField("job_id", "STRING"),
+    bigquery.SchemaField("job_type", "STRING"),
+    bigquery.SchemaField("statement_type", "STRING"),
+    bigquery.SchemaField("state", "STRING"),
+    bigquery.SchemaField("error", "STRING"),
+    bigquery.SchemaField("total_bytes_processed", "INTEGER"),
+    bigquery.SchemaField("total_bytes_billed", "INTEGER"),
+    bigquery.SchemaField("estimated_bytes", "INTEGER"),
+    bigquery.SchemaField("slot_millis", "INTEGER"),
+    bigquery.SchemaField("cache_hit", "BOOLEAN"),
+    bigquery.SchemaField("duration_seconds", "FLOAT")
+]
+METRICS_CLUSTERING = ["job_name"]
+
+class QueryBudgetExceededError(Exception):
+    """Raised when the dry run of a query estimates more bytes than allowed"""
+
+    def __init__(self, estimated_bytes: int, max_bytes_billed: int):
+        self.estimated_bytes = estimated_bytes
+        self.max_bytes_billed = max_bytes_billed
+        super().__init__(
+            f"Query would process {estimated_bytes} bytes, over the budget of {max_bytes_billed} bytes"
+        )
+
+def estimate_query_bytes(
+    client: bigquery.Client,
+    sql: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None
+) -> int:
+    """
+    Estimate the bytes a query would process with a dry run.
+
+    Args:
+        client: BigQuery client
+        sql: Query to estimate
+        job_config: Job configuration of the query (parameters etc.)
+
+    Returns:
+        int: Estimated bytes processed
+    """
+    dry_run_config = bigquery.QueryJobConfig.from_api_repr(job_config.to_api_repr()) \
+        if job_config else bigquery.QueryJobConfig()
+    dry_run_config.dry_run = True
+    dry_run_config.use_query_cache = False
+    return client.query(sql, job_config=dry_run_config).total_bytes_processed or 0
+
+def submit_query(
+    client: bigquery.Client,
+    sql: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+    max_bytes_billed: Optional[int] = None
+) -> bigquery.QueryJob:
+    """
+    Start a query, refusing it up front when it would exceed a byte budget.
+
+    With a budget the query is dry-run first and only started if its
+    estimate fits; ``maximum_bytes_billed`` is also set on the job, so
+    BigQuery fails it rather than bill more if the estimate was low. The
+    estimate is kept as the ``estimated_bytes`` job label.
+
+    Args:
+        client: BigQuery client
+        sql: Query to run
+        job_config: Job configuration of the query
+        max_bytes_billed: Budget in bytes, None to run without a check
+
+    Returns:
+        bigquery.QueryJob: Started query job
+
+    Raises:
+        QueryBudgetExceededError: If the estimate is over the budget
+    """
+    if max_bytes_billed is None:
+        return client.query(sql, job_config=job_config)
+
+    estimated_bytes = estimate_query_bytes(client, sql, job_config)
+    logger.info(json.dumps({
+        "event": "bq_dry_run",
+        "estimated_bytes": estimated_bytes,
+        "max_bytes_billed": max_bytes_billed
+    }))
+    if estimated_bytes > max_bytes_billed:
+        raise QueryBudgetExceededError(estimated_bytes, max_bytes_billed)
+
+    job_config = job_config or bigquery.QueryJobConfig()
+    job_config.maximum_bytes_billed = max_bytes_billed
+    job_config.labels = {**(job_config.labels or {}), "estimated_bytes": str(estimated_bytes)}
+    return client.query(sql, job_config=job_config)
+
+def job_stats(job: Any) -> Dict[str, Any]:
+    """
+    Cost and latency statistics of a finished BigQuery job.
+
+    Args:
+        job: QueryJob, LoadJob or other BigQuery job
+
+    Returns:
+        Dict[str, Any]: Statistics, None where the job type has none
+    """
+    statistics = job._properties.get("statistics", {})
+    slot_millis = statistics.get("totalSlotMs")
+    estimated_bytes = (job.labels or {}).get("estimated_bytes")
+    duration = None
+    if job.started and job.ended:
+        duration = round((job.ended - job.started).total_seconds(), 3)
+    return {
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "statement_type": getattr(job, "statement_type", None),
+        "state": job.state,
+        "error": job.error_result.get("message") if job.error_result else None,
+        "total_bytes_processed": getattr(job, "total_bytes_processed", None),
+        "total_bytes_billed": getattr(job, "total_bytes_billed", None),
+        "estimated_bytes": int(estimated_bytes) if estimated_bytes else None,
+        "slot_millis": int(slot_millis) if slot_millis is not None else None,
+        "cache_hit": getattr(job, "cache_hit", None),
+        "duration_seconds": duration
+    }
+
+class JobRecorder:
+    """Collects the statistics of BigQuery jobs, logs them and writes them to the metrics table"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, job: Any) -> Dict[str, Any]:
+        """
+        Record the statistics of a finished job and log them as one JSON line.
+
+        Args:
+            name: Job name
+            job: Finished BigQuery job
+
+        Returns:
+            Dict[str, Any]: Recorded statistics
+        """
+        stats = job_stats(job)
+        row = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "run_id": self.run_id,
+            "job_name": name,
+            **stats
+        }
+        logger.info(json.dumps({"event": "bq_job", **row}))
+        with self._lock:
+            self.rows.append(row)
+        return stats
+
+    def flush(self, client: bigquery.Client, table_id: str) -> None:
+        """
+        Append the recorded rows to the metrics table and clear them.
+
+        The table is created on the first write, partitioned by day of
+        ``recorded_at`` and clustered by job name. Failing to write metrics
+        is logged and never fails the caller.
+
+        Args:
+            client: BigQuery client
+            table_id: Fully qualified metrics table ID
+        """
+        with self._lock:
+            rows, self.rows = self.rows, []
+        if not rows:
+            return
+
+        job_config = bigquery.LoadJobConfig(
+            schema=METRICS_SCHEMA,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+            time_partitioning=bigquery.TimePartitioning(
+                type_=bigquery.TimePartitioningType.DAY,
+                field="recorded_at"
+            ),
+            clustering_fields=METRICS_CLUSTERING
+        )
+        try:
+            client.load_table_from_json(rows, table_id, job_config=job_config).result()
+            logger.info(f"Wrote {len(rows)} job metric(s) to {table_id}")
+        except Exception as e:
+            logger.error(f"Failed to write job metrics to {table_id}: {str(e)}")
+
+def metrics_table_id(project_id: str, dataset_id: str) -> str:
+    """
+    ID of the job metrics table of a dataset.
+
+    Args:
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+
+    Returns:
+        str: Fully qualified table ID
+    """
+    return f"{project_id}.{dataset_id}.{METRICS_TABLE_NAME}"
+
+def max_bytes_billed_from_config(config: Dict[str, Any]) -> Optional[int]:
+    """
+    Byte budget per query set with the ``max_bytes_billed`` config entry.
+
+    Args:
+        config: Pipeline configuration
+
+    Returns:
+        Optional[int]: Budget in bytes, None if unset or empty
+    """
+    value = config.get("max_bytes_billed")
+    return int(value) if value not in (None, "") else None
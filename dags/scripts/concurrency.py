@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Iterable, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Constants
+DEFAULT_MAX_WORKERS = 4
+
+class ConcurrentExecutionError(Exception):
+    """Raised when one or more concurrently processed items fail"""
+
+    def __init__(self, failures: Dict[str, Exception]):
+        self.failures = failures
+        details = "; ".join(f"{key}: {str(error)}" for key, error in failures.items())
+        super().__init__(f"{len(failures)} item(s) failed: {details}")
+
+def run_concurrently(
+    func: Callable[[T], Any],
+    items: Iterable[T],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    key: Callable[[T], str] = str
+) -> Dict[str, Any]:
+    """
+    Run a function over independent items with a bounded thread pool.
+
+    Every item runs to completion even if others fail, and all failures are
+    reported together instead of stopping at the first one. Each item runs
+    in a copy of the caller's context, so tracing spans nest under the
+    caller's span.
+
+    Args:
+        func: Function applied to each item
+        items: Items to process
+        max_workers: Maximum number of items processed at the same time
+        key: Function giving the name of an item in results and errors
+
+    Returns:
+        Dict[str, Any]: Result of each item, by item name
+
+    Raises:
+        ConcurrentExecutionError: If any item failed, with every failure attached
+    """
+    items = list(items)
+    results = {}
+    failures = {}
+    if not items:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = {executor.submit(copy_context().run, func, item): key(item) for item in items}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Failed processing {name}: {str(e)}")
+                failures[name] = e
+
+    if failures:
+        raise ConcurrentExecutionError(failures)
+    return results
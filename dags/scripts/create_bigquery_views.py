@@ -1,22 +1,120 @@
-from typing import Dict, List
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
 import logging
 
+from scripts.bigquery_partitions import NULL_PARTITION, get_changed_partitions, replace_partitions, split_partitions
+from scripts.bq_job_graph import run_job_graph
+from scripts.bq_metrics import JobRecorder, max_bytes_billed_from_config, metrics_table_id, submit_query
+from scripts.gcp_clients import get_bigquery_client
+from scripts.tracing import trace
+
 logger = logging.getLogger(__name__)
 
-def create_views(project_id: str, dataset_id: str) -> None:
+# Constants
+TRANSFORMATIONS = [
+    "aws_billing_with_gross_cost",
+    "aws_agg_cost_by_product_month",
+    "aws_agg_service_cost_by_month"
+]
+SOURCE_TABLES = ["stage_aws_billing", "stage_aws_prices", "stage_aws_unit_factor"]
+# Lookup tables joined into aws_billing_with_gross_cost; a change in any of them forces a full rebuild
+GROSS_COST_LOOKUPS = ["stage_aws_prices", "stage_aws_unit_factor"]
+
+class BigQueryBackend:
+    """Runs the transformations as BigQuery jobs in a dataset"""
+
+    def __init__(
+        self,
+        project_id: str,
+        dataset_id: str,
+        client: Optional[bigquery.Client] = None,
+        max_bytes_billed: Optional[int] = None
+    ):
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.client = client or get_bigquery_client()
+        self.max_bytes_billed = max_bytes_billed
+
+    def table(self, name: str) -> str:
+        return f"`{self.project_id}.{self.dataset_id}.{name}`"
+
+    def month(self, column: str) -> str:
+        return f"DATE_TRUNC({column}, MONTH)"
+
+    def partition_by(self, column: str, granularity: str = "DAY") -> str:
+        if granularity == "DAY":
+            return f"PARTITION BY {column}"
+        return f"PARTITION BY DATE_TRUNC({column}, {granularity})"
+
+    def submit(self, sql: str) -> bigquery.QueryJob:
+        return submit_query(self.client, sql, max_bytes_billed=self.max_bytes_billed)
+
+    def execute(self, sql: str) -> None:
+        job = self.submit(sql)
+        job.result()  # Wait for the job to complete
+
+    def fetch(self, name: str):
+        return self.client.list_rows(f"{self.project_id}.{self.dataset_id}.{name}").to_arrow()
+
+class DuckDBBackend:
+    """Runs the same transformations in-process with DuckDB over stage Parquet files"""
+
+    def __init__(self, parquet_paths: Dict[str, str], database: str = ":memory:"):
+        """
+        Args:
+            parquet_paths: Local path or glob of the Parquet data of each source table
+                (stage_aws_billing, stage_aws_prices, stage_aws_unit_factor)
+            database: DuckDB database file, in memory by default
+        """
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("The local backend requires the duckdb package") from e
+
+        missing = [name for name in SOURCE_TABLES if name not in parquet_paths]
+        if missing:
+            raise ValueError(f"Missing Parquet paths for: {', '.join(missing)}")
+
+        self.connection = duckdb.connect(database)
+        # BigQuery semantics: NULL instead of a division by zero error
+        self.connection.execute(
+            "CREATE OR REPLACE MACRO SAFE_DIVIDE(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END"
+        )
+        for name, path in parquet_paths.items():
+            self.connection.execute(
+                f"CREATE OR REPLACE VIEW {self.table(name)} AS "
+                f"SELECT * FROM read_parquet('{path}', hive_partitioning = true)"
+            )
+
+    def table(self, name: str) -> str:
+        return f'"{name}"'
+
+    def month(self, column: str) -> str:
+        return f"CAST(DATE_TRUNC('month', {column}) AS DATE)"
+
+    def partition_by(self, column: str, granularity: str = "DAY") -> str:
+        return ""
+
+    def execute(self, sql: str) -> None:
+        self.connection.execute(sql)
+
+    def fetch(self, name: str):
+        return self.connection.execute(f"SELECT * FROM {self.table(name)}").fetch_arrow_table()
+
+def build_billing_with_gross_cost_select(backend, where: str = "") -> str:
     """
-    Creates or updates BigQuery tables for AWS billing analysis.
+    SQL joining billing rows with list prices and unit factors.
     
     Args:
-        project_id: GCP project ID
-        dataset_id: BigQuery dataset ID
+        backend: Execution backend providing table references
+        where: Optional filter on the billing rows (alias ``b``)
+        
+    Returns:
+        str: SELECT statement
     """
-    client = bigquery.Client()
-    
-    # First create the billing_with_gross_cost table
-    billing_with_gross_cost_query = f"""
-    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.aws_billing_with_gross_cost` AS
+    return f"""
     SELECT
         b.start_date,
         b.product_code,
@@ -33,31 +131,57 @@ def create_views(project_id: str, dataset_id: str) -> None:
         SAFE_DIVIDE(b.usage_amount, f.unidad_factor) * p.precio_lista AS gross_cost,
         -- Indicador de match válido de precio
         p.precio_lista IS NOT NULL AND f.unidad_factor IS NOT NULL AS has_price_match
-    FROM `{project_id}.{dataset_id}.stage_aws_billing` b
-    LEFT JOIN `{project_id}.{dataset_id}.stage_aws_prices` p
+    FROM {backend.table("stage_aws_billing")} b
+    LEFT JOIN {backend.table("stage_aws_prices")} p
         ON b.product_code = p.product_code
         AND b.product_name = p.product_name
         AND b.pricing_term = p.pricing_term
         AND b.pricing_unit = p.pricing_unit
         AND (b.instance_type = p.instance_type OR (b.instance_type IS NULL AND p.instance_type IS NULL))
-    LEFT JOIN `{project_id}.{dataset_id}.stage_aws_unit_factor` f
+    LEFT JOIN {backend.table("stage_aws_unit_factor")} f
         ON b.pricing_unit = f.pricing_unit
+    {f"WHERE {where}" if where else ""}
     """
+
+def build_billing_with_gross_cost_query(backend) -> str:
+    """
+    SQL rebuilding the whole billing table with gross cost.
     
-    # Then create the aggregated cost table
-    agg_cost_query = f"""
-    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.aws_agg_cost_by_product_month` AS
+    Args:
+        backend: Execution backend providing table references
+        
+    Returns:
+        str: CREATE OR REPLACE TABLE statement
+    """
+    return f"""
+    CREATE OR REPLACE TABLE {backend.table("aws_billing_with_gross_cost")}
+    {backend.partition_by("start_date")}
+    AS {build_billing_with_gross_cost_select(backend)}
+    """
 
+def build_agg_cost_select(backend, where: str = "") -> str:
+    """
+    SQL for the product-month discount and top-5 audit table.
+    
+    Args:
+        backend: Execution backend providing table references
+        where: Optional filter on the billing rows with gross cost
+        
+    Returns:
+        str: SELECT statement
+    """
+    return f"""
     -- 1. Agregamos los datos a nivel producto-mes
     WITH base_agg AS (
         SELECT
-            DATE_TRUNC(start_date, MONTH) AS month,
+            {backend.month("start_date")} AS month,
             product_code,
             SUM(usage_amount) AS usage_amount,
             SUM(net_cost) AS net_cost,
             SUM(SAFE_DIVIDE(usage_amount, unidad_factor) * precio_lista) AS gross_cost
-        FROM `{project_id}.{dataset_id}.aws_billing_with_gross_cost`
+        FROM {backend.table("aws_billing_with_gross_cost")}
         WHERE has_price_match = TRUE
+        {f"AND ({where})" if where else ""}
         GROUP BY month, product_code
     ),
 
@@ -103,16 +227,44 @@ def create_views(project_id: str, dataset_id: str) -> None:
     FROM final_cost_calc
     """
 
-    # Create the service cost aggregation table
-    service_cost_query = f"""
-    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.aws_agg_service_cost_by_month` AS
+def build_agg_cost_query(backend) -> str:
+    """
+    SQL rebuilding the whole product-month audit table.
+    
+    Args:
+        backend: Execution backend providing table references
+        
+    Returns:
+        str: CREATE OR REPLACE TABLE statement
+    """
+    return f"""
+    CREATE OR REPLACE TABLE {backend.table("aws_agg_cost_by_product_month")}
+    {backend.partition_by("month", "MONTH")}
+    AS {build_agg_cost_select(backend)}
+    """
+
+def build_service_cost_select(backend, where: str = "", output_where: str = "") -> str:
+    """
+    SQL for the monthly service cost table with month-over-month growth.
+    
+    Args:
+        backend: Execution backend providing table references
+        where: Optional filter on the billing rows; must keep the months the
+            growth of the output months is computed against
+        output_where: Optional filter on the output months
+        
+    Returns:
+        str: SELECT statement
+    """
+    return f"""
     WITH base AS (
         SELECT
-            DATE_TRUNC(start_date, MONTH) AS month,
+            {backend.month("start_date")} AS month,
             service_code,
             SUM(net_cost) AS net_cost
-        FROM `{project_id}.{dataset_id}.stage_aws_billing`
+        FROM {backend.table("stage_aws_billing")}
         WHERE service_code IS NOT NULL
+        {f"AND ({where})" if where else ""}
         GROUP BY month, service_code
     ),
 
@@ -132,35 +284,542 @@ def create_views(project_id: str, dataset_id: str) -> None:
     )
 
     SELECT * FROM final
+    {f"WHERE {output_where}" if output_where else ""}
     """
+
+def build_service_cost_query(backend) -> str:
+    """
+    SQL rebuilding the whole monthly service cost table.
     
-    try:
-        # Execute the billing_with_gross_cost table creation
-        job = client.query(billing_with_gross_cost_query)
-        job.result()  # Wait for the job to complete
-        logger.info(f"Successfully created/updated table: {project_id}.{dataset_id}.aws_billing_with_gross_cost")
+    Args:
+        backend: Execution backend providing table references
         
-        # Execute the aggregated cost table creation
-        job = client.query(agg_cost_query)
-        job.result()  # Wait for the job to complete
-        logger.info(f"Successfully created/updated table: {project_id}.{dataset_id}.aws_agg_cost_by_product_month")
+    Returns:
+        str: CREATE OR REPLACE TABLE statement
+    """
+    return f"""
+    CREATE OR REPLACE TABLE {backend.table("aws_agg_service_cost_by_month")}
+    {backend.partition_by("month", "MONTH")}
+    AS {build_service_cost_select(backend)}
+    """
 
-        # Execute the service cost aggregation table creation
-        job = client.query(service_cost_query)
-        job.result()  # Wait for the job to complete
-        logger.info(f"Successfully created/updated table: {project_id}.{dataset_id}.aws_agg_service_cost_by_month")
+def run_transformations(backend) -> None:
+    """
+    Run the three billing transformations on an execution backend.
+    
+    Args:
+        backend: BigQueryBackend or DuckDBBackend
+    """
+    queries = {
+        "aws_billing_with_gross_cost": build_billing_with_gross_cost_query(backend),
+        "aws_agg_cost_by_product_month": build_agg_cost_query(backend),
+        "aws_agg_service_cost_by_month": build_service_cost_query(backend)
+    }
+    for name in TRANSFORMATIONS:
+        backend.execute(queries[name])
+        logger.info(f"Successfully created/updated table: {name}")
+
+def lookup_versions(backend: BigQueryBackend) -> Dict[str, str]:
+    """
+    Last-modified times of the lookup tables joined into the gross cost.
+    
+    Args:
+        backend: BigQuery backend
+        
+    Returns:
+        Dict[str, str]: Epoch milliseconds by label key, as stored on the target table
+    """
+    versions = {}
+    for name in GROSS_COST_LOOKUPS:
+        table = backend.client.get_table(f"{backend.project_id}.{backend.dataset_id}.{name}")
+        versions[f"{name}_modified"] = str(int(table.modified.timestamp() * 1000))
+    return versions
+
+def plan_billing_with_gross_cost(
+    backend: BigQueryBackend,
+    changed_partitions: Optional[List[str]] = None,
+    memo: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Optional[List[str]]]:
+    """
+    Plan the materialization of aws_billing_with_gross_cost, incrementally when possible.
+    
+    Only the start_date partitions changed by the current load are
+    recomputed and swapped in with a MERGE. The table is rebuilt in full
+    when the changed partitions are unknown, when it is missing or not yet
+    partitioned by start_date, or when stage_aws_prices or
+    stage_aws_unit_factor changed since the last refresh (tracked with
+    labels on the table), since those affect every row.
+    
+    Args:
+        backend: BigQuery backend
+        changed_partitions: Partitions of stage_aws_billing changed by the
+            current load, None if unknown
+        memo: Decisions of the first planning of the run, filled by it; a
+            resumed job graph is planned again after the table changed and
+            must keep them
+        
+    Returns:
+        Tuple[Dict[str, Any], Optional[List[str]]]: Job definition for
+            run_job_graph and the partitions it recomputes, None for a full rebuild
+    """
+    client = backend.client
+    table_id = f"{backend.project_id}.{backend.dataset_id}.aws_billing_with_gross_cost"
+    memo = {} if memo is None else memo
+    if "full_rebuild" not in memo:
+        versions = lookup_versions(backend)
+        try:
+            table = client.get_table(table_id)
+        except NotFound:
+            table = None
+        partitioned = (
+            table is not None
+            and table.time_partitioning is not None
+            and table.time_partitioning.field == "start_date"
+        )
+        lookups_unchanged = partitioned and all(
+            table.labels.get(key) == value for key, value in versions.items()
+        )
+        memo.update(
+            versions=versions,
+            full_rebuild=changed_partitions is None or not lookups_unchanged,
+            replace_unpartitioned=table is not None and not partitioned
+        )
+    versions = memo["versions"]
+    full_rebuild = memo["full_rebuild"]
+
+    def submit() -> Optional[bigquery.QueryJob]:
+        if full_rebuild:
+            if memo["replace_unpartitioned"]:
+                # CREATE OR REPLACE cannot change the partitioning of a table
+                client.delete_table(table_id)
+            logger.info(f"Fully rebuilding table: {table_id}")
+            return backend.submit(build_billing_with_gross_cost_query(backend))
+        if not changed_partitions:
+            logger.info(f"No changed partitions, {table_id} is up to date")
+            return None
+        dates, include_null = split_partitions(changed_partitions)
+        return replace_partitions(
+            client,
+            table_id,
+            build_billing_with_gross_cost_select(
+                backend,
+                where="b.start_date IN UNNEST(@partitions) OR (@include_null AND b.start_date IS NULL)"
+            ),
+            "start_date",
+            dates,
+            include_null=include_null,
+            wait=False,
+            max_bytes_billed=backend.max_bytes_billed
+        )
+
+    def update_labels(job: bigquery.QueryJob) -> None:
+        updated = client.get_table(table_id)
+        updated.labels = {**updated.labels, **versions}
+        client.update_table(updated, ["labels"])
+
+    job = {"name": "aws_billing_with_gross_cost", "submit": submit, "on_done": update_labels}
+    return job, None if full_rebuild else changed_partitions
+
+def month_start(value: date, offset: int = 0) -> date:
+    """
+    First day of the month of a date, shifted by a number of months.
+    
+    Args:
+        value: Any date in the month
+        offset: Months to shift by
+        
+    Returns:
+        date: First day of the resulting month
+    """
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+def changed_months(partitions: Optional[List[str]]) -> Optional[List[date]]:
+    """
+    Months touched by a list of changed start_date partitions.
+    
+    Args:
+        partitions: Changed partitions, None if unknown
+        
+    Returns:
+        Optional[List[date]]: Sorted first days of the months, None if the
+            aggregates have to be rebuilt (unknown changes or rows without a date)
+    """
+    if partitions is None or NULL_PARTITION in partitions:
+        return None
+    dates, _ = split_partitions(partitions)
+    return sorted({month_start(value) for value in dates})
+
+def month_range_parameters(name: str, months: List[date]) -> List:
+    """
+    Query parameters with the date range spanned by a set of months.
+    
+    Passed as ``@<name>_start``/``@<name>_end`` next to the month list so
+    that filters on start_date prune partitions.
+    
+    Args:
+        name: Name of the month list parameter
+        months: First days of the months
+        
+    Returns:
+        List: BigQuery query parameters
+    """
+    return [
+        bigquery.ScalarQueryParameter(f"{name}_start", "DATE", min(months)),
+        bigquery.ScalarQueryParameter(f"{name}_end", "DATE", month_start(max(months), 1) - timedelta(days=1))
+    ]
+
+def plan_month_table(
+    backend: BigQueryBackend,
+    name: str,
+    full_query: str,
+    select_sql: str,
+    months: Optional[List[date]],
+    query_parameters: Optional[List] = None,
+    depends_on: Optional[List[str]] = None,
+    resolve: Optional[Callable[[], Tuple[List[date], List]]] = None
+) -> Dict[str, Any]:
+    """
+    Plan the replacement of the given months of a month-partitioned aggregate table.
+    
+    Falls back to the full query when the months are unknown or the table
+    is missing or not partitioned by month yet.
+    
+    Args:
+        backend: BigQuery backend
+        name: Table name
+        full_query: CREATE OR REPLACE statement rebuilding the table
+        select_sql: SELECT producing the rows of ``@partitions``
+        months: First days of the months to replace, None to rebuild
+        query_parameters: Extra parameters used by ``select_sql``
+        depends_on: Jobs that must finish before this one
+        resolve: Optional callable returning the months to replace and the
+            query parameters instead, called at submission once the jobs
+            this one depends on are done
+        
+    Returns:
+        Dict[str, Any]: Job definition for run_job_graph
+    """
+    client = backend.client
+    table_id = f"{backend.project_id}.{backend.dataset_id}.{name}"
+
+    def submit() -> Optional[bigquery.QueryJob]:
+        try:
+            table = client.get_table(table_id)
+        except NotFound:
+            table = None
+        partitioned = (
+            table is not None
+            and table.time_partitioning is not None
+            and table.time_partitioning.field == "month"
+        )
+        if months is None or not partitioned:
+            if table is not None and not partitioned:
+                # CREATE OR REPLACE cannot change the partitioning of a table
+                client.delete_table(table_id)
+            logger.info(f"Fully rebuilding table: {table_id}")
+            return backend.submit(full_query)
+        replaced, parameters = resolve() if resolve is not None and months else (months, query_parameters)
+        if not replaced:
+            logger.info(f"No changed months, {table_id} is up to date")
+            return None
+        return replace_partitions(
+            client, table_id, select_sql, "month", replaced,
+            query_parameters=parameters,
+            wait=False,
+            max_bytes_billed=backend.max_bytes_billed
+        )
+
+    return {"name": name, "submit": submit, "depends_on": depends_on or []}
+
+def build_service_cost_months_select(backend) -> str:
+    """
+    SQL finding the months of the service table affected by changed months.
+    
+    The growth of a service is computed against the previous month the
+    service was billed in, which is not always the calendar month before.
+    The months billed per service after the load are the rows of the
+    service table outside ``@changed_months`` and the rows of
+    stage_aws_billing inside them. Besides the changed months, the next
+    month billed of every service billed in a changed month, before or
+    after the load, is replaced; the previous month billed of every service
+    of a replaced month is read as the ``LAG`` boundary.
+    
+    Args:
+        backend: BigQuery backend
+        
+    Returns:
+        str: SELECT of each month to read, with whether it is replaced
+    """
+    return f"""
+    WITH billed AS (
+        SELECT month, service_code
+        FROM {backend.table("aws_agg_service_cost_by_month")}
+        WHERE month NOT IN UNNEST(@changed_months)
+        UNION DISTINCT
+        SELECT DATE_TRUNC(start_date, MONTH) AS month, service_code
+        FROM {backend.table("stage_aws_billing")}
+        WHERE service_code IS NOT NULL
+        AND start_date BETWEEN @changed_months_start AND @changed_months_end
+        AND DATE_TRUNC(start_date, MONTH) IN UNNEST(@changed_months)
+    ),
+
+    affected AS (
+        SELECT month, service_code
+        FROM {backend.table("aws_agg_service_cost_by_month")}
+        WHERE month IN UNNEST(@changed_months)
+        UNION DISTINCT
+        SELECT month, service_code
+        FROM billed
+        WHERE month IN UNNEST(@changed_months)
+    ),
+
+    replaced AS (
+        SELECT month FROM UNNEST(@changed_months) AS month
+        UNION DISTINCT
+        SELECT MIN(b.month)
+        FROM affected a
+        JOIN billed b ON b.service_code = a.service_code AND b.month > a.month
+        GROUP BY a.month, a.service_code
+    ),
+
+    previous AS (
+        SELECT MAX(p.month) AS month
+        FROM billed b
+        JOIN replaced r ON b.month = r.month
+        JOIN billed p ON p.service_code = b.service_code AND p.month < b.month
+        GROUP BY b.month, b.service_code
+    )
+
+    SELECT month, TRUE AS replaced FROM replaced
+    UNION ALL
+    SELECT DISTINCT month, FALSE AS replaced FROM previous
+    WHERE month NOT IN (SELECT month FROM replaced)
+    """
+
+def plan_aggregates(
+    backend: BigQueryBackend,
+    changed_partitions: Optional[List[str]],
+    recomputed_partitions: Optional[List[str]],
+    memo: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the recomputation of the months of the aggregate tables affected by a load.
+    
+    The product-month table has no dependency across months (the top-5
+    ranking is per month), so only the months whose gross cost rows were
+    recomputed are replaced, once aws_billing_with_gross_cost is done. The
+    service table reads stage_aws_billing directly and runs right away,
+    after a query finding the other months whose growth the changed months
+    affect and the months it is computed against, see
+    build_service_cost_months_select. The cost of a refresh therefore
+    depends on the changed months only, not on the length of the history.
+    
+    Args:
+        backend: BigQuery backend
+        changed_partitions: Partitions of stage_aws_billing changed by the
+            load, None if unknown
+        recomputed_partitions: Partitions of aws_billing_with_gross_cost
+            recomputed by this run, None after a full rebuild
+        memo: Decisions of the first planning of the run, filled by it
+        
+    Returns:
+        List[Dict[str, Any]]: Job definitions for run_job_graph
+    """
+    memo = {} if memo is None else memo
+    months = changed_months(recomputed_partitions)
+    agg_cost_job = plan_month_table(
+        backend,
+        "aws_agg_cost_by_product_month",
+        build_agg_cost_query(backend),
+        build_agg_cost_select(
+            backend,
+            where="start_date BETWEEN @partitions_start AND @partitions_end "
+                  "AND DATE_TRUNC(start_date, MONTH) IN UNNEST(@partitions)"
+        ),
+        months,
+        query_parameters=month_range_parameters("partitions", months) if months else None,
+        depends_on=["aws_billing_with_gross_cost"]
+    )
+
+    client = backend.client
+    name = "aws_agg_service_cost_by_month"
+    months = changed_months(changed_partitions)
+
+    def submit_months() -> Optional[bigquery.QueryJob]:
+        if not months or "service_cost_months" in memo:
+            return None
+        try:
+            table = client.get_table(f"{backend.project_id}.{backend.dataset_id}.{name}")
+        except NotFound:
+            return None
+        if table.time_partitioning is None or table.time_partitioning.field != "month":
+            return None  # Rebuilt in full
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("changed_months", "DATE", months)
+        ] + month_range_parameters("changed_months", months))
+        return submit_query(
+            client,
+            build_service_cost_months_select(backend),
+            job_config=job_config,
+            max_bytes_billed=backend.max_bytes_billed
+        )
+
+    def read_months(job: bigquery.QueryJob) -> None:
+        rows = list(job.result())
+        memo["service_cost_months"] = {
+            "months": sorted(row.month.isoformat() for row in rows if row.replaced),
+            "lag_months": sorted(row.month.isoformat() for row in rows)
+        }
+
+    def resolve() -> Tuple[List[date], List]:
+        planned = memo["service_cost_months"]
+        lag_months = [date.fromisoformat(value) for value in planned["lag_months"]]
+        return [date.fromisoformat(value) for value in planned["months"]], [
+            bigquery.ArrayQueryParameter("lag_months", "DATE", lag_months)
+        ] + month_range_parameters("lag_months", lag_months)
+
+    months_job = {"name": f"{name}:months", "submit": submit_months, "on_done": read_months}
+    service_cost_job = plan_month_table(
+        backend,
+        name,
+        build_service_cost_query(backend),
+        build_service_cost_select(
+            backend,
+            where="start_date BETWEEN @lag_months_start AND @lag_months_end "
+                  "AND DATE_TRUNC(start_date, MONTH) IN UNNEST(@lag_months)",
+            output_where="month IN UNNEST(@partitions)"
+        ),
+        months,
+        depends_on=[months_job["name"]],
+        resolve=resolve
+    )
+    return [agg_cost_job, months_job, service_cost_job]
+
+def plan_views(
+    backend: BigQueryBackend,
+    changed_partitions: Optional[List[str]] = None,
+    memo: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the jobs of the three tables.
+    
+    aws_agg_service_cost_by_month runs next to aws_billing_with_gross_cost,
+    which aws_agg_cost_by_product_month waits for.
+    
+    Args:
+        backend: BigQuery backend
+        changed_partitions: Partitions of stage_aws_billing changed by the
+            current load, None to rebuild everything
+        memo: Decisions of the first planning of the run, see plan_billing_with_gross_cost
+        
+    Returns:
+        List[Dict[str, Any]]: Job definitions for run_job_graph
+    """
+    gross_cost_job, recomputed = plan_billing_with_gross_cost(backend, changed_partitions, memo)
+    return [gross_cost_job] + plan_aggregates(backend, changed_partitions, recomputed, memo)
+
+def create_views(
+    project_id: str,
+    dataset_id: str,
+    changed_partitions: Optional[List[str]] = None,
+    max_bytes_billed: Optional[int] = None,
+    run_id: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Creates or updates BigQuery tables for AWS billing analysis.
+    
+    The three tables run as a job graph, see plan_views. The statistics of
+    every job are written to the job metrics table.
+    
+    Args:
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+        changed_partitions: Partitions of stage_aws_billing changed by the
+            current load, None to rebuild everything
+        max_bytes_billed: Optional byte budget per query, checked with a dry run
+        run_id: Airflow run ID recorded with the job statistics
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings and statistics of each table job
+    """
+    backend = BigQueryBackend(project_id, dataset_id, max_bytes_billed=max_bytes_billed)
+    recorder = JobRecorder(run_id)
+    try:
+        timings = run_job_graph(plan_views(backend, changed_partitions), recorder=recorder)
+        logger.info(f"Successfully created/updated tables in {project_id}.{dataset_id}")
+        return timings
     except Exception as e:
         logger.error(f"Error creating tables: {str(e)}")
         raise
+    finally:
+        recorder.flush(backend.client, metrics_table_id(project_id, dataset_id))
+
+def run_local_transformations(parquet_paths: Dict[str, str], output_dir: Optional[str] = None) -> Dict:
+    """
+    Run the transformations locally with DuckDB, without BigQuery.
+    
+    Useful to regression-test and benchmark the logic offline or to serve
+    small runs; results match the BigQuery tables row for row.
+    
+    Args:
+        parquet_paths: Local path or glob of the Parquet data of each source table
+        output_dir: Directory to write each result as ``<name>.parquet``
+        
+    Returns:
+        Dict: Arrow table of each transformation by name
+    """
+    import pyarrow.parquet as pq
+
+    backend = DuckDBBackend(parquet_paths)
+    run_transformations(backend)
+    results = {name: backend.fetch(name) for name in TRANSFORMATIONS}
+    if output_dir:
+        for name, table in results.items():
+            pq.write_table(table, f"{output_dir}/{name}.parquet")
+    return results
 
-def run_view_creation(config: Dict[str, str]) -> None:
+def run_view_creation(config: Dict[str, str], **context: Any) -> Dict[str, Dict[str, Any]]:
     """
     Main function to run the table creation process.
     
+    The job waits are traced and summarized in XCom.
+    
     Args:
         config: Dictionary containing project_id and dataset_id
+        context: Airflow context, used to read the partitions changed by the load
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings of each table job, pushed to XCom
+    """
+    with trace("create_views", context):
+        return create_views(
+            project_id=config['project_id'],
+            dataset_id=config['dataset_id'],
+            changed_partitions=get_changed_partitions(context, "stage_aws_billing"),
+            max_bytes_billed=max_bytes_billed_from_config(config),
+            run_id=context.get('run_id')
+        )
+
+def plan_view_creation(config: Dict[str, str], memo: Dict[str, Any], **context: Any) -> Dict[str, Any]:
     """
-    create_views(
-        project_id=config['project_id'],
-        dataset_id=config['dataset_id']
-    ) 
\ No newline at end of file
+    Plan the table creation as a job graph for BigQueryJobGraphOperator.
+    
+    Args:
+        config: Dictionary containing project_id and dataset_id
+        memo: Decisions of the first planning of the run, see plan_billing_with_gross_cost
+        context: Airflow context, used to read the partitions changed by the load
+        
+    Returns:
+        Dict[str, Any]: Job graph plan, see BigQueryJobGraphOperator
+    """
+    backend = BigQueryBackend(
+        config['project_id'],
+        config['dataset_id'],
+        max_bytes_billed=max_bytes_billed_from_config(config)
+    )
+    return {
+        "jobs": plan_views(backend, get_changed_partitions(context, "stage_aws_billing"), memo),
+        "client": backend.client,
+        "metrics_table": metrics_table_id(config['project_id'], config['dataset_id'])
+    }
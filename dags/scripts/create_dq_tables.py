@@ -1,79 +1,446 @@
-from typing import Dict
+from datetime import date
+from typing import Any, Dict, List, Optional
 from google.cloud import bigquery
 import logging
 
+from scripts.bigquery_partitions import get_staging_result, split_partitions
+from scripts.bq_job_graph import run_job_graph
+from scripts.bq_metrics import JobRecorder, max_bytes_billed_from_config, metrics_table_id, submit_query
+from scripts.dq_rules import DQ_RULES, DQ_TABLE_PREFIX, build_dq_select
+from scripts.gcp_clients import get_bigquery_client
+from scripts.pipeline_config import DEFAULT_DQ_MODE, DQ_MODES
+from scripts.tracing import trace
+
 logger = logging.getLogger(__name__)
 
-def create_dq_tables(project_id: str, dataset_id: str) -> None:
+# Constants
+DQ_SCHEMA = [
+    bigquery.SchemaField("check_name", "STRING"),
+    bigquery.SchemaField("num_issues", "INTEGER")
+]
+
+# History mode (see DQ_MODES) tables and their layout
+DQ_HISTORY_SUFFIX = "_history"
+DQ_HISTORY_SCHEMA = [
+    bigquery.SchemaField("partition_date", "DATE"),
+    bigquery.SchemaField("run_id", "STRING"),
+    bigquery.SchemaField("check_name", "STRING"),
+    bigquery.SchemaField("num_issues", "INTEGER"),
+    bigquery.SchemaField("checked_at", "TIMESTAMP")
+]
+DQ_HISTORY_CLUSTERING = ["check_name", "run_id"]
+
+# Partition column of the partitioned stage tables; the others are checked
+# as a whole and recorded under the run date
+DQ_PARTITION_FIELDS = {"stage_aws_billing": "start_date"}
+
+def write_dq_results(client: bigquery.Client, table_id: str, results: List[Dict[str, Any]]) -> bigquery.LoadJob:
     """
-    Creates or updates BigQuery tables for data quality checks.
+    Replace the content of a DQ table with precomputed check results.
+    
+    The rows are sent with a load job, so no table is scanned.
+    
+    Args:
+        client: BigQuery client
+        table_id: Fully qualified DQ table ID
+        results: Rows with check_name and num_issues
+        
+    Returns:
+        bigquery.LoadJob: Started load job
+    """
+    job_config = bigquery.LoadJobConfig(
+        schema=DQ_SCHEMA,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+    )
+    return client.load_table_from_json(results, table_id, job_config=job_config)
+
+def plan_dq_tables(
+    client: bigquery.Client,
+    project_id: str,
+    dataset_id: str,
+    precomputed: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    max_bytes_billed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the jobs writing the DQ table of each stage table.
+    
+    Results computed while staging are written as they are; the checks of
+    any other stage table run as one query over it, built from DQ_RULES.
+    The precomputed results must cover every row of their table, see
+    staged_dq_results.
     
     Args:
+        client: BigQuery client
         project_id: GCP project ID
         dataset_id: BigQuery dataset ID
+        precomputed: Check results of each stage table computed during staging
+        max_bytes_billed: Optional byte budget per query, checked with a dry run
+        
+    Returns:
+        List[Dict[str, Any]]: Independent job definitions for run_job_graph
     """
-    client = bigquery.Client()
-    
-    # Create DQ table for stage_aws_billing
-    billing_dq_query = f"""
-    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.dq_stage_aws_billing` AS
-    SELECT
-        'account_id IS NULL' AS check_name, COUNT(*) AS num_issues
-    FROM `{project_id}.{dataset_id}.stage_aws_billing`
-    WHERE account_id IS NULL
-    UNION ALL
-    SELECT 'usage_amount < 0', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE usage_amount < 0
-    UNION ALL
-    SELECT 'product_code IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE product_code IS NULL
-    UNION ALL
-    SELECT 'service_code IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE service_code IS NULL
-    UNION ALL
-    SELECT 'usage_type IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE usage_type IS NULL
-    UNION ALL
-    SELECT 'instance_type IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE instance_type IS NULL
-    UNION ALL
-    SELECT 'net_cost IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE net_cost IS NULL
-    UNION ALL
-    SELECT 'start_date IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_billing` WHERE start_date IS NULL
-    """
-    
-    # Create DQ table for stage_aws_prices
-    prices_dq_query = f"""
-    CREATE OR REPLACE TABLE `{project_id}.{dataset_id}.dq_stage_aws_prices` AS
-    SELECT
-        'product_code IS NULL' AS check_name, COUNT(*) AS num_issues
-    FROM `{project_id}.{dataset_id}.stage_aws_prices`
-    WHERE product_code IS NULL
-    UNION ALL
-    SELECT 'precio_lista IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_prices` WHERE precio_lista IS NULL
-    UNION ALL
-    SELECT 'precio_lista < 0', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_prices` WHERE precio_lista < 0
-    UNION ALL
-    SELECT 'pricing_unit IS NULL', COUNT(*) FROM `{project_id}.{dataset_id}.stage_aws_prices` WHERE pricing_unit IS NULL
+    precomputed = precomputed or {}
+    
+    def submit(table_name: str, rules: List[Dict[str, str]]):
+        dq_table_id = f"{project_id}.{dataset_id}.{DQ_TABLE_PREFIX}{table_name}"
+        if table_name in precomputed:
+            return write_dq_results(client, dq_table_id, precomputed[table_name])
+        return submit_query(client, f"""
+        CREATE OR REPLACE TABLE `{dq_table_id}` AS
+        {build_dq_select(f"`{project_id}.{dataset_id}.{table_name}`", rules)}
+        """, max_bytes_billed=max_bytes_billed)
+
+    return [
+        {
+            "name": f"{DQ_TABLE_PREFIX}{table_name}",
+            "submit": lambda table_name=table_name, rules=rules: submit(table_name, rules)
+        }
+        for table_name, rules in DQ_RULES.items()
+    ]
+
+def create_dq_tables(
+    project_id: str,
+    dataset_id: str,
+    precomputed: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    max_bytes_billed: Optional[int] = None,
+    run_id: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
     """
+    Creates or updates BigQuery tables for data quality checks.
     
-    try:
-        # Execute the billing DQ table creation
-        job = client.query(billing_dq_query)
-        job.result()  # Wait for the job to complete
-        logger.info(f"Successfully created/updated DQ table: {project_id}.{dataset_id}.dq_stage_aws_billing")
+    The tables are independent and are written concurrently, see plan_dq_tables.
+    
+    Args:
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+        precomputed: Check results of each stage table computed during staging
+        max_bytes_billed: Optional byte budget per query, checked with a dry run
+        run_id: Airflow run ID recorded with the job statistics
         
-        # Execute the prices DQ table creation
-        job = client.query(prices_dq_query)
-        job.result()  # Wait for the job to complete
-        logger.info(f"Successfully created/updated DQ table: {project_id}.{dataset_id}.dq_stage_aws_prices")
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings and statistics of each DQ table job
+    """
+    client = get_bigquery_client()
+    recorder = JobRecorder(run_id)
+    try:
+        timings = run_job_graph(
+            plan_dq_tables(client, project_id, dataset_id, precomputed, max_bytes_billed),
+            recorder=recorder
+        )
+        logger.info(f"Successfully created/updated DQ tables: {', '.join(timings)}")
+        return timings
     except Exception as e:
         logger.error(f"Error creating DQ tables: {str(e)}")
         raise
+    finally:
+        recorder.flush(client, metrics_table_id(project_id, dataset_id))
+
+def ensure_history_table(client: bigquery.Client, table_id: str) -> None:
+    """
+    Create a DQ history table, partitioned by partition_date and clustered
+    by check and run, if it does not exist.
+    
+    Args:
+        client: BigQuery client
+        table_id: Fully qualified history table ID
+    """
+    table = bigquery.Table(table_id, schema=DQ_HISTORY_SCHEMA)
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY,
+        field="partition_date"
+    )
+    table.clustering_fields = DQ_HISTORY_CLUSTERING
+    client.create_table(table, exists_ok=True)
+
+def append_dq_history(
+    client: bigquery.Client,
+    project_id: str,
+    dataset_id: str,
+    table_name: str,
+    partitions: Optional[List[str]],
+    run_id: str,
+    run_date: date,
+    max_bytes_billed: Optional[int] = None
+) -> bigquery.QueryJob:
+    """
+    Check the new partitions of a stage table and append the counts to its history.
+    
+    Every rule is evaluated in one scan limited to the given partitions,
+    grouped by partition. Rows written before by the same run are replaced,
+    so retries do not duplicate them.
+    
+    Args:
+        client: BigQuery client
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+        table_name: Stage table name
+        partitions: Partitions loaded by the run, None to check every partition
+        run_id: Airflow run ID the results are recorded under
+        run_date: Date recorded for tables without a partition column
+        max_bytes_billed: Optional byte budget, checked with a dry run
+        
+    Returns:
+        bigquery.QueryJob: Started MERGE job
+    """
+    history_id = f"{project_id}.{dataset_id}.{DQ_TABLE_PREFIX}{table_name}{DQ_HISTORY_SUFFIX}"
+    ensure_history_table(client, history_id)
+
+    partition_field = DQ_PARTITION_FIELDS.get(table_name)
+    table_ref = f"`{project_id}.{dataset_id}.{table_name}`"
+    rules = DQ_RULES[table_name]
+    query_parameters = [
+        bigquery.ScalarQueryParameter("run_id", "STRING", run_id),
+        bigquery.ScalarQueryParameter("run_date", "DATE", run_date)
+    ]
+    if partition_field is None:
+        partition_field = "partition_date"
+        checks = f"SELECT @run_date AS partition_date, * FROM ({build_dq_select(table_ref, rules)})"
+    elif partitions is None:
+        checks = build_dq_select(table_ref, rules, group_by=partition_field)
+    else:
+        dates, include_null = split_partitions(partitions)
+        query_parameters += [
+            bigquery.ArrayQueryParameter("partitions", "DATE", dates),
+            bigquery.ScalarQueryParameter("include_null", "BOOL", include_null)
+        ]
+        checks = build_dq_select(
+            table_ref,
+            rules,
+            where=f"{partition_field} IN UNNEST(@partitions) OR (@include_null AND {partition_field} IS NULL)",
+            group_by=partition_field
+        )
+
+    logger.info(f"Appending DQ results of {table_name} to {history_id}")
+    return submit_query(
+        client,
+        f"""
+        MERGE `{history_id}` T
+        USING (
+            SELECT {partition_field} AS partition_date, @run_id AS run_id, check_name, num_issues, CURRENT_TIMESTAMP() AS checked_at
+            FROM ({checks})
+        ) S
+        ON FALSE
+        WHEN NOT MATCHED BY SOURCE AND T.run_id = @run_id THEN DELETE
+        WHEN NOT MATCHED THEN INSERT ROW
+        """,
+        job_config=bigquery.QueryJobConfig(query_parameters=query_parameters),
+        max_bytes_billed=max_bytes_billed
+    )
+
+def plan_dq_history(
+    client: bigquery.Client,
+    project_id: str,
+    dataset_id: str,
+    changed_partitions: Dict[str, Optional[List[str]]],
+    run_id: str,
+    run_date: date,
+    max_bytes_billed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan the jobs appending the DQ results of the partitions loaded by a run.
+    
+    Args:
+        client: BigQuery client
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+        changed_partitions: Partitions loaded of each stage table, None if
+            unknown; tables with an empty list are skipped
+        run_id: Airflow run ID
+        run_date: Logical date of the run
+        max_bytes_billed: Optional byte budget per query, checked with a dry run
+        
+    Returns:
+        List[Dict[str, Any]]: Independent job definitions for run_job_graph
+    """
+    jobs = []
+    for table_name in DQ_RULES:
+        partitions = changed_partitions.get(table_name)
+        if partitions == []:
+            logger.info(f"No new partitions in {table_name}, skipping DQ history")
+            continue
+        jobs.append({
+            "name": f"{DQ_TABLE_PREFIX}{table_name}{DQ_HISTORY_SUFFIX}",
+            "submit": lambda table_name=table_name, partitions=partitions: append_dq_history(
+                client, project_id, dataset_id, table_name, partitions, run_id, run_date, max_bytes_billed
+            )
+        })
+    return jobs
+
+def create_dq_history(
+    project_id: str,
+    dataset_id: str,
+    changed_partitions: Dict[str, Optional[List[str]]],
+    run_id: str,
+    run_date: date,
+    max_bytes_billed: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Append per-partition DQ results of the partitions loaded by a run.
+    
+    The checks of the stage tables are independent and run concurrently,
+    see plan_dq_history.
+    
+    Args:
+        project_id: GCP project ID
+        dataset_id: BigQuery dataset ID
+        changed_partitions: Partitions loaded of each stage table, None if
+            unknown; tables with an empty list are skipped
+        run_id: Airflow run ID
+        run_date: Logical date of the run
+        max_bytes_billed: Optional byte budget per query, checked with a dry run
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings and statistics of each history job
+    """
+    client = get_bigquery_client()
+    recorder = JobRecorder(run_id)
+    try:
+        return run_job_graph(
+            plan_dq_history(client, project_id, dataset_id, changed_partitions, run_id, run_date, max_bytes_billed),
+            recorder=recorder
+        )
+    except Exception as e:
+        logger.error(f"Error appending DQ history: {str(e)}")
+        raise
+    finally:
+        recorder.flush(client, metrics_table_id(project_id, dataset_id))
+
+def dq_mode(config: Dict[str, str]) -> str:
+    """
+    DQ mode of the run, see DQ_MODES.
+    
+    Args:
+        config: Dictionary containing dq_mode
+        
+    Returns:
+        str: Mode
+        
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    mode = config.get('dq_mode', DEFAULT_DQ_MODE)
+    if mode not in DQ_MODES:
+        raise ValueError(f"Unknown DQ mode: {mode}")
+    return mode
+
+def staged_partitions(context: Dict[str, Any]) -> Dict[str, Optional[List[str]]]:
+    """
+    Partitions loaded into each stage table by the staging tasks of the run.
+    
+    Args:
+        context: Airflow context
+        
+    Returns:
+        Dict[str, Optional[List[str]]]: Partitions by stage table, None if unknown
+    """
+    return {
+        table_name: (get_staging_result(context, table_name) or {}).get("partitions")
+        for table_name in DQ_RULES
+    }
+
+def staged_dq_results(context: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Check results computed by the staging tasks of the run.
+    
+    The counts describe the rows loaded by the run, so they are only used
+    for tables the run replaced as a whole. An incremental load keeps the
+    other partitions, whose rows the DQ table must count too; those tables
+    are checked with a query instead.
+    
+    Args:
+        context: Airflow context
+        
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Results by stage table, for the
+            fully replaced tables that have them
+    """
+    precomputed = {}
+    for table_name in DQ_RULES:
+        result = get_staging_result(context, table_name)
+        if result and result.get("partitions") is None and result.get("dq_results") is not None:
+            precomputed[table_name] = result["dq_results"]
+    return precomputed
+
+def logical_run_date(context: Dict[str, Any]) -> date:
+    """
+    Date the history rows of tables without a partition column are recorded under.
+    
+    Args:
+        context: Airflow context
+        
+    Returns:
+        date: Logical date of the run, today outside Airflow
+    """
+    logical_date = context.get('logical_date')
+    return logical_date.date() if logical_date else date.today()
 
-def run_dq_creation(config: Dict[str, str]) -> None:
+def run_dq_creation(config: Dict[str, str], **context: Any) -> Dict[str, Dict[str, Any]]:
     """
     Main function to run the data quality table creation process.
     
+    The mode comes from ``config["dq_mode"]`` (see DQ_MODES). The job
+    waits are traced and summarized in XCom.
+    
     Args:
         config: Dictionary containing project_id and dataset_id
+        context: Airflow context, used to read the results computed during staging
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings of each DQ job, pushed to XCom
+    """
+    mode = dq_mode(config)
+    with trace("generate_dq_tables", context):
+        if mode == "history":
+            return create_dq_history(
+                project_id=config['project_id'],
+                dataset_id=config['dataset_id'],
+                changed_partitions=staged_partitions(context),
+                run_id=context.get('run_id') or "manual",
+                run_date=logical_run_date(context),
+                max_bytes_billed=max_bytes_billed_from_config(config)
+            )
+
+        return create_dq_tables(
+            project_id=config['project_id'],
+            dataset_id=config['dataset_id'],
+            precomputed=staged_dq_results(context),
+            max_bytes_billed=max_bytes_billed_from_config(config),
+            run_id=context.get('run_id')
+        )
+
+def plan_dq_creation(config: Dict[str, str], memo: Dict[str, Any], **context: Any) -> Dict[str, Any]:
+    """
+    Plan the data quality jobs as a job graph for BigQueryJobGraphOperator.
+    
+    Args:
+        config: Dictionary containing project_id, dataset_id and dq_mode
+        memo: Unused, the DQ jobs are planned the same way on every resume
+        context: Airflow context, used to read the results computed during staging
+        
+    Returns:
+        Dict[str, Any]: Job graph plan, see BigQueryJobGraphOperator
     """
-    create_dq_tables(
-        project_id=config['project_id'],
-        dataset_id=config['dataset_id']
-    ) 
\ No newline at end of file
+    client = get_bigquery_client()
+    if dq_mode(config) == "history":
+        jobs = plan_dq_history(
+            client,
+            config['project_id'],
+            config['dataset_id'],
+            staged_partitions(context),
+            context.get('run_id') or "manual",
+            logical_run_date(context),
+            max_bytes_billed_from_config(config)
+        )
+    else:
+        jobs = plan_dq_tables(
+            client,
+            config['project_id'],
+            config['dataset_id'],
+            staged_dq_results(context),
+            max_bytes_billed_from_config(config)
+        )
+    return {
+        "jobs": jobs,
+        "client": client,
+        "metrics_table": metrics_table_id(config['project_id'], config['dataset_id'])
+    }
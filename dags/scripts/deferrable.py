@@ -0,0 +1,370 @@
+import os
+import time
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from airflow.configuration import conf
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from airflow.sensors.base import BaseSensorOperator
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+from scripts.run_dates import backfill_requested, date_path, run_dates
+
+# Only light modules are imported here: the DAG file uses this module at
+# parse time and the triggerer imports the triggers by classpath (the DAG
+# folder is on its sys.path); asyncio and the Google clients are imported
+# when a check runs
+
+# Constants
+GCS_POKE_INTERVAL_SECONDS = 60.0
+BQ_POLL_INTERVAL_SECONDS = 10.0
+MAX_GLOB_LENGTH = 1024  # Characters per match_glob; longer object lists are checked with several listings
+GLOB_CHARACTERS = set("*?[]{},\\")
+
+def default_deferrable() -> bool:
+    """
+    Whether the operators defer by default, from Airflow's ``[operators] default_deferrable``.
+
+    Deferred tasks need a running triggerer.
+
+    Returns:
+        bool: Default of the ``deferrable`` argument
+    """
+    return conf.getboolean("operators", "default_deferrable", fallback=False)
+
+def glob_batches(object_paths: List[str]) -> List[List[str]]:
+    """
+    Split object paths into groups whose ``{a,b,...}`` glob fits MAX_GLOB_LENGTH.
+
+    Args:
+        object_paths: Object paths, without glob characters
+
+    Returns:
+        List[List[str]]: Groups of paths, one listing each
+
+    Raises:
+        ValueError: If a path contains a glob character
+    """
+    batches = []
+    length = 0
+    for path in object_paths:
+        if GLOB_CHARACTERS & set(path):
+            raise ValueError(f"Object path contains glob characters: {path}")
+        if not batches or length + len(path) + 1 > MAX_GLOB_LENGTH:
+            batches.append([])
+            length = 2
+        batches[-1].append(path)
+        length += len(path) + 1
+    return batches
+
+def check_objects(
+    bucket_name: str,
+    object_paths: List[str],
+    min_size: int = 1,
+    updated_after: Optional[float] = None
+) -> Dict[str, List[str]]:
+    """
+    Check that objects exist in a bucket and are large and recent enough.
+
+    All objects are checked with a single listing, restricted to their
+    common prefix and matched against a ``{a,b,...}`` glob on the server,
+    instead of one request per object.
+
+    Args:
+        bucket_name: Bucket name
+        object_paths: Required object paths
+        min_size: Minimum size in bytes
+        updated_after: Epoch seconds the objects must have been written
+            after, None to skip the freshness check
+
+    Returns:
+        Dict[str, List[str]]: Paths that are missing, too_small and stale;
+            all empty when every object is ready
+    """
+    from scripts.gcp_clients import get_storage_client
+
+    client = get_storage_client()
+    found = {}
+    for batch in glob_batches(sorted(set(object_paths))):
+        glob = batch[0] if len(batch) == 1 else "{" + ",".join(batch) + "}"
+        for blob in client.list_blobs(bucket_name, prefix=os.path.commonprefix(batch), match_glob=glob):
+            found[blob.name] = blob
+    return {
+        "missing": [path for path in object_paths if path not in found],
+        "too_small": [path for path in object_paths if path in found and (found[path].size or 0) < min_size],
+        "stale": [
+            path for path in object_paths
+            if path in found and updated_after is not None and found[path].updated.timestamp() < updated_after
+        ]
+    }
+
+def describe_check(check: Dict[str, List[str]]) -> Optional[str]:
+    """
+    Summary of the objects that are not ready.
+
+    Args:
+        check: Result of check_objects
+
+    Returns:
+        Optional[str]: Summary, None if every object is ready
+    """
+    problems = [f"{kind.replace('_', ' ')}: {', '.join(paths)}" for kind, paths in check.items() if paths]
+    return "; ".join(problems) or None
+
+def finished_jobs(jobs: List[Dict[str, str]]) -> List[str]:
+    """
+    IDs of the finished BigQuery jobs among a list.
+
+    Args:
+        jobs: Job references with job_id, project and location
+
+    Returns:
+        List[str]: IDs of the jobs that are done, successfully or not
+    """
+    from scripts.gcp_clients import get_bigquery_client
+
+    client = get_bigquery_client()
+    return [
+        ref["job_id"] for ref in jobs
+        if client.get_job(ref["job_id"], project=ref["project"], location=ref["location"]).state == "DONE"
+    ]
+
+class GCSObjectsTrigger(BaseTrigger):
+    """Fires once every object is in the bucket, see check_objects"""
+
+    def __init__(
+        self,
+        bucket: str,
+        objects: List[str],
+        min_size: int = 1,
+        updated_after: Optional[float] = None,
+        poke_interval: float = GCS_POKE_INTERVAL_SECONDS
+    ):
+        super().__init__()
+        self.bucket = bucket
+        self.objects = objects
+        self.min_size = min_size
+        self.updated_after = updated_after
+        self.poke_interval = poke_interval
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return ("scripts.deferrable.GCSObjectsTrigger", {
+            "bucket": self.bucket,
+            "objects": self.objects,
+            "min_size": self.min_size,
+            "updated_after": self.updated_after,
+            "poke_interval": self.poke_interval
+        })
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        import asyncio
+
+        while True:
+            try:
+                check = await asyncio.to_thread(
+                    check_objects, self.bucket, self.objects, self.min_size, self.updated_after
+                )
+            except Exception as e:
+                yield TriggerEvent({"status": "error", "message": f"Checking gs://{self.bucket} failed: {str(e)}"})
+                return
+            problems = describe_check(check)
+            if problems is None:
+                yield TriggerEvent({"status": "success", "objects": len(self.objects)})
+                return
+            self.log.info(f"Waiting for gs://{self.bucket}: {problems}")
+            await asyncio.sleep(self.poke_interval)
+
+class BigQueryJobsTrigger(BaseTrigger):
+    """Fires as soon as any of the given BigQuery jobs is done"""
+
+    def __init__(self, jobs: List[Dict[str, str]], poll_interval: float = BQ_POLL_INTERVAL_SECONDS):
+        super().__init__()
+        self.jobs = jobs
+        self.poll_interval = poll_interval
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return ("scripts.deferrable.BigQueryJobsTrigger", {"jobs": self.jobs, "poll_interval": self.poll_interval})
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        import asyncio
+
+        while True:
+            try:
+                done = await asyncio.to_thread(finished_jobs, self.jobs)
+            except Exception as e:
+                yield TriggerEvent({"status": "error", "message": f"Polling BigQuery jobs failed: {str(e)}"})
+                return
+            if done:
+                yield TriggerEvent({"status": "success", "done": done})
+                return
+            await asyncio.sleep(self.poll_interval)
+
+class GCSObjectsSensor(BaseSensorOperator):
+    """
+    Waits until the objects of every date the run processes are in a bucket.
+
+    Each template of ``object_templates`` is expanded with the
+    ``{date_path}`` of every day of run_dates. The objects must be at least
+    ``min_size`` bytes and, except in a backfill run, which reprocesses old
+    files, written at most ``max_age`` before the run's logical date, so
+    retrying or clearing the run later still accepts them. Deferrable, the
+    wait runs in the triggerer with GCSObjectsTrigger after a first check
+    on the worker.
+    """
+
+    template_fields = ("bucket",)
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        object_templates: List[str],
+        min_size: int = 1,
+        max_age: Optional[timedelta] = None,
+        deferrable: Optional[bool] = None,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.object_templates = object_templates
+        self.min_size = min_size
+        self.max_age = max_age
+        self.deferrable = default_deferrable() if deferrable is None else deferrable
+
+    def required_objects(self, context: Dict[str, Any]) -> Tuple[List[str], Optional[float]]:
+        """
+        Objects the run needs and the time they must have been written after.
+
+        Args:
+            context: Airflow context dictionary
+
+        Returns:
+            Tuple[List[str], Optional[float]]: Object paths and epoch
+                seconds, None when freshness is not checked
+        """
+        objects = [
+            template.format(date_path=date_path(day))
+            for day in run_dates(context)
+            for template in self.object_templates
+        ]
+        updated_after = None
+        if self.max_age is not None and not backfill_requested(context):
+            logical_date = context.get("logical_date")
+            anchor = logical_date.timestamp() if logical_date else time.time()
+            updated_after = anchor - self.max_age.total_seconds()
+        return objects, updated_after
+
+    def poke(self, context: Dict[str, Any]) -> bool:
+        objects, updated_after = self.required_objects(context)
+        problems = describe_check(check_objects(self.bucket, objects, self.min_size, updated_after))
+        if problems is not None:
+            self.log.info(f"Waiting for gs://{self.bucket}: {problems}")
+        return problems is None
+
+    def execute(self, context: Dict[str, Any]) -> None:
+        if not self.deferrable:
+            return super().execute(context)
+        if self.poke(context):
+            return None
+        objects, updated_after = self.required_objects(context)
+        self.defer(
+            trigger=GCSObjectsTrigger(self.bucket, objects, self.min_size, updated_after, self.poke_interval),
+            method_name="execute_complete",
+            timeout=timedelta(seconds=self.timeout)
+        )
+
+    def execute_complete(self, context: Dict[str, Any], event: Dict[str, Any]) -> None:
+        if event["status"] != "success":
+            raise AirflowException(event["message"])
+        self.log.info(f"All {event['objects']} object(s) are in gs://{self.bucket}")
+
+class BigQueryJobGraphOperator(BaseOperator):
+    """
+    Runs a BigQuery job graph, handing the waits for its jobs to the triggerer.
+
+    ``plan_callable`` is called with ``memo``, ``op_kwargs`` and the
+    Airflow context, like the callable of a PythonOperator, and returns a
+    plan dictionary with:
+        jobs: Job definitions, see JobGraph
+        client: BigQuery client
+        metrics_table: Table the statistics of the finished jobs are written to
+        result: Optional callable of the job timings giving the task
+            result, the timings by default
+
+    Whenever the graph only waits for running jobs, the task defers to
+    BigQueryJobsTrigger, which fires as soon as one of them is done. The
+    task then plans the graph again and resumes it from its saved state,
+    so planning must give the same jobs every time: decisions that depend
+    on what the jobs change are kept in ``memo``, which is saved with the
+    state. Not deferrable, the graph is polled on the worker instead.
+    """
+
+    template_fields = ("op_kwargs",)
+
+    def __init__(
+        self,
+        *,
+        plan_callable: Callable[..., Dict[str, Any]],
+        op_kwargs: Optional[Dict[str, Any]] = None,
+        poll_interval: float = BQ_POLL_INTERVAL_SECONDS,
+        deferrable: Optional[bool] = None,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.plan_callable = plan_callable
+        self.op_kwargs = op_kwargs or {}
+        self.poll_interval = poll_interval
+        self.deferrable = default_deferrable() if deferrable is None else deferrable
+
+    def execute(self, context: Dict[str, Any]) -> Any:
+        return self.run_graph(context, {})
+
+    def execute_complete(self, context: Dict[str, Any], event: Dict[str, Any], state: Dict[str, Any]) -> Any:
+        if event["status"] != "success":
+            raise AirflowException(event["message"])
+        return self.run_graph(context, state)
+
+    def run_graph(self, context: Dict[str, Any], state: Dict[str, Any]) -> Any:
+        """
+        Plan the graph and advance it from ``state`` until it finishes or only waits.
+
+        Args:
+            context: Airflow context dictionary
+            state: Graph state and memo saved by the previous deferral, empty at first
+
+        Returns:
+            Any: Result of the plan once the graph finished
+
+        Raises:
+            JobGraphError: If any job failed
+        """
+        from airflow.utils.context import context_merge
+        from airflow.utils.operator_helpers import KeywordParameters
+        from scripts.bq_job_graph import JobGraph
+        from scripts.bq_metrics import JobRecorder
+        from scripts.tracing import trace
+
+        memo = state.get("memo", {})
+        context_merge(context, self.op_kwargs, memo=memo)
+        with trace(self.task_id, context):
+            plan = self.plan_callable(**KeywordParameters.determine(self.plan_callable, [], context).unpacking())
+            recorder = JobRecorder(context.get("run_id"))
+            try:
+                graph = JobGraph(plan["jobs"], recorder=recorder, state=state.get("graph"), client=plan["client"])
+                graph.advance_until_waiting()
+                while not self.deferrable and not graph.finished:
+                    time.sleep(self.poll_interval)
+                    graph.advance_until_waiting()
+            finally:
+                recorder.flush(plan["client"], plan["metrics_table"])
+
+        if not graph.finished:
+            self.log.info(f"Deferring while {len(graph.running)} job(s) run: {', '.join(graph.running)}")
+            self.defer(
+                trigger=BigQueryJobsTrigger(graph.running_jobs(), self.poll_interval),
+                method_name="execute_complete",
+                kwargs={"state": {"graph": graph.state(), "memo": memo}},
+                timeout=self.execution_timeout
+            )
+        timings = graph.result()
+        return plan["result"](timings) if plan.get("result") else timings
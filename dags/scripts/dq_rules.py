@@ -0,0 +1,165 @@
+from typing import Any, Dict, Iterator, List, Optional, Union
+import pyarrow as pa
+import pyarrow.compute as pc
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DQ_TABLE_PREFIX = "dq_"
+
+# Data quality checks of each stage table. Every rule counts the rows where
+# ``condition`` holds for ``column``:
+#   "is_null"  - the value is NULL
+#   "negative" - the value is below zero
+DQ_RULES = {
+    "stage_aws_billing": [
+        {"check_name": "account_id IS NULL", "column": "account_id", "condition": "is_null"},
+        {"check_name": "usage_amount < 0", "column": "usage_amount", "condition": "negative"},
+        {"check_name": "product_code IS NULL", "column": "product_code", "condition": "is_null"},
+        {"check_name": "service_code IS NULL", "column": "service_code", "condition": "is_null"},
+        {"check_name": "usage_type IS NULL", "column": "usage_type", "condition": "is_null"},
+        {"check_name": "instance_type IS NULL", "column": "instance_type", "condition": "is_null"},
+        {"check_name": "net_cost IS NULL", "column": "net_cost", "condition": "is_null"},
+        {"check_name": "start_date IS NULL", "column": "start_date", "condition": "is_null"}
+    ],
+    "stage_aws_prices": [
+        {"check_name": "product_code IS NULL", "column": "product_code", "condition": "is_null"},
+        {"check_name": "precio_lista IS NULL", "column": "precio_lista", "condition": "is_null"},
+        {"check_name": "precio_lista < 0", "column": "precio_lista", "condition": "negative"},
+        {"check_name": "pricing_unit IS NULL", "column": "pricing_unit", "condition": "is_null"}
+    ]
+}
+
+SQL_CONDITIONS = {
+    "is_null": "{column} IS NULL",
+    "negative": "{column} < 0"
+}
+
+def rule_predicate(rule: Dict[str, str]) -> str:
+    """
+    SQL predicate of a rule, true for the rows with an issue.
+
+    Args:
+        rule: Rule definition from DQ_RULES
+
+    Returns:
+        str: Boolean SQL expression
+    """
+    return SQL_CONDITIONS[rule["condition"]].format(column=rule["column"])
+
+def build_dq_select(
+    table_ref: str,
+    rules: List[Dict[str, str]],
+    where: str = "",
+    group_by: Optional[str] = None
+) -> str:
+    """
+    SQL evaluating every rule of a table in a single scan.
+
+    Args:
+        table_ref: Table reference, quoted as needed
+        rules: Rule definitions from DQ_RULES
+        where: Optional filter on the rows checked
+        group_by: Optional column to evaluate the rules per value of
+            (e.g. the partition column), returned as the first column
+
+    Returns:
+        str: SELECT returning one (check_name, num_issues) row per rule and group
+    """
+    checks = ",\n            ".join(
+        f"STRUCT('{rule['check_name']}' AS check_name, COUNTIF({rule_predicate(rule)}) AS num_issues)"
+        for rule in rules
+    )
+    key = f"{group_by}, " if group_by else ""
+    return f"""
+    SELECT {key}c.check_name, c.num_issues
+    FROM (
+        SELECT {key}[
+            {checks}
+        ] AS checks
+        FROM {table_ref}
+        {f"WHERE {where}" if where else ""}
+        {f"GROUP BY {group_by}" if group_by else ""}
+    ), UNNEST(checks) c
+    """
+
+class DQProfile:
+    """Accumulates the data quality counts of a table batch by batch with Arrow compute"""
+
+    def __init__(self, rules: List[Dict[str, str]]):
+        self.rules = rules
+        self.counts = [0] * len(rules)
+        self.num_rows = 0
+
+    def update(self, data: Union[pa.RecordBatch, pa.Table]) -> None:
+        """
+        Add the issues found in a record batch or table.
+
+        A column missing from the data counts as NULL in every row, the
+        same way BigQuery sees a column absent from the loaded files.
+
+        Args:
+            data: Record batch or table to profile
+
+        Raises:
+            ValueError: If a "negative" rule targets a non-numeric column
+        """
+        names = data.schema.names
+        for i, rule in enumerate(self.rules):
+            column = rule["column"]
+            if column not in names:
+                self.counts[i] += data.num_rows if rule["condition"] == "is_null" else 0
+                continue
+
+            values = data.column(names.index(column))
+            if rule["condition"] == "is_null":
+                self.counts[i] += values.null_count
+            elif rule["condition"] == "negative":
+                if not (pa.types.is_integer(values.type) or pa.types.is_floating(values.type)):
+                    raise ValueError(f"Rule '{rule['check_name']}' needs a numeric column, got {values.type}")
+                self.counts[i] += pc.sum(pc.less(values, 0)).as_py() or 0
+            else:
+                raise ValueError(f"Unknown DQ condition: {rule['condition']}")
+        self.num_rows += data.num_rows
+
+    def merge(self, other: "DQProfile") -> None:
+        """
+        Add the counts of another profile of the same rules.
+
+        Args:
+            other: Profile of other rows of the same table
+
+        Raises:
+            ValueError: If the profiles have different rules
+        """
+        if other.rules != self.rules:
+            raise ValueError("Cannot merge DQ profiles with different rules")
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.num_rows += other.num_rows
+
+    def observe(self, batches: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        """
+        Pass record batches through, profiling each one on the way.
+
+        Args:
+            batches: Record batches
+
+        Yields:
+            pa.RecordBatch: The same batches, unchanged
+        """
+        for batch in batches:
+            self.update(batch)
+            yield batch
+
+    def results(self) -> List[Dict[str, Any]]:
+        """
+        Counts per check, in rule order.
+
+        Returns:
+            List[Dict[str, Any]]: Rows with check_name and num_issues
+        """
+        return [
+            {"check_name": rule["check_name"], "num_issues": count}
+            for rule, count in zip(self.rules, self.counts)
+        ]
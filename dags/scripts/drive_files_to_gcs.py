@@ -1,16 +1,29 @@
 from google.cloud import storage
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
 from google.api_core import retry
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
 import datetime
+import httplib2
+import json
 import logging
 import os
-from typing import List, Optional, Dict
+import queue
+import threading
+import time
+from typing import List, Optional, Dict, Tuple
 from pathlib import Path
 from airflow.exceptions import AirflowException
 
+from scripts.concurrency import DEFAULT_MAX_WORKERS, ConcurrentExecutionError, run_concurrently
+from scripts.gcp_clients import get_drive_service, get_drive_session, get_storage_client, service_account_credentials
+from scripts.run_checkpoints import RAW_READ, completed_stage, load_checkpoints, record_stage
+from scripts.run_dates import backfill_requested, date_path, run_created_date, run_dates
+from scripts.source_manifest import MANIFEST_PREFIX, is_unchanged, load_manifest, update_manifest
+from scripts.tracing import span, trace
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +39,27 @@ FILES_TO_FETCH = [
 
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
+# File ID resolution settings
+FILE_ID_CACHE_PATH = f"{MANIFEST_PREFIX}/drive_file_ids.json"
+FILE_ID_CACHE_TTL_SECONDS = 24 * 60 * 60
+TRANSIENT_HTTP_STATUSES = (408, 429, 500, 502, 503, 504)
+DRIVE_METADATA_FIELDS = "size, md5Checksum, modifiedTime, trashed"
+
+# Transfer settings
+TRANSFER_MODES = ("buffered", "streaming", "ranged")
+DEFAULT_TRANSFER_MODE = "streaming"
+TRANSFER_CHUNK_SIZE = 8 * 1024 * 1024  # Drive download / GCS upload chunk, multiple of 256 KiB
+MAX_INFLIGHT_CHUNKS = 4                # Downloaded chunks waiting for upload before the download blocks
+QUEUE_POLL_SECONDS = 1.0
+
+# Ranged transfer settings
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+RANGED_PART_SIZE = 32 * 1024 * 1024    # Bytes fetched per Range request / composed part
+RANGED_MIN_SIZE = 256 * 1024 * 1024    # Smaller files are streamed sequentially
+RANGED_WORKERS = 8
+RANGED_TIMEOUT_SECONDS = 300
+COMPOSE_MAX_SOURCES = 32               # GCS compose limit per request
+
 class DriveToGCSIngestionError(Exception):
     """Custom exception for ingestion errors"""
     pass
@@ -34,6 +68,9 @@ def initialize_clients(credentials_path: str) -> Dict:
     """
     Initialize Google Drive and Storage clients.
     
+    The clients come from the process-wide factory (see scripts.gcp_clients)
+    and can be shared by the threads of a concurrent ingestion.
+    
     Args:
         credentials_path: Path to the service account credentials file
         
@@ -44,20 +81,131 @@ def initialize_clients(credentials_path: str) -> Dict:
         AirflowException: If client initialization fails
     """
     try:
-        creds = service_account.Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
-        drive_service = build('drive', 'v3', credentials=creds)
-        storage_client = storage.Client()
-        
+        creds = service_account_credentials(credentials_path, SCOPES)
         return {
-            'drive': drive_service,
-            'storage': storage_client
+            'drive': get_drive_service(creds),
+            # Pooled session for concurrent Range requests against the Drive media endpoint
+            'drive_session': get_drive_session(creds),
+            'storage': get_storage_client()
         }
     except Exception as e:
         error_msg = f"Failed to initialize clients: {str(e)}"
         logger.error(error_msg)
         raise AirflowException(error_msg)
 
-@retry.Retry(predicate=retry.if_exception_type(Exception))
+def is_transient_error(exc: Exception) -> bool:
+    """
+    Whether an error is worth retrying.
+    
+    Rate limits, server errors and connection problems are transient; a
+    missing file, bad credentials or a checksum mismatch are not, so they
+    fail fast instead of being retried until the deadline. Wrapped errors
+    are judged by their cause.
+    
+    Args:
+        exc: Raised exception
+        
+    Returns:
+        bool: True if the operation should be retried
+    """
+    while exc is not None:
+        if isinstance(exc, HttpError):
+            return exc.resp.status in TRANSIENT_HTTP_STATUSES
+        if retry.if_transient_error(exc) or isinstance(exc, (httplib2.HttpLib2Error, ConnectionError, TimeoutError)):
+            return True
+        exc = exc.__cause__
+    return False
+
+def _quote(value: str) -> str:
+    # Escape a string literal for a Drive query
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+@retry.Retry(predicate=is_transient_error)
+def lookup_file_ids(drive_service, file_names: List[str]) -> Dict[str, str]:
+    """
+    Resolve several Drive file names to IDs with a single OR-query.
+    
+    When a name matches several files, the most recently modified one wins.
+    
+    Args:
+        drive_service: Google Drive service instance
+        file_names: Names of the files to find
+        
+    Returns:
+        Dict[str, str]: File ID by file name
+        
+    Raises:
+        DriveToGCSIngestionError: If any file is not found
+    """
+    names = " or ".join(f"name='{_quote(name)}'" for name in file_names)
+    query = f"({names}) and trashed=false"
+    file_ids = {}
+    page_token = None
+    while True:
+        results = drive_service.files().list(
+            q=query,
+            pageSize=1000,
+            orderBy="modifiedTime desc",
+            fields="nextPageToken, files(id, name)",
+            pageToken=page_token
+        ).execute()
+        for item in results.get('files', []):
+            file_ids.setdefault(item['name'], item['id'])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+    missing = [name for name in file_names if name not in file_ids]
+    if missing:
+        raise DriveToGCSIngestionError(f"Files not found in Drive: {', '.join(missing)}")
+    return {name: file_ids[name] for name in file_names}
+
+def resolve_file_ids(
+    drive_service,
+    cache_bucket: storage.Bucket,
+    file_names: List[str],
+    refresh: bool = False
+) -> Dict[str, str]:
+    """
+    Resolve Drive file IDs through a TTL cache persisted in GCS.
+    
+    Names whose cached ID is younger than FILE_ID_CACHE_TTL_SECONDS are
+    served from the cache; the rest are resolved together with one query
+    and written back. get_file_metadata resolves a cached ID again once
+    its file is trashed.
+    
+    Args:
+        drive_service: Google Drive service instance
+        cache_bucket: Bucket holding the cache object
+        file_names: Names of the files to resolve
+        refresh: Ignore cached entries
+        
+    Returns:
+        Dict[str, str]: File ID by file name
+    """
+    cache_blob = cache_bucket.blob(FILE_ID_CACHE_PATH)
+    try:
+        cache = json.loads(cache_blob.download_as_bytes())
+    except Exception:
+        cache = {}
+
+    now = time.time()
+    file_ids = {}
+    if not refresh:
+        for name in file_names:
+            entry = cache.get(name)
+            if entry and now - entry.get("resolved_at", 0) < FILE_ID_CACHE_TTL_SECONDS:
+                file_ids[name] = entry["id"]
+
+    missing = [name for name in file_names if name not in file_ids]
+    if missing:
+        resolved = lookup_file_ids(drive_service, missing)
+        file_ids.update(resolved)
+        cache.update({name: {"id": file_id, "resolved_at": now} for name, file_id in resolved.items()})
+        cache_blob.upload_from_string(json.dumps(cache, indent=2), content_type="application/json")
+        logger.info(f"Resolved Drive file IDs for: {', '.join(missing)}")
+    return file_ids
+
 def find_file_id_by_name(drive_service, file_name: str) -> str:
     """
     Find a file ID in Google Drive by its name.
@@ -73,93 +221,480 @@ def find_file_id_by_name(drive_service, file_name: str) -> str:
         DriveToGCSIngestionError: If file is not found
     """
     try:
-        query = f"name='{file_name}' and trashed=false"
-        results = drive_service.files().list(q=query, pageSize=1, fields="files(id, name)").execute()
-        files = results.get('files', [])
-        if not files:
-            raise DriveToGCSIngestionError(f"File not found in Drive: {file_name}")
-        return files[0]['id']
+        return lookup_file_ids(drive_service, [file_name])[file_name]
     except Exception as e:
         logger.error(f"Error finding file {file_name}: {str(e)}")
         raise
 
-@retry.Retry(predicate=retry.if_exception_type(Exception))
-def download_and_upload(drive_service, storage_client, file_name: str, bucket_name: str) -> None:
+def get_file_metadata(drive_service, file_name: str, file_id: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Fetch the Drive metadata of a file, resolving its ID again if needed.
+    
+    A cached ID that was deleted or trashed is resolved again by name:
+    Drive still serves the metadata and content of a trashed file, so it
+    would otherwise be ingested until the cache entry expires.
+    
+    Args:
+        drive_service: Google Drive service instance
+        file_name: Name of the file
+        file_id: Drive file ID if already resolved, looked up by name otherwise
+        
+    Returns:
+        Tuple[str, Dict]: Current file ID and its DRIVE_METADATA_FIELDS
+    """
+    file_id = file_id or find_file_id_by_name(drive_service, file_name)
+    try:
+        metadata = drive_service.files().get(fileId=file_id, fields=DRIVE_METADATA_FIELDS).execute()
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        metadata = None
+    if metadata is None or metadata.get("trashed"):
+        logger.info(f"Drive file ID of {file_name} is deleted or trashed, resolving the name again")
+        file_id = find_file_id_by_name(drive_service, file_name)
+        metadata = drive_service.files().get(fileId=file_id, fields=DRIVE_METADATA_FIELDS).execute()
+    return file_id, metadata
+
+class _ChunkQueueWriter:
+    """File-like sink handing downloaded chunks to the uploader through a bounded queue"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self._chunks = chunks
+        self._cancelled = cancelled
+
+    def put(self, item) -> None:
+        # Blocks while the queue is full (backpressure) unless the upload side gave up
+        while True:
+            if self._cancelled.is_set():
+                raise DriveToGCSIngestionError("Upload side cancelled the transfer")
+            try:
+                self._chunks.put(item, timeout=QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data: bytes) -> int:
+        self.put(bytes(data))
+        return len(data)
+
+def stream_download_to_blob(
+    request,
+    blob: storage.Blob,
+    file_name: str,
+    chunk_size: int = TRANSFER_CHUNK_SIZE,
+    max_inflight_chunks: int = MAX_INFLIGHT_CHUNKS
+) -> int:
+    """
+    Pipe a Drive media download into a GCS resumable upload.
+    
+    A background thread drives ``MediaIoBaseDownload`` and hands each chunk
+    to the uploader through a queue of at most ``max_inflight_chunks``
+    entries, so download and upload overlap and memory stays flat regardless
+    of the file size. A failure on either side aborts the other one and the
+    resumable session is terminated without creating the object.
+    
+    Args:
+        request: Drive ``get_media`` request for the file
+        blob: Destination GCS blob
+        file_name: Name of the file, used for logging
+        chunk_size: Size of each downloaded and uploaded chunk
+        max_inflight_chunks: Chunks buffered between download and upload
+        
+    Returns:
+        int: Bytes transferred
+        
+    Raises:
+        DriveToGCSIngestionError: If the download or the upload fails
+    """
+    chunks = queue.Queue(maxsize=max_inflight_chunks)
+    cancelled = threading.Event()
+    sink = _ChunkQueueWriter(chunks, cancelled)
+    errors = []
+    transferred = 0
+
+    def download() -> None:
+        try:
+            downloader = MediaIoBaseDownload(sink, request, chunksize=chunk_size)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk()
+                logger.info(f"Downloading {file_name}: {int(status.progress() * 100)}%")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                sink.put(None)  # End of stream
+            except DriveToGCSIngestionError:
+                pass
+
+    producer = threading.Thread(target=download, name=f"download-{file_name}", daemon=True)
+    producer.start()
+    try:
+        with blob.open("wb", chunk_size=chunk_size) as writer:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                writer.write(chunk)
+                transferred += len(chunk)
+            if errors:
+                # Raising inside the writer context terminates the resumable session
+                raise DriveToGCSIngestionError(f"Download of {file_name} failed: {str(errors[0])}") from errors[0]
+    finally:
+        cancelled.set()
+        producer.join()
+    return transferred
+
+def split_byte_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a file size into consecutive inclusive byte ranges.
+    
+    Args:
+        size: Total size in bytes
+        part_size: Maximum bytes per range
+        
+    Returns:
+        List[Tuple[int, int]]: (start, end) pairs, end inclusive as in HTTP Range headers
+    """
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+def fetch_byte_range(session, url: str, start: int, end: int) -> bytes:
+    """
+    Fetch one byte range of a file with an HTTP Range request.
+    
+    Args:
+        session: requests-compatible session (AuthorizedSession for Drive)
+        url: Media URL of the file
+        start: First byte of the range
+        end: Last byte of the range, inclusive
+        
+    Returns:
+        bytes: Content of the range
+        
+    Raises:
+        DriveToGCSIngestionError: If the server does not honour the range
+    """
+    response = session.get(url, headers={"Range": f"bytes={start}-{end}"}, timeout=RANGED_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise DriveToGCSIngestionError(f"Range request not honoured for {url}: HTTP {response.status_code}")
+    content = response.content
+    if len(content) != end - start + 1:
+        raise DriveToGCSIngestionError(
+            f"Short range read for {url}: expected {end - start + 1} bytes, got {len(content)}"
+        )
+    return content
+
+def compose_in_order(bucket: storage.Bucket, destination: storage.Blob, parts: List[storage.Blob]) -> List[storage.Blob]:
+    """
+    Compose part objects into the destination object, preserving their order.
+    
+    GCS composes at most 32 sources per request, so larger part lists are
+    composed in tiers of intermediate objects first.
+    
+    Args:
+        bucket: Bucket holding the parts
+        destination: Final object
+        parts: Part objects in file order
+        
+    Returns:
+        List[storage.Blob]: Intermediate objects created, to be cleaned up by the caller
+    """
+    intermediates = []
+    level = 0
+    while len(parts) > COMPOSE_MAX_SOURCES:
+        grouped = []
+        for i in range(0, len(parts), COMPOSE_MAX_SOURCES):
+            target = bucket.blob(f"{destination.name}.parts/compose-{level}-{i // COMPOSE_MAX_SOURCES:05d}")
+            target.compose(parts[i:i + COMPOSE_MAX_SOURCES])
+            grouped.append(target)
+        intermediates.extend(grouped)
+        parts = grouped
+        level += 1
+    destination.compose(parts)
+    return intermediates
+
+def ranged_download_to_blob(
+    session,
+    file_id: str,
+    size: int,
+    md5_checksum: Optional[str],
+    bucket: storage.Bucket,
+    destination_path: str,
+    part_size: int = RANGED_PART_SIZE,
+    max_workers: int = RANGED_WORKERS,
+    base_url: str = DRIVE_FILES_URL
+) -> None:
+    """
+    Download a file with concurrent Range requests and reassemble it in GCS.
+    
+    Each range is fetched by a worker and uploaded as a part object, then the
+    parts are joined with a parallel composite upload (``compose``). Ranges
+    are hashed in file order to verify Drive's ``md5Checksum``; at most
+    ``max_workers + 2`` ranges are in flight so memory stays bounded. The
+    endpoint is ``{base_url}/{file_id}?alt=media``, so a local HTTP server
+    that serves Range requests can stand in for Drive.
+    
+    Args:
+        session: requests-compatible session used for the Range requests
+        file_id: Drive file ID
+        size: File size in bytes from the Drive metadata
+        md5_checksum: Expected MD5 hex digest, skipped if None
+        bucket: Destination GCS bucket
+        destination_path: Destination object path
+        part_size: Bytes per range / part object
+        max_workers: Concurrent range transfers
+        base_url: Files endpoint of the Drive API
+        
+    Raises:
+        DriveToGCSIngestionError: If a range fails or the checksum does not match
+    """
+    url = f"{base_url}/{file_id}?alt=media"
+    ranges = split_byte_ranges(size, part_size)
+    parts = [bucket.blob(f"{destination_path}.parts/part-{i:05d}") for i in range(len(ranges))]
+    intermediates = []
+
+    def transfer(index: int) -> bytes:
+        start, end = ranges[index]
+        data = fetch_byte_range(session, url, start, end)
+        parts[index].upload_from_string(data, content_type="application/octet-stream", checksum="crc32c")
+        return data
+
+    try:
+        md5 = hashlib.md5()
+        window = max_workers + 2
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            submitted = 0
+            try:
+                for index in range(len(ranges)):
+                    while submitted < len(ranges) and submitted < index + window:
+                        pending[submitted] = executor.submit(transfer, submitted)
+                        submitted += 1
+                    md5.update(pending.pop(index).result())
+            except Exception:
+                for future in pending.values():
+                    future.cancel()
+                raise
+
+        if md5_checksum and md5.hexdigest() != md5_checksum:
+            raise DriveToGCSIngestionError(
+                f"MD5 mismatch for {destination_path}: expected {md5_checksum}, got {md5.hexdigest()}"
+            )
+
+        intermediates = compose_in_order(bucket, bucket.blob(destination_path), parts)
+        logger.info(f"Composed {len(parts)} parts into gs://{bucket.name}/{destination_path}")
+    finally:
+        for blob in parts + intermediates:
+            try:
+                blob.delete()
+            except Exception:
+                pass  # Part never uploaded or already removed
+
+@retry.Retry(predicate=is_transient_error)
+def download_and_upload(
+    drive_service,
+    storage_client,
+    file_name: str,
+    bucket_name: str,
+    transfer_mode: str = DEFAULT_TRANSFER_MODE,
+    drive_session=None,
+    force_refresh: bool = False,
+    file_id: Optional[str] = None,
+    day_path: Optional[str] = None,
+    run_id: Optional[str] = None
+) -> None:
     """
     Download a file from Drive and upload it to GCS.
     
+    If the Drive ``md5Checksum`` and ``modifiedTime`` match the source
+    manifest, the previous raw object is copied server-side to the day's
+    path instead of being downloaded again. A file the run already
+    ingested, per its checkpoint, is skipped without calling Drive.
+    
     Args:
         drive_service: Google Drive service instance
         storage_client: Google Cloud Storage client
         file_name: Name of the file to process
         bucket_name: Name of the GCS bucket to upload to
+        transfer_mode: "buffered" to download fully before uploading,
+            "streaming" to pipe chunks into a resumable upload as they arrive,
+            "ranged" to fetch byte ranges concurrently and compose them
+            (files under RANGED_MIN_SIZE are streamed instead)
+        drive_session: Authorized session for Range requests, required for "ranged"
+        force_refresh: Download even if the manifest says the file is unchanged
+        file_id: Drive file ID if already resolved, looked up by name otherwise
+        day_path: Date folder (YYYY/MM/DD) to upload to, today's by default
+        run_id: Airflow run ID whose checkpoint records the ingested file
         
     Raises:
         DriveToGCSIngestionError: If download or upload fails
     """
     try:
-        file_id = find_file_id_by_name(drive_service, file_name)
-        request = drive_service.files().get_media(fileId=file_id)
-        buffer = io.BytesIO()
-        downloader = MediaIoBaseDownload(buffer, request)
-        
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-            logger.info(f"Downloading {file_name}: {int(status.progress() * 100)}%")
-
-        buffer.seek(0)
+        if transfer_mode not in TRANSFER_MODES:
+            raise ValueError(f"Unsupported transfer mode: {transfer_mode}")
 
         # Partitioned date format: YYYY/MM/DD
-        today = datetime.datetime.now().strftime("%Y/%m/%d")
+        day_path = day_path or date_path(datetime.date.today())
         base_name = os.path.splitext(file_name)[0]
-        destination_path = f"{base_name}/{today}/{file_name}"
+        destination_path = f"{base_name}/{day_path}/{file_name}"
         bucket = storage_client.bucket(bucket_name)
+
+        ingested = completed_stage(load_checkpoints(bucket, run_id), destination_path, RAW_READ)
+        if ingested:
+            existing = bucket.get_blob(destination_path)
+            if existing is not None and existing.crc32c == ingested["crc32c"]:
+                logger.info(f"{file_name} already ingested by this run to gs://{bucket_name}/{destination_path}")
+                return
+
+        file_id, metadata = get_file_metadata(drive_service, file_name, file_id)
+        request = drive_service.files().get_media(fileId=file_id)
         blob = bucket.blob(destination_path)
-        
-        blob.upload_from_file(buffer, rewind=True)
+
+        drive_fingerprint = {
+            "drive_md5_checksum": metadata.get("md5Checksum"),
+            "drive_modified_time": metadata.get("modifiedTime")
+        }
+        manifest = load_manifest(bucket, base_name)
+        previous_raw = manifest.get("raw_path")
+        if not force_refresh and is_unchanged(manifest, drive_fingerprint) and previous_raw \
+                and bucket.blob(previous_raw).exists():
+            if previous_raw != destination_path:
+                with span("copy", bytes=int(metadata.get("size", 0))):
+                    bucket.copy_blob(bucket.blob(previous_raw), bucket, destination_path)
+            logger.info(f"{file_name} unchanged in Drive, reused gs://{bucket_name}/{previous_raw}")
+        elif transfer_mode == "ranged":
+            size = int(metadata.get("size", 0))
+            if size >= RANGED_MIN_SIZE:
+                logger.info(f"Downloading {file_name} ({size} bytes) in ranges of {RANGED_PART_SIZE} bytes")
+                # Download and upload overlap, timed as one transfer
+                with span("transfer", mode="ranged", bytes=size):
+                    ranged_download_to_blob(
+                        drive_session,
+                        file_id,
+                        size,
+                        metadata.get("md5Checksum"),
+                        bucket,
+                        destination_path
+                    )
+            else:
+                with span("transfer", mode="streaming") as transfer:
+                    transfer.set(bytes=stream_download_to_blob(request, blob, file_name))
+        elif transfer_mode == "streaming":
+            with span("transfer", mode="streaming") as transfer:
+                transfer.set(bytes=stream_download_to_blob(request, blob, file_name))
+        else:
+            buffer = io.BytesIO()
+            with span("download") as download:
+                downloader = MediaIoBaseDownload(buffer, request)
+                
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+                    logger.info(f"Downloading {file_name}: {int(status.progress() * 100)}%")
+                download.set(bytes=buffer.getbuffer().nbytes)
+
+            buffer.seek(0)
+            with span("upload", bytes=buffer.getbuffer().nbytes):
+                blob.upload_from_file(buffer, rewind=True)
         logger.info(f"Uploaded to GCS: gs://{bucket_name}/{destination_path}")
+
+        blob.reload()
+        update_manifest(
+            bucket,
+            base_name,
+            drive_file_id=file_id,
+            raw_path=destination_path,
+            raw_crc32c=blob.crc32c,
+            **drive_fingerprint
+        )
+        record_stage(bucket, run_id, destination_path, RAW_READ, crc32c=blob.crc32c)
         
     except Exception as e:
         logger.error(f"Error processing file {file_name}: {str(e)}")
-        raise DriveToGCSIngestionError(f"Failed to process {file_name}: {str(e)}")
+        raise DriveToGCSIngestionError(f"Failed to process {file_name}: {str(e)}") from e
 
-def run_ingestion(credentials_path: str, raw_bucket: str, **context) -> None:
+def run_ingestion(
+    credentials_path: str,
+    raw_bucket: str,
+    transfer_mode: str = DEFAULT_TRANSFER_MODE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    force_refresh: bool = False,
+    **context
+) -> None:
     """
     Run the ingestion process for all configured files.
     
+    Files are ingested concurrently, at most ``max_workers`` at a time, and
+    every failed file is reported instead of only the first one. The time
+    and bytes of each transfer stage are traced and summarized in XCom.
+    Files land in the folder of the run's logical date. Drive only holds the
+    current files, so a backfill run (see run_dates) or a run created after
+    its logical date (see run_created_date) ingests nothing and reprocesses
+    the raw files already in the bucket, which are never replaced with
+    later data. A retry of a run of today still ingests after midnight.
+    
     Args:
         credentials_path: Path to the service account credentials file
         raw_bucket: Name of the GCS bucket to upload to
+        transfer_mode: How each file is moved from Drive to GCS (see download_and_upload)
+        max_workers: Maximum number of files transferred at the same time
+        force_refresh: Download every file even if unchanged since the last run
         context: Airflow context dictionary containing execution context
         
     Raises:
         AirflowException: If ingestion fails
     """
     try:
-        # Initialize clients
-        clients = initialize_clients(credentials_path)
-        
-        # Process each file
-        for file_name in FILES_TO_FETCH:
-            try:
-                logger.info(f"Starting ingestion for {file_name}")
-                download_and_upload(
-                    drive_service=clients['drive'],
-                    storage_client=clients['storage'],
-                    file_name=file_name,
-                    bucket_name=raw_bucket
+        if backfill_requested(context):
+            logger.info("Backfill run, reprocessing the raw files already in the bucket")
+            return
+
+        day = run_dates(context)[0]
+        created = run_created_date(context)
+        if created is not None and day < created:
+            logger.info(f"Run of a past day ({day.isoformat()}), reprocessing the raw files already in the bucket")
+            return
+
+        day_path = date_path(day)
+        with trace("extract_from_drive", context):
+            # Initialize clients
+            with span("setup_clients"):
+                clients = initialize_clients(credentials_path)
+
+            # Resolve every file ID at once
+            with span("resolve_file_ids"):
+                file_ids = resolve_file_ids(
+                    clients['drive'],
+                    clients['storage'].bucket(raw_bucket),
+                    FILES_TO_FETCH,
+                    refresh=force_refresh
                 )
+
+            def ingest(file_name: str) -> None:
+                logger.info(f"Starting ingestion for {file_name}")
+                with span("ingest", file=file_name, mode=transfer_mode):
+                    download_and_upload(
+                        drive_service=clients['drive'],
+                        storage_client=clients['storage'],
+                        file_name=file_name,
+                        bucket_name=raw_bucket,
+                        transfer_mode=transfer_mode,
+                        drive_session=clients['drive_session'],
+                        force_refresh=force_refresh,
+                        file_id=file_ids[file_name],
+                        day_path=day_path,
+                        run_id=context.get('run_id')
+                    )
                 logger.info(f"Successfully completed ingestion for {file_name}")
-            except DriveToGCSIngestionError as e:
-                error_msg = f"Failed to ingest {file_name}: {str(e)}"
-                logger.error(error_msg)
-                raise AirflowException(error_msg)
-            except Exception as e:
-                error_msg = f"Unexpected error processing {file_name}: {str(e)}"
-                logger.error(error_msg)
-                raise AirflowException(error_msg)
-                
+
+            # Process files concurrently
+            run_concurrently(ingest, FILES_TO_FETCH, max_workers=max_workers)
+
+    except ConcurrentExecutionError as e:
+        error_msg = f"Failed to ingest files: {str(e)}"
+        logger.error(error_msg)
+        raise AirflowException(error_msg)
     except Exception as e:
         error_msg = f"Failed to run ingestion process: {str(e)}"
         logger.error(error_msg)
@@ -0,0 +1,259 @@
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from google.cloud import storage
+from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import google.auth
+import httplib2
+import json
+import logging
+import os
+import threading
+import time
+
+from scripts.tracing import record_span, span
+
+logger = logging.getLogger(__name__)
+
+# Constants
+CLOUD_PLATFORM_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+POOL_SIZE_ENV = "GCP_HTTP_POOL_SIZE"
+DEFAULT_POOL_SIZE = 32  # Keep-alive connections per host, above the default of 10 so no thread waits for one
+
+_clients: Dict[Hashable, Any] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_lock = threading.RLock()
+_thread_http = threading.local()  # Authorized httplib2 connections of each thread, see thread_http()
+
+def _reset_after_fork() -> None:
+    # Connections and locks must not be shared with a forked task process
+    global _lock, _thread_http
+    _lock = threading.RLock()
+    _thread_http = threading.local()
+    _clients.clear()
+    _stats.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def pool_size() -> int:
+    """
+    HTTP connection pool size per host, set with GCP_HTTP_POOL_SIZE.
+
+    Returns:
+        int: Pool size
+    """
+    return int(os.environ.get(POOL_SIZE_ENV) or DEFAULT_POOL_SIZE)
+
+def _cached(name: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    Return the cached client for a key, creating it once per process.
+
+    The creation time is kept so every later reuse adds it to the setup
+    time saved, see client_stats(). Creations and reuses are recorded in
+    the current trace.
+    """
+    with _lock:
+        stats = _stats.setdefault(name, {"created": 0, "reused": 0, "setup_seconds": 0.0, "saved_seconds": 0.0})
+        if key in _clients:
+            client, setup_seconds = _clients[key]
+            stats["reused"] += 1
+            stats["saved_seconds"] = round(stats["saved_seconds"] + setup_seconds, 6)
+            record_span("client_reuse", time.time_ns(), 0.0, client=name, saved_seconds=round(setup_seconds, 6))
+            return client
+
+        start = time.perf_counter()
+        with span("client_setup", client=name):
+            client = factory()
+        setup_seconds = time.perf_counter() - start
+        _clients[key] = (client, setup_seconds)
+        stats["created"] += 1
+        stats["setup_seconds"] = round(stats["setup_seconds"] + setup_seconds, 6)
+        logger.info(json.dumps({"event": "gcp_client_created", "client": name, "setup_seconds": round(setup_seconds, 6)}))
+        return client
+
+def credentials_key(credentials: Optional[Credentials]) -> Hashable:
+    """
+    Cache key of credentials.
+
+    Service account credentials are identified by their account and
+    scopes, so credentials loaded again for the same account share the
+    cached clients. Other credentials are the key themselves: the cache
+    holds a reference to them, so their identity cannot be taken over by
+    new credentials after they are garbage collected.
+
+    Args:
+        credentials: Credentials, None for application default credentials
+
+    Returns:
+        Hashable: Key
+    """
+    if credentials is None:
+        return None
+    email = getattr(credentials, "service_account_email", None)
+    if email:
+        return ("service_account", email, tuple(getattr(credentials, "scopes", None) or ()))
+    return credentials
+
+def thread_http(credentials: Credentials) -> AuthorizedHttp:
+    """
+    Authorized httplib2 connection of the calling thread.
+
+    httplib2 is not thread-safe, so each thread gets its own connection,
+    created on its first request and kept alive for the next ones.
+
+    Args:
+        credentials: Credentials used to authorize the requests
+
+    Returns:
+        AuthorizedHttp: Connection owned by the calling thread
+    """
+    connections = _thread_http.__dict__.setdefault("connections", {})
+    key = credentials_key(credentials)
+    if key not in connections:
+        connections[key] = AuthorizedHttp(credentials, http=httplib2.Http())
+    return connections[key]
+
+def pooled_session(credentials: Credentials, size: Optional[int] = None) -> AuthorizedSession:
+    """
+    Authorized requests session with a keep-alive pool of ``size`` connections per host.
+
+    Args:
+        credentials: Credentials used to authorize the requests
+        size: Connections per host, pool_size() by default
+
+    Returns:
+        AuthorizedSession: Thread-safe session
+    """
+    size = size or pool_size()
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def default_credentials() -> Tuple[Credentials, Optional[str]]:
+    """
+    Application default credentials and project, resolved once per process.
+
+    Returns:
+        Tuple[Credentials, Optional[str]]: Credentials and their default project
+    """
+    return _cached("default_credentials", ("default_credentials",), lambda: google.auth.default(scopes=CLOUD_PLATFORM_SCOPES))
+
+def get_storage_client(project: Optional[str] = None, credentials: Optional[Credentials] = None) -> storage.Client:
+    """
+    Shared Cloud Storage client with a pooled HTTP session.
+
+    Args:
+        project: Project ID, the credentials' project by default
+        credentials: Credentials, application default credentials by default
+
+    Returns:
+        storage.Client: Client shared by every caller and thread of the process
+    """
+    def create() -> storage.Client:
+        creds, default_project = (credentials, None) if credentials else default_credentials()
+        kwargs = {"project": project or default_project} if project or default_project else {}
+        return storage.Client(credentials=creds, _http=pooled_session(creds), **kwargs)
+
+    return _cached("storage", ("storage", project, credentials_key(credentials)), create)
+
+def get_bigquery_client(project: Optional[str] = None, credentials: Optional[Credentials] = None) -> bigquery.Client:
+    """
+    Shared BigQuery client with a pooled HTTP session.
+
+    Args:
+        project: Project ID, the credentials' project by default
+        credentials: Credentials, application default credentials by default
+
+    Returns:
+        bigquery.Client: Client shared by every caller and thread of the process
+    """
+    def create() -> bigquery.Client:
+        creds, default_project = (credentials, None) if credentials else default_credentials()
+        kwargs = {"project": project or default_project} if project or default_project else {}
+        return bigquery.Client(credentials=creds, _http=pooled_session(creds), **kwargs)
+
+    return _cached("bigquery", ("bigquery", project, credentials_key(credentials)), create)
+
+def service_account_credentials(credentials_path: str, scopes: List[str]) -> service_account.Credentials:
+    """
+    Service account credentials of a key file, loaded once per process.
+
+    Args:
+        credentials_path: Path to the service account key file
+        scopes: OAuth scopes
+
+    Returns:
+        service_account.Credentials: Credentials
+    """
+    return _cached(
+        "service_account_credentials",
+        ("service_account_credentials", credentials_path, tuple(scopes)),
+        lambda: service_account.Credentials.from_service_account_file(credentials_path, scopes=scopes)
+    )
+
+def get_drive_service(credentials: Credentials) -> Any:
+    """
+    Shared Drive v3 service built from the discovery document bundled with the client library.
+
+    ``static_discovery`` avoids fetching the discovery document over the
+    network. Requests are sent over the connection of the thread that
+    builds them (httplib2 is not thread-safe, see thread_http), so the
+    service can be shared by threads.
+
+    Args:
+        credentials: Credentials with Drive scopes
+
+    Returns:
+        Resource: Drive service
+    """
+    def create() -> Any:
+        def build_request(http, *args, **kwargs):
+            return HttpRequest(thread_http(credentials), *args, **kwargs)
+
+        return build(
+            'drive',
+            'v3',
+            http=thread_http(credentials),
+            requestBuilder=build_request,
+            static_discovery=True,
+            cache_discovery=False
+        )
+
+    return _cached("drive", ("drive", credentials_key(credentials)), create)
+
+def get_drive_session(credentials: Credentials) -> AuthorizedSession:
+    """
+    Shared pooled session for direct requests against the Drive media endpoint.
+
+    Args:
+        credentials: Credentials with Drive scopes
+
+    Returns:
+        AuthorizedSession: Thread-safe session
+    """
+    return _cached("drive_session", ("drive_session", credentials_key(credentials)), lambda: pooled_session(credentials))
+
+def client_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Clients created and reused in this process and the setup time saved.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: By client kind: created and reused
+            counts, total setup seconds and seconds saved by reuse
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+def clear_clients() -> None:
+    """Drop every cached client, e.g. after the credentials changed"""
+    global _thread_http
+    with _lock:
+        _clients.clear()
+        _thread_http = threading.local()
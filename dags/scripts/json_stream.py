@@ -0,0 +1,345 @@
+import io
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Constants
+READ_CHUNK_SIZE = 1024 * 1024  # Characters read from the stream per refill
+JSON_BATCH_ROWS = 50000        # Records per Arrow record batch
+
+_WHITESPACE = " \t\r\n"
+
+class JSONStreamError(Exception):
+    """Custom exception for malformed JSON streams"""
+    pass
+
+def iter_json_records(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally parse records from a JSON array or an NDJSON stream.
+
+    Only the current chunk and the record being decoded are held in memory.
+    A document starting with '[' is read as an array of records, anything
+    else as newline-delimited (or concatenated) JSON objects.
+
+    Args:
+        stream: Binary file-like object with UTF-8 encoded JSON
+        chunk_size: Number of characters read per refill
+
+    Yields:
+        Dict[str, Any]: One decoded record at a time
+
+    Raises:
+        JSONStreamError: If the stream is not a valid array or NDJSON document
+    """
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding="utf-8")
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def refill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not refill():
+                return
+
+    skip(_WHITESPACE)
+    if pos >= len(buffer):
+        return
+    in_array = buffer[pos] == "["
+    if in_array:
+        pos += 1
+
+    while True:
+        skip(_WHITESPACE + "," if in_array else _WHITESPACE)
+        if pos >= len(buffer):
+            if in_array:
+                raise JSONStreamError("Unexpected end of stream inside JSON array")
+            return
+        if in_array and buffer[pos] == "]":
+            return
+
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # A value ending exactly at the buffer edge may continue in the next chunk
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise JSONStreamError(f"Invalid JSON record at offset {pos}: {str(e)}")
+            if not refill():
+                continue
+        pos = end
+        if not isinstance(record, dict):
+            raise JSONStreamError(f"Expected a JSON object, got {type(record).__name__}")
+        yield record
+
+# Arrow type of each JSON value kind; a column holding several kinds takes
+# the widest one, see promote_kind
+_KIND_TYPES = {
+    "null": pa.float64(),
+    "bool": pa.bool_(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "string": pa.string()
+}
+
+class JSONSchemaWidened(Exception):
+    """Raised when records after the first batch do not fit the schema inferred from it"""
+
+    def __init__(self, schema: pa.Schema):
+        super().__init__(f"Records after the first batch widen the schema to: {schema}")
+        self.schema = schema
+
+def value_kind(value: Any) -> str:
+    """
+    Kind of a decoded JSON value.
+
+    Args:
+        value: Value of a decoded record
+
+    Returns:
+        str: "null", "bool", "int", "float" or "string"; floats without a
+            fractional part are "int", objects and arrays are "string" and
+            written as JSON text
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "int" if value.is_integer() and abs(value) < 2 ** 63 else "float"
+    return "string"
+
+def promote_kind(current: str, kind: str) -> str:
+    """
+    Kind of a column that holds values of two kinds.
+
+    Nulls take the other kind, booleans widen to numbers, integers and
+    floats become floats and any other mix becomes strings, as
+    pd.read_json keeps such columns as text.
+
+    Args:
+        current: Kind of the column so far
+        kind: Kind of a new value
+
+    Returns:
+        str: Kind of the column
+    """
+    if current == kind or kind == "null":
+        return current
+    if current == "null":
+        return kind
+    kinds = {current, kind}
+    if kinds == {"bool", "int"}:
+        return "int"
+    if kinds <= {"bool", "int", "float"}:
+        return "float"
+    return "string"
+
+class SchemaInference:
+    """
+    Kinds and null counts of the columns of the records seen so far.
+
+    Types follow pd.read_json: integer and boolean columns with a null or a
+    missing key in any record are float64, and all-null columns are
+    float64. Only counters per column are kept, so memory does not grow
+    with the number of records.
+    """
+
+    def __init__(self):
+        self.kinds: Dict[str, str] = {}
+        self.values: Dict[str, int] = {}
+        self.records = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Account for the values of a record.
+
+        Args:
+            record: Decoded record
+        """
+        self.records += 1
+        for key, value in record.items():
+            kind = value_kind(value)
+            self.kinds[key] = promote_kind(self.kinds.get(key, "null"), kind)
+            if kind != "null":
+                self.values[key] = self.values.get(key, 0) + 1
+
+    def schema(self) -> pa.Schema:
+        """
+        Schema holding every value of the records seen so far.
+
+        Columns appear in the order their keys were first seen.
+
+        Returns:
+            pa.Schema: Inferred schema
+        """
+        fields = []
+        for key, kind in self.kinds.items():
+            if kind in ("bool", "int") and self.values.get(key, 0) < self.records:
+                kind = "float"
+            fields.append(pa.field(key, _KIND_TYPES[kind]))
+        return pa.schema(fields)
+
+def infer_arrow_schema(records: Iterable[Dict[str, Any]]) -> pa.Schema:
+    """
+    Infer an Arrow schema from every record of a document.
+
+    Args:
+        records: Decoded records, consumed
+
+    Returns:
+        pa.Schema: Schema holding every value of every record, see
+            SchemaInference
+    """
+    inference = SchemaInference()
+    for record in records:
+        inference.add(record)
+    return inference.schema()
+
+def to_arrow_array(values: List[Any], arrow_type: pa.DataType) -> pa.Array:
+    """
+    Convert column values to an array of the inferred type.
+
+    Args:
+        values: Values of one column, None where a record lacks the key
+        arrow_type: Type from infer_arrow_schema
+
+    Returns:
+        pa.Array: Column array; in integer columns booleans are 0 and 1, in
+            string columns values of other kinds are written as JSON text
+    """
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if pa.types.is_integer(arrow_type):
+            return pa.array([int(value) if isinstance(value, bool) else value for value in values], type=arrow_type)
+        if not pa.types.is_string(arrow_type):
+            raise
+        return pa.array(
+            [value if value is None or isinstance(value, str) else json.dumps(value) for value in values],
+            type=arrow_type
+        )
+
+def records_to_batch(records: List[Dict[str, Any]], schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Convert decoded records to a record batch of the given schema.
+
+    Args:
+        records: Decoded records
+        schema: Schema of the batch
+
+    Returns:
+        pa.RecordBatch: Batch with a row per record
+
+    Raises:
+        JSONStreamError: If a record has a key missing from the schema
+    """
+    names = set(schema.names)
+    for record in records:
+        if not names.issuperset(record):
+            raise JSONStreamError(f"Record keys not in the schema: {sorted(set(record) - names)}")
+    return pa.RecordBatch.from_arrays(
+        [to_arrow_array([record.get(field.name) for record in records], field.type) for field in schema],
+        schema=schema
+    )
+
+def iter_record_batches(
+    records: Iterator[Dict[str, Any]],
+    schema: pa.Schema,
+    batch_rows: int = JSON_BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """
+    Group decoded records into Arrow record batches with a fixed schema.
+
+    Args:
+        records: Iterator of decoded records
+        schema: Schema of every batch, from infer_arrow_schema over the
+            same records
+        batch_rows: Records per batch
+
+    Yields:
+        pa.RecordBatch: Batches of at most ``batch_rows`` rows
+
+    Raises:
+        JSONStreamError: If a record has a key missing from the schema
+    """
+    pending = []
+    for record in records:
+        pending.append(record)
+        if len(pending) >= batch_rows:
+            yield records_to_batch(pending, schema)
+            pending = []
+    if pending:
+        yield records_to_batch(pending, schema)
+
+def iter_inferred_batches(
+    records: Iterator[Dict[str, Any]],
+    batch_rows: int = JSON_BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """
+    Group decoded records into record batches, inferring the schema on the way.
+
+    The schema is inferred from the first batch and checked against each
+    later batch before it is converted, so a document is read once as long
+    as its first ``batch_rows`` records show every key and type. Otherwise
+    the remaining records are only scanned to finish the inference and
+    JSONSchemaWidened carries the schema of the whole document, for the
+    caller to discard the batches already written and convert it again
+    with iter_record_batches.
+
+    Args:
+        records: Iterator of decoded records
+        batch_rows: Records per batch
+
+    Yields:
+        pa.RecordBatch: Batches of at most ``batch_rows`` rows, all with the
+            schema of the first one
+
+    Raises:
+        JSONSchemaWidened: If a later record adds a key or widens a type
+    """
+    records = iter(records)
+    inference = SchemaInference()
+    schema = None
+
+    def to_batch(pending: List[Dict[str, Any]]) -> pa.RecordBatch:
+        nonlocal schema
+        inferred = inference.schema()
+        if schema is None:
+            schema = inferred
+        elif inferred != schema:
+            for record in records:
+                inference.add(record)
+            raise JSONSchemaWidened(inference.schema())
+        return records_to_batch(pending, schema)
+
+    pending = []
+    for record in records:
+        inference.add(record)
+        pending.append(record)
+        if len(pending) >= batch_rows:
+            yield to_batch(pending)
+            pending = []
+    if pending:
+        yield to_batch(pending)
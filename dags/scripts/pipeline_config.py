@@ -0,0 +1,39 @@
+from typing import Dict
+
+# Constants
+DEFAULT_PROJECT_ID = "melithirdparty-460619"
+DEFAULT_DATASET_ID = "billing_staging"
+DEFAULT_RAW_BUCKET = "melithirdparty-raw"
+DEFAULT_STAGE_BUCKET = "melithirdparty-stage"
+
+# "snapshot" overwrites dq_<table> with the counts of the loaded data,
+# "history" appends per-partition counts of the new partitions to dq_<table>_history
+DQ_MODES = ("snapshot", "history")
+DEFAULT_DQ_MODE = "snapshot"
+
+# Airflow Variable read for each config entry, with its default
+CONFIG_DEFAULTS = {
+    "project_id": DEFAULT_PROJECT_ID,
+    "dataset_id": DEFAULT_DATASET_ID,
+    "raw_bucket": DEFAULT_RAW_BUCKET,
+    "stage_bucket": DEFAULT_STAGE_BUCKET,
+    "dq_mode": DEFAULT_DQ_MODE,
+    # Byte budget per view/DQ query, empty to run without a dry-run check
+    "max_bytes_billed": ""
+}
+
+def config_template() -> Dict[str, str]:
+    """
+    Pipeline configuration as Jinja templates over Airflow Variables.
+
+    Passed as templated ``op_kwargs``, the Variables are read when the task
+    runs instead of on every parse of the DAG file. This module imports
+    nothing heavy, so the DAG file can use it at parse time.
+
+    Returns:
+        Dict[str, str]: ``{{ var.value.get(...) }}`` template of each entry
+    """
+    return {
+        key: f"{{{{ var.value.get('{key}', '{default}') }}}}"
+        for key, default in CONFIG_DEFAULTS.items()
+    }
@@ -0,0 +1,121 @@
+from google.cloud import storage
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Constants
+CHECKPOINT_PREFIX = "_checkpoints"
+MAX_UPDATE_ATTEMPTS = 10
+
+# Stages of a file, in pipeline order
+RAW_READ = "raw_read"                 # Raw object written to the raw bucket from Drive
+PARQUET_WRITTEN = "parquet_written"   # Parquet data and DQ results written
+TABLE_LOADED = "table_loaded"         # Stage table loaded
+STAGES = (RAW_READ, PARQUET_WRITTEN, TABLE_LOADED)
+
+_lock = threading.Lock()
+
+def checkpoint_path(run_id: str) -> str:
+    """
+    Path of the checkpoint object of a DAG run.
+
+    Args:
+        run_id: Airflow run ID
+
+    Returns:
+        str: Object path inside the bucket
+    """
+    return f"{CHECKPOINT_PREFIX}/{run_id}.json"
+
+def load_checkpoints(bucket: storage.Bucket, run_id: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the stages completed by each file in a DAG run.
+
+    Unlike the source manifests, which let later runs skip unchanged
+    inputs, checkpoints only hold what this run has done, so a retry
+    resumes every file at its first incomplete stage, also in a
+    ``force_refresh`` run. Clearing a task of the run resumes it too;
+    trigger a new run to redo everything.
+
+    Args:
+        bucket: Bucket holding the checkpoints
+        run_id: Airflow run ID, None outside Airflow
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Record of each completed stage by stage
+            name, by file key; empty without a run ID or checkpoint yet
+    """
+    if not run_id:
+        return {}
+    blob = bucket.get_blob(checkpoint_path(run_id))
+    if blob is None:
+        return {}
+    try:
+        return json.loads(blob.download_as_bytes())
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint of run {run_id}: {str(e)}")
+        return {}
+
+def completed_stage(checkpoints: Dict[str, Dict[str, Any]], key: str, stage: str) -> Optional[Dict[str, Any]]:
+    """
+    Record of a stage of a file, if the run completed it.
+
+    Args:
+        checkpoints: Result of load_checkpoints
+        key: File key
+        stage: One of STAGES
+
+    Returns:
+        Optional[Dict[str, Any]]: Fields recorded with the stage, None if not completed
+    """
+    return checkpoints.get(key, {}).get(stage)
+
+def record_stage(bucket: storage.Bucket, run_id: Optional[str], key: str, stage: str, **fields: Any) -> None:
+    """
+    Record that a file completed a stage in a DAG run.
+
+    The mapped tasks of a run update the same object, so every update is
+    conditional on the generation it read and is retried on conflict.
+
+    Args:
+        bucket: Bucket holding the checkpoints
+        run_id: Airflow run ID; nothing is recorded without one
+        key: File key
+        stage: One of STAGES
+        fields: What the stage produced, JSON-compatible
+
+    Raises:
+        ValueError: If the stage is unknown
+        RuntimeError: If the checkpoint kept changing under every attempt
+    """
+    if stage not in STAGES:
+        raise ValueError(f"Unknown checkpoint stage: {stage}")
+    if not run_id:
+        return
+
+    path = checkpoint_path(run_id)
+    with _lock:
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            blob = bucket.get_blob(path)
+            try:
+                generation = blob.generation if blob is not None else 0
+                checkpoints = json.loads(blob.download_as_bytes(if_generation_match=generation)) if blob is not None else {}
+                checkpoints.setdefault(key, {})[stage] = {
+                    **fields,
+                    "completed_at": datetime.now(timezone.utc).isoformat()
+                }
+                bucket.blob(path).upload_from_string(
+                    json.dumps(checkpoints, indent=2),
+                    content_type="application/json",
+                    if_generation_match=generation
+                )
+                logger.info(f"Checkpoint of run {run_id}: {key} completed {stage}")
+                return
+            except (NotFound, PreconditionFailed):
+                logger.info(f"Checkpoint of run {run_id} changed while updating it, retrying")
+    raise RuntimeError(f"Could not update the checkpoint of run {run_id} after {MAX_UPDATE_ATTEMPTS} attempts")
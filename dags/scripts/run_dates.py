@@ -0,0 +1,89 @@
+from datetime import date, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Constants
+DATE_PATH_FORMAT = "%Y/%m/%d"  # Date folder of the raw and stage files
+MAX_BACKFILL_DAYS = 366
+
+def backfill_requested(context: Dict[str, Any]) -> bool:
+    """
+    Whether the triggering DAG run asked for a date-range backfill.
+
+    Trigger the DAG with ``{"backfill_start": "YYYY-MM-DD", "backfill_end": "YYYY-MM-DD"}``
+    to reprocess the raw files already in the bucket for every day of the range.
+
+    Args:
+        context: Airflow context dictionary
+
+    Returns:
+        bool: True if a backfill range was given
+    """
+    dag_run = context.get("dag_run")
+    conf = getattr(dag_run, "conf", None) or {}
+    return bool(conf.get("backfill_start"))
+
+def run_dates(context: Dict[str, Any]) -> List[date]:
+    """
+    Days whose raw files a DAG run processes.
+
+    A backfill run processes every day from ``backfill_start`` to
+    ``backfill_end`` (included, the start by default). Any other run
+    processes the day of its logical date, so a scheduled run or an
+    ``airflow dags backfill`` of a past date reads the files of that date
+    and a manual run reads today's. Outside Airflow it is today.
+
+    Args:
+        context: Airflow context dictionary
+
+    Returns:
+        List[date]: Days in ascending order
+
+    Raises:
+        ValueError: If the backfill range is reversed or longer than MAX_BACKFILL_DAYS
+    """
+    if backfill_requested(context):
+        conf = context["dag_run"].conf
+        first = date.fromisoformat(conf["backfill_start"])
+        last = date.fromisoformat(conf.get("backfill_end") or conf["backfill_start"])
+        days = (last - first).days + 1
+        if days < 1:
+            raise ValueError(f"Backfill ends before it starts: {first} to {last}")
+        if days > MAX_BACKFILL_DAYS:
+            raise ValueError(f"Backfill of {days} days is over the limit of {MAX_BACKFILL_DAYS}")
+        return [first + timedelta(days=offset) for offset in range(days)]
+
+    logical_date = context.get("logical_date")
+    return [logical_date.date() if logical_date else date.today()]
+
+def run_created_date(context: Dict[str, Any]) -> Optional[date]:
+    """
+    Day the DAG run was created, in UTC.
+
+    Airflow 3 records it as ``run_after``; older versions as the time the
+    run was queued or, failing that, started. It stays the same when a task
+    is retried, unlike the clock at task execution.
+
+    Args:
+        context: Airflow context dictionary
+
+    Returns:
+        Optional[date]: Day of creation, None outside Airflow
+    """
+    dag_run = context.get("dag_run")
+    for attribute in ("run_after", "queued_at", "start_date"):
+        created = getattr(dag_run, attribute, None)
+        if created is not None:
+            return created.astimezone(timezone.utc).date() if created.tzinfo else created.date()
+    return None
+
+def date_path(day: date) -> str:
+    """
+    Date folder of the files of a day.
+
+    Args:
+        day: Day
+
+    Returns:
+        str: Date in YYYY/MM/DD format
+    """
+    return day.strftime(DATE_PATH_FORMAT)
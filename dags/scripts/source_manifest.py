@@ -0,0 +1,114 @@
+from google.cloud import storage
+from datetime import datetime, timezone
+from typing import Any, Dict
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MANIFEST_PREFIX = "_manifests"
+
+def manifest_path(base_name: str) -> str:
+    """
+    Path of the manifest object for a source file.
+
+    Args:
+        base_name: File name without extension (e.g. "aws_data_desafio")
+
+    Returns:
+        str: Object path inside the bucket
+    """
+    return f"{MANIFEST_PREFIX}/{base_name}.json"
+
+def load_manifest(bucket: storage.Bucket, base_name: str) -> Dict[str, Any]:
+    """
+    Read the fingerprint manifest of a source file.
+
+    The manifest records what the last successful run saw and produced:
+    Drive ``md5Checksum``/``modifiedTime``, the raw object and its crc32c,
+    the Parquet URI converted from it and the table it was loaded into,
+    each with the conversion fingerprint they were produced with.
+
+    Args:
+        bucket: Bucket holding the manifests
+        base_name: File name without extension
+
+    Returns:
+        Dict[str, Any]: Manifest content, empty if there is none yet
+    """
+    blob = bucket.blob(manifest_path(base_name))
+    try:
+        return json.loads(blob.download_as_bytes())
+    except Exception as e:
+        logger.info(f"No usable manifest for {base_name}: {str(e)}")
+        return {}
+
+def update_manifest(bucket: storage.Bucket, base_name: str, **fields: Any) -> Dict[str, Any]:
+    """
+    Merge fields into the manifest of a source file and persist it.
+
+    Args:
+        bucket: Bucket holding the manifests
+        base_name: File name without extension
+        fields: Fingerprint fields to set
+
+    Returns:
+        Dict[str, Any]: Updated manifest
+    """
+    manifest = load_manifest(bucket, base_name)
+    manifest.update(fields)
+    manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+    bucket.blob(manifest_path(base_name)).upload_from_string(
+        json.dumps(manifest, indent=2),
+        content_type="application/json"
+    )
+    return manifest
+
+def clear_load_fingerprints(bucket: storage.Bucket, base_name: str) -> None:
+    """
+    Forget the loads recorded in the manifests of a source file and its shards.
+
+    Used after the table was loaded from other data (a backfill), so the
+    next run loads its own data again instead of skipping the load.
+
+    Args:
+        bucket: Bucket holding the manifests
+        base_name: File name without extension
+    """
+    for blob in bucket.list_blobs(prefix=manifest_path(base_name)[:-len(".json")]):
+        name = blob.name[len(MANIFEST_PREFIX) + 1:-len(".json")]
+        if load_manifest(bucket, name).get("loaded_source_crc32c"):
+            update_manifest(bucket, name, loaded_source_crc32c=None)
+
+def is_unchanged(manifest: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    """
+    Check whether every expected fingerprint matches the manifest.
+
+    Missing or empty fingerprints never match, so unknown inputs always
+    lead to the work being redone.
+
+    Args:
+        manifest: Manifest content
+        expected: Fingerprint fields of the current inputs
+
+    Returns:
+        bool: True if the work for these inputs was already done
+    """
+    return all(value and manifest.get(key) == value for key, value in expected.items())
+
+def force_refresh_requested(context: Dict[str, Any]) -> bool:
+    """
+    Whether the triggering DAG run asked to bypass the manifests.
+
+    Trigger the DAG with ``{"force_refresh": true}`` to redo every step.
+
+    Args:
+        context: Airflow context dictionary
+
+    Returns:
+        bool: True if a forced refresh was requested
+    """
+    dag_run = context.get("dag_run")
+    conf = getattr(dag_run, "conf", None) or {}
+    return bool(conf.get("force_refresh", False))
@@ -0,0 +1,302 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# Constants
+TRACE_XCOM_KEY = "trace_summary"
+INHERITED_ATTRIBUTES = ("file",)       # Copied from the parent span unless set
+SUMMED_ATTRIBUTES = ("bytes", "rows", "parse_seconds", "encode_seconds", "saved_seconds")  # Totalled per stage
+
+# OpenTelemetry export settings
+OTLP_ENDPOINT_ENV = "OTEL_EXPORTER_OTLP_ENDPOINT"  # e.g. http://localhost:4318
+OTLP_TRACES_PATH = "/v1/traces"
+OTLP_TIMEOUT_SECONDS = 5
+SERVICE_NAME = "third_party_data_pipeline"
+
+class Span:
+    """Timed stage of a task with its attributes (bytes, rows, file, ...)"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time_ns = time.time_ns()
+        self.seconds = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        """Set attributes of the span"""
+        self.attributes.update(attributes)
+
+    def add(self, **counters: float) -> None:
+        """Add to numeric attributes of the span, starting from zero"""
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def end(self, seconds: Optional[float] = None) -> None:
+        self.seconds = round(time.perf_counter() - self._start if seconds is None else seconds, 6)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_ns": self.start_time_ns,
+            "seconds": self.seconds,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            **self.attributes
+        }
+
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Collects the spans of one task run, from any thread it hands its context to"""
+
+    def __init__(self, name: str, run_id: Optional[str] = None):
+        self.name = name
+        self.run_id = run_id
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, attributes: Dict[str, Any]) -> Span:
+        parent = _current_span.get()
+        if parent is not None:
+            attributes = {
+                **{key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if key in parent.attributes},
+                **attributes
+            }
+        return Span(name, self.trace_id, parent.span_id if parent else None, attributes)
+
+    def finish(self, span: Span) -> None:
+        """Log a finished span as one JSON line and keep it for the summary"""
+        logger.info(json.dumps({"event": "span", "run_id": self.run_id, **span.to_dict()}, default=str))
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Wall time, bytes and rows per stage, overall and per file.
+
+        Returns:
+            Dict[str, Any]: Summary small enough for XCom
+        """
+        def accumulate(totals: Dict[str, Dict[str, Any]], span: Span) -> None:
+            stage = totals.setdefault(span.name, {"count": 0, "seconds": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["seconds"] = round(stage["seconds"] + (span.seconds or 0), 6)
+            stage["errors"] += 1 if span.error else 0
+            for key in SUMMED_ATTRIBUTES:
+                if isinstance(span.attributes.get(key), (int, float)):
+                    stage[key] = round(stage.get(key, 0) + span.attributes[key], 6)
+
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        files = {}
+        for span in spans:
+            accumulate(stages, span)
+            if "file" in span.attributes:
+                accumulate(files.setdefault(str(span.attributes["file"]), {}), span)
+        root = next((span for span in spans if span.parent_id is None and span.name == self.name), None)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "run_id": self.run_id,
+            "seconds": root.seconds if root else None,
+            "stages": stages,
+            "files": files
+        }
+
+class OTLPHttpExporter:
+    """Sends finished traces to an OpenTelemetry collector over OTLP/HTTP JSON"""
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME, timeout: float = OTLP_TIMEOUT_SECONDS):
+        self.url = endpoint.rstrip("/") + OTLP_TRACES_PATH
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def payload(self, tracer: Tracer) -> Dict[str, Any]:
+        """
+        Build the OTLP ExportTraceServiceRequest of a trace.
+
+        Args:
+            tracer: Tracer of the finished task
+
+        Returns:
+            Dict[str, Any]: Request body in the OTLP JSON encoding
+        """
+        spans = []
+        for span in tracer.spans:
+            attributes = dict(span.attributes, **({"run_id": tracer.run_id} if tracer.run_id else {}))
+            spans.append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_time_ns),
+                "endTimeUnixNano": str(span.start_time_ns + int((span.seconds or 0) * 1e9)),
+                "attributes": [self._attribute(key, value) for key, value in attributes.items() if value is not None],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+            }]
+        }
+
+    def export(self, tracer: Tracer) -> None:
+        """Send a trace; failures are logged and never fail the task"""
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(self.payload(tracer), default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+            logger.info(f"Exported {len(tracer.spans)} span(s) to {self.url}")
+        except Exception as e:
+            logger.warning(f"Failed to export trace to {self.url}: {str(e)}")
+
+def exporter_from_env() -> Optional[OTLPHttpExporter]:
+    """
+    OTLP exporter for the collector set with OTEL_EXPORTER_OTLP_ENDPOINT.
+
+    Returns:
+        Optional[OTLPHttpExporter]: Exporter, None if the variable is unset
+    """
+    endpoint = os.environ.get(OTLP_ENDPOINT_ENV)
+    return OTLPHttpExporter(endpoint) if endpoint else None
+
+@contextmanager
+def trace(
+    name: str,
+    context: Optional[Dict[str, Any]] = None,
+    exporter: Optional[OTLPHttpExporter] = None
+) -> Iterator[Tracer]:
+    """
+    Trace a task: spans opened inside are collected under one root span.
+
+    When the task ends, also on failure, the summary is logged, pushed to
+    XCom under TRACE_XCOM_KEY and the trace is sent to the exporter, or to
+    the collector of OTEL_EXPORTER_OTLP_ENDPOINT if none is given.
+
+    Args:
+        name: Name of the task, also the root span name
+        context: Airflow context, for the run ID and the XCom push
+        exporter: Optional OTLP exporter
+
+    Yields:
+        Tracer: Tracer of the task
+    """
+    context = context or {}
+    tracer = Tracer(name, context.get("run_id"))
+    token = _tracer.set(tracer)
+    try:
+        with span(name):
+            yield tracer
+    finally:
+        _tracer.reset(token)
+        summary = tracer.summary()
+        logger.info(json.dumps({"event": "trace_summary", **summary}, default=str))
+        if context.get("ti") is not None:
+            try:
+                context["ti"].xcom_push(key=TRACE_XCOM_KEY, value=summary)
+            except Exception as e:
+                logger.warning(f"Failed to push trace summary to XCom: {str(e)}")
+        exporter = exporter or exporter_from_env()
+        if exporter is not None:
+            exporter.export(tracer)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a stage of the current trace.
+
+    Outside a trace the span is timed but not recorded, so instrumented
+    code runs unchanged when called directly.
+
+    Args:
+        name: Stage name (download, parse, encode, upload, ...)
+        attributes: Initial attributes, e.g. file, bytes, rows
+
+    Yields:
+        Span: Span to add attributes to
+    """
+    tracer = _tracer.get()
+    current = tracer.start_span(name, attributes) if tracer else Span(name, "", attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        if tracer is not None:
+            tracer.finish(current)
+
+def record_span(
+    name: str,
+    start_time_ns: int,
+    seconds: float,
+    error: Optional[str] = None,
+    **attributes: Any
+) -> None:
+    """
+    Record an already timed stage in the current trace, e.g. a polled job.
+
+    Args:
+        name: Stage name
+        start_time_ns: Start as nanoseconds since the epoch
+        seconds: Duration
+        error: Error message if the stage failed
+        attributes: Attributes of the stage
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return
+    recorded = tracer.start_span(name, attributes)
+    recorded.start_time_ns = start_time_ns
+    recorded.end(seconds)
+    recorded.error = error
+    tracer.finish(recorded)
+
+def current_span() -> Optional[Span]:
+    """Innermost open span of the current context, if any"""
+    return _current_span.get()
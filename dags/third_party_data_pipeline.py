@@ -1,40 +1,32 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
 from airflow import DAG
 from airflow.operators.python import PythonOperator
-from airflow.providers.google.cloud.operators.bigquery import (
-    BigQueryCheckOperator,
-    BigQueryExecuteQueryOperator
-)
 from airflow.utils.dates import days_ago
-from airflow.models import Variable
-from airflow.exceptions import AirflowException
-from airflow.hooks.base import BaseHook
 from airflow.utils.task_group import TaskGroup
 
 import logging
 import sys
 import os
 import json
-import traceback
 from pathlib import Path
-from google.cloud import storage
 
 # Add scripts directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
 
-# Import custom scripts
-from scripts.drive_files_to_gcs import run_ingestion as drive_to_gcs
-from scripts.aws_billing_raw_to_stage import run_pipeline
-from scripts.create_bigquery_views import run_view_creation
-from scripts.create_dq_tables import run_dq_creation
+# Only light modules are imported at parse time; the task callables import
+# the scripts (pandas, pyarrow, Google clients) when they run
+from scripts.deferrable import BigQueryJobGraphOperator, GCSObjectsSensor
+from scripts.pipeline_config import config_template
 
 # Constants
-DEFAULT_PROJECT_ID = "melithirdparty-460619"
-DEFAULT_DATASET_ID = "billing_staging"
-DEFAULT_RAW_BUCKET = "melithirdparty-raw"
-DEFAULT_STAGE_BUCKET = "melithirdparty-stage"
 CREDENTIALS_DIR = Path('/tmp/scripts_creds')
+# Raw files every processed date needs, written by extract_from_drive
+RAW_FILES = [
+    "aws_data_desafio/{date_path}/aws_data_desafio.csv",
+    "lista_precios/{date_path}/lista_precios.json"
+]
+RAW_FILE_MAX_AGE = timedelta(days=1)
 
 # Logging configuration
 logging.basicConfig(
@@ -43,24 +35,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_config() -> Dict[str, str]:
-    try:
-        config = {
-            "project_id": Variable.get("project_id", DEFAULT_PROJECT_ID),
-            "dataset_id": Variable.get("dataset_id", DEFAULT_DATASET_ID),
-            "raw_bucket": Variable.get("raw_bucket", DEFAULT_RAW_BUCKET),
-            "stage_bucket": Variable.get("stage_bucket", DEFAULT_STAGE_BUCKET)
-        }
-        return config
-    except Exception:
-        return {
-            "project_id": DEFAULT_PROJECT_ID,
-            "dataset_id": DEFAULT_DATASET_ID,
-            "raw_bucket": DEFAULT_RAW_BUCKET,
-            "stage_bucket": DEFAULT_STAGE_BUCKET
-        }
+# Rendered from Airflow Variables when each task runs, not on every parse
+config = config_template()
 
 def setup_credentials(**context) -> None:
+    from airflow.hooks.base import BaseHook
+
     drive_conn = BaseHook.get_connection('google_drive_credentials')
     CREDENTIALS_DIR.mkdir(exist_ok=True)
     with open(CREDENTIALS_DIR / 'credentials.json', 'w') as f:
@@ -74,25 +54,59 @@ def cleanup_credentials(**context) -> None:
     except Exception as e:
         logger.error(f"Error removing credentials file: {str(e)}")
 
-def check_file_existence(**context) -> None:
-    config = get_config()
-    client = storage.Client()
-    bucket = client.bucket(config['raw_bucket'])
-    today = datetime.now().strftime("%Y/%m/%d")
-    required_files = [
-        f"aws_data_desafio/{today}/aws_data_desafio.csv",
-        f"lista_precios/{today}/lista_precios.json"
-    ]
-    missing = [fp for fp in required_files if not bucket.blob(fp).exists()]
-    if missing:
-        raise AirflowException(f"Missing files: {', '.join(missing)}")
+def extract_files(config: Dict[str, str], **context) -> None:
+    from scripts.drive_files_to_gcs import run_ingestion
+    from scripts.source_manifest import force_refresh_requested
+
+    run_ingestion(
+        credentials_path=str(CREDENTIALS_DIR / 'credentials.json'),
+        raw_bucket=config['raw_bucket'],
+        force_refresh=force_refresh_requested(context),
+        **context
+    )
+
+def plan_staging(**context) -> List[Dict[str, Any]]:
+    from scripts.aws_billing_raw_to_stage import list_staging_units
+
+    return list_staging_units(**context)
+
+def stage_unit(
+    unit: str,
+    file_name: str,
+    day_path: str,
+    shard: Optional[Dict[str, Any]] = None,
+    backfill: bool = False,
+    **context
+) -> Dict[str, Dict[str, Any]]:
+    from scripts.aws_billing_raw_to_stage import run_staging_unit
+
+    return run_staging_unit(unit, file_name, day_path, shard, backfill, **context)
+
+def plan_backfill_load(memo: Dict[str, Any], **context) -> Dict[str, Any]:
+    from scripts.aws_billing_raw_to_stage import plan_backfill
+
+    return plan_backfill(memo, **context)
+
+def plan_dq(config: Dict[str, str], memo: Dict[str, Any], **context) -> Dict[str, Any]:
+    from scripts.create_dq_tables import plan_dq_creation
+
+    return plan_dq_creation(config, memo, **context)
+
+def build_views(config: Dict[str, str], **context) -> Dict[str, Dict[str, Any]]:
+    from scripts.create_bigquery_views import run_view_creation
+
+    return run_view_creation(config, **context)
+
+def plan_views(config: Dict[str, str], memo: Dict[str, Any], **context) -> Dict[str, Any]:
+    from scripts.create_bigquery_views import plan_view_creation
+
+    return plan_view_creation(config, memo, **context)
 
 def create_bigquery_views():
-    config = get_config()
     return [
         PythonOperator(
             task_id='create_aws_billing_summary',
-            python_callable=run_view_creation,
+            python_callable=build_views,
             op_kwargs={'config': config},
             dag=dag
         )
@@ -125,38 +139,56 @@ setup_creds = PythonOperator(
 
 extract_from_drive = PythonOperator(
     task_id='extract_from_drive',
-    python_callable=lambda **context: drive_to_gcs(
-        credentials_path=str(CREDENTIALS_DIR / 'credentials.json'),
-        raw_bucket=get_config()['raw_bucket']
-    ),
+    python_callable=extract_files,
+    op_kwargs={'config': config},
     dag=dag
 )
 
-check_files = PythonOperator(
+# One listing of the raw bucket per check; the waits (and the BigQuery job
+# waits below) run in the triggerer when [operators] default_deferrable is set
+check_files = GCSObjectsSensor(
     task_id='check_files',
-    python_callable=check_file_existence,
+    bucket=config['raw_bucket'],
+    object_templates=RAW_FILES,
+    max_age=RAW_FILE_MAX_AGE,
+    poke_interval=60,
+    timeout=10 * 60,
+    mode='reschedule',
     dag=dag
 )
 
-convert_to_parquet = PythonOperator(
-    task_id='convert_to_parquet',
-    python_callable=run_pipeline,
+plan_staging_units = PythonOperator(
+    task_id='plan_staging_units',
+    python_callable=plan_staging,
     dag=dag
 )
 
-config = get_config()
+# One mapped task per file or date shard, each on its own worker with its own retries
+convert_to_parquet = PythonOperator.partial(
+    task_id='convert_to_parquet',
+    python_callable=stage_unit,
+    map_index_template="{{ task.op_kwargs['unit'] }}",
+    dag=dag
+).expand(op_kwargs=plan_staging_units.output)
+
+# Loads every day of a backfill run with one job per table, nothing to do otherwise
+load_backfill = BigQueryJobGraphOperator(
+    task_id='load_backfill',
+    plan_callable=plan_backfill_load,
+    dag=dag
+)
 
 with TaskGroup("data_quality_checks", dag=dag) as dq_checks:
-    generate_dq_tables = PythonOperator(
+    generate_dq_tables = BigQueryJobGraphOperator(
         task_id="generate_dq_tables",
-        python_callable=run_dq_creation,
+        plan_callable=plan_dq,
         op_kwargs={'config': config},
         dag=dag
     )
 
-create_views = PythonOperator(
+create_views = BigQueryJobGraphOperator(
     task_id='create_views',
-    python_callable=run_view_creation,
+    plan_callable=plan_views,
     op_kwargs={'config': config},
     dag=dag
 )
@@ -168,4 +200,4 @@ cleanup_creds = PythonOperator(
     dag=dag
 )
 
-setup_creds >> extract_from_drive >> check_files >> convert_to_parquet >> dq_checks >> create_views >> cleanup_creds
+setup_creds >> extract_from_drive >> check_files >> plan_staging_units >> convert_to_parquet >> load_backfill >> dq_checks >> create_views >> cleanup_creds
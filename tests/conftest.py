@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'dags'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from local_gcs import LocalStorageClient
+
+@pytest.fixture
+def storage_client(tmp_path):
+    """Filesystem stand-in for storage.Client, one directory per bucket under tmp_path"""
+    return LocalStorageClient(str(tmp_path / "gcs"))
@@ -0,0 +1,311 @@
+import csv
+import json
+import os
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+import pytest
+
+from scripts import aws_billing_raw_to_stage as stage
+from scripts.bigquery_partitions import NULL_PARTITION
+from scripts.dq_rules import DQ_RULES, DQProfile
+from synthetic_data import generate_billing_csv
+
+BILLING_FILE = "aws_data_desafio.csv"
+SOURCE_PATH = "aws_data_desafio/2024/01/01/aws_data_desafio.csv"
+
+# Rows with the null tokens pandas reads as NaN, an unparseable date and an
+# account ID with a leading zero
+EXTRA_ROWS = [
+    "012345678901,NA,1.5,OnDemand,Hrs,AmazonEC2,EC2 product,us-east-1,null,2024-02-01,app-1,2.0,us-east-1:AmazonEC2-Hrs",
+    "123456789012,None,,N/A,Hrs,AmazonEC2,EC2 product,us-east-1,NULL,not-a-date,app-2,,us-east-1:AmazonEC2-Hrs",
+    ",<NA>,3.0,OnDemand,n/a,AmazonS3,,eu-west-1,#N/A,2024-03-01,,4.0,"
+]
+
+def billing_config(streaming: bool):
+    return {**next(f for f in stage.FILES if f["name"] == BILLING_FILE), "streaming": streaming}
+
+def convert(storage_client, streaming: bool):
+    profile = DQProfile(DQ_RULES["stage_aws_billing"])
+    parquet_path = f"aws_data_desafio/{'streaming' if streaming else 'pandas'}.parquet"
+    stage.convert_to_parquet(
+        storage_client,
+        billing_config(streaming),
+        SOURCE_PATH,
+        storage_client.bucket(stage.STAGE_BUCKET_NAME),
+        parquet_path,
+        profile=profile
+    )
+    return pq.read_table(os.path.join(storage_client.root, stage.STAGE_BUCKET_NAME, parquet_path)), profile.results()
+
+@pytest.fixture
+def billing_csv(storage_client):
+    path = os.path.join(storage_client.root, stage.RAW_BUCKET_NAME, SOURCE_PATH)
+    os.makedirs(os.path.dirname(path))
+    generate_billing_csv(path, 5000)
+    with open(path, "a") as f:
+        f.write("\n".join(EXTRA_ROWS) + "\n")
+    return path
+
+def test_streaming_conversion_matches_pandas(storage_client, billing_csv):
+    pandas_table, pandas_dq = convert(storage_client, streaming=False)
+    streaming_table, streaming_dq = convert(storage_client, streaming=True)
+
+    assert streaming_table.schema == pandas_table.schema == stage.build_arrow_schema(
+        billing_config(True)["schema"], billing_config(True)["dictionary_columns"]
+    )
+    assert streaming_table.num_rows == pandas_table.num_rows == 5000 + len(EXTRA_ROWS)
+    assert streaming_dq == pandas_dq
+    for name in pandas_table.column_names:
+        assert streaming_table.column(name).to_pylist() == pandas_table.column(name).to_pylist(), name
+    assert "012345678901" in pandas_table.column("account_id").to_pylist()
+
+    nulls = {row["check_name"]: row["num_issues"] for row in streaming_dq}
+    assert nulls["instance_type IS NULL"] > len(EXTRA_ROWS)
+    assert nulls["service_code IS NULL"] > len(EXTRA_ROWS)
+    assert nulls["start_date IS NULL"] == 1
+
+def test_shards_are_converted_in_one_pass(storage_client, billing_csv, monkeypatch):
+    reads = []
+    open_csv = stage.pacsv.open_csv
+    monkeypatch.setattr(stage.pacsv, "open_csv", lambda *args, **kwargs: reads.append(1) or open_csv(*args, **kwargs))
+    config = {**billing_config(True), "shard_months": 3}
+    whole, whole_dq = convert(storage_client, streaming=True)
+
+    shards = stage.file_shards({"storage": storage_client}, config, "2024/01/01")
+
+    assert len(reads) == 2  # The whole-file conversion above and the shards
+    assert [(shard["start"], shard["include_null"]) for shard in shards] == [
+        ("2024-01-01", True), ("2024-04-01", False), ("2024-07-01", False), ("2024-10-01", False)
+    ]
+    profile = DQProfile(DQ_RULES["stage_aws_billing"])
+    rows = 0
+    raw_bucket = storage_client.bucket(stage.RAW_BUCKET_NAME)
+    for shard in shards:
+        manifest = stage.load_manifest(raw_bucket, f"aws_data_desafio__{stage.shard_suffix(shard)}")
+        assert manifest["parquet_conversion"] == stage.conversion_fingerprint(config)
+        for uri in manifest["parquet_uris"]:
+            table = pq.read_table(os.path.join(storage_client.root, uri.replace("gs://", "", 1)))
+            dates = [value.isoformat() for value in table.column("start_date").to_pylist() if value is not None]
+            assert all(shard["start"] <= value < shard["end"] for value in dates)
+            profile.update(table)
+            rows += table.num_rows
+    assert rows == whole.num_rows
+    assert profile.results() == whole_dq
+
+    # Unchanged files are not read again
+    assert stage.file_shards({"storage": storage_client}, config, "2024/01/01") == shards
+    assert len(reads) == 2
+
+def test_shards_bound_their_buffers_and_open_files(storage_client, billing_csv, monkeypatch):
+    monkeypatch.setattr(stage, "SHARD_MAX_OPEN_FILES", 2)
+    config = {**billing_config(True), "shard_months": 1, "batch_size": 256 * 1024}
+    whole, whole_dq = convert(storage_client, streaming=True)
+
+    shards = stage.convert_shards(
+        storage_client, config, SOURCE_PATH, storage_client.bucket(stage.STAGE_BUCKET_NAME), "aws_data_desafio/sharded"
+    )
+
+    assert len(shards) == 12
+    # Shards whose file was closed for another one go on in new files
+    assert any(len(shard["parquet_uris"]) > 2 for shard in shards)
+    rows = []
+    for shard in shards:
+        for uri in shard["parquet_uris"]:
+            if not uri.endswith("__undated.parquet"):
+                rows += pq.read_table(os.path.join(storage_client.root, uri.replace("gs://", "", 1))).to_pylist()
+    undated = pq.read_table(os.path.join(storage_client.root, stage.STAGE_BUCKET_NAME, "aws_data_desafio/sharded__undated.parquet"))
+    assert sorted(rows + undated.to_pylist(), key=repr) == sorted(whole.to_pylist(), key=repr)
+    assert sum(shard["dq_num_rows"] for shard in shards) == whole.num_rows
+
+def test_file_without_dated_rows_is_one_undated_shard(storage_client, monkeypatch):
+    path = os.path.join(storage_client.root, stage.RAW_BUCKET_NAME, SOURCE_PATH)
+    os.makedirs(os.path.dirname(path))
+    generate_billing_csv(path, 100)
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows({**row, "start_date": ""} for row in rows)
+    config = {**billing_config(True), "shard_months": 3}
+    monkeypatch.setattr(stage, "FILES", [config])
+
+    shards = stage.file_shards({"storage": storage_client}, config, "2024/01/01")
+
+    assert shards == [{"start": None, "end": None, "include_null": True}]
+    manifest = stage.load_manifest(storage_client.bucket(stage.RAW_BUCKET_NAME), "aws_data_desafio__undated")
+    assert manifest["dq_num_rows"] == 100
+    assert [uri.rsplit("/", 1)[-1] for uri in manifest["parquet_uris"]] == ["aws_data_desafio__undated.parquet"]
+    assert stage.plan_staging_units({"storage": storage_client}, ["2024/01/01"])[0]["shard"] == shards[0]
+
+def test_json_widened_after_the_first_batch_is_converted_again(storage_client):
+    records = [{"product_code": f"P{i}", "precio_lista": i} for i in range(5)]
+    records.append({"product_code": None, "precio_lista": 0.5, "pricing_unit": "Hrs"})
+    source_path = "lista_precios/2024/01/01/lista_precios.json"
+    path = os.path.join(storage_client.root, stage.RAW_BUCKET_NAME, source_path)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        json.dump(records, f)
+    profile = DQProfile(DQ_RULES["stage_aws_prices"])
+
+    rows = stage.stream_json_to_parquet(
+        storage_client,
+        source_path,
+        storage_client.bucket(stage.STAGE_BUCKET_NAME),
+        "lista_precios/lista_precios.parquet",
+        batch_rows=2,
+        dictionary_columns=["pricing_unit"],
+        profile=profile
+    )
+
+    table = pq.read_table(os.path.join(storage_client.root, stage.STAGE_BUCKET_NAME, "lista_precios/lista_precios.parquet"))
+    assert rows == table.num_rows == len(records)
+    assert table.schema.field("precio_lista").type == pa.float64()
+    assert table.column("pricing_unit").to_pylist() == [None] * 5 + ["Hrs"]
+    # The batches of the abandoned first conversion are not profiled
+    assert profile.num_rows == len(records)
+    issues = {row["check_name"]: row["num_issues"] for row in profile.results()}
+    assert issues["product_code IS NULL"] == 1
+    assert issues["pricing_unit IS NULL"] == 5
+
+def test_conversion_fingerprint_follows_version_and_config(monkeypatch):
+    config = billing_config(True)
+    fingerprint = stage.conversion_fingerprint(config)
+
+    assert stage.conversion_fingerprint(billing_config(True)) == fingerprint
+    assert stage.conversion_fingerprint({**config, "dictionary_columns": []}) != fingerprint
+    assert stage.conversion_fingerprint({**config, "schema": config["schema"][:-1]}) != fingerprint
+    monkeypatch.setattr(stage, "CONVERSION_VERSION", stage.CONVERSION_VERSION + 1)
+    assert stage.conversion_fingerprint(config) != fingerprint
+
+def test_incoming_table_is_scoped_to_the_run_and_shard():
+    table_id = "project.dataset.stage_aws_billing"
+    daily = stage.incoming_table_id(table_id, "scheduled__2024-05-01T00:00:00+00:00")
+    backfill = stage.incoming_table_id(table_id, "backfill__2024-05-01T00:00:00+00:00")
+    shard = stage.incoming_table_id(table_id, "scheduled__2024-05-01T00:00:00+00:00", {"start": "2024-01-01", "end": "2024-04-01"})
+
+    assert stage.incoming_table_id(table_id) == "project.dataset.stage_aws_billing__incoming"
+    assert len({daily, backfill, shard}) == 3
+    assert stage.incoming_table_id(table_id, "run-a") != stage.incoming_table_id(table_id, "run_a")
+    for incoming in (daily, backfill, shard):
+        assert incoming.startswith("project.dataset.stage_aws_billing__incoming_")
+        assert incoming.split(".")[-1].replace("_", "").isalnum()
+
+def test_hive_layout_keeps_rows_without_a_date(tmp_path):
+    schema = pa.schema([pa.field("start_date", pa.date32()), pa.field("net_cost", pa.float64())])
+    batch = pa.RecordBatch.from_pylist([
+        {"start_date": date(2024, 1, 1), "net_cost": 1.0},
+        {"start_date": None, "net_cost": 2.0},
+        {"start_date": date(2024, 1, 2), "net_cost": 3.0},
+        {"start_date": None, "net_cost": 4.0}
+    ], schema=schema)
+    (tmp_path / "aws_data_desafio").mkdir()
+    prefix = str(tmp_path / "aws_data_desafio" / stage.HIVE_LAYOUT_DIR)
+
+    partitions = stage.write_hive_partitioned(
+        iter([batch]), schema, prefix, "start_date", filesystem=pafs.LocalFileSystem()
+    )
+
+    assert partitions == ["2024-01-01", "2024-01-02", NULL_PARTITION]
+    undated = pq.read_table(stage.hive_null_uri(prefix))
+    assert undated.to_pylist() == [{"start_date": None, "net_cost": 2.0}, {"start_date": None, "net_cost": 4.0}]
+    dated = ds.dataset(prefix, partitioning="hive").to_table()
+    assert sorted(dated.column("net_cost").to_pylist()) == [1.0, 3.0]
+    assert stage.hive_partition_uris(prefix, "start_date", partitions) == [
+        f"{prefix}/start_date=2024-01-01/*",
+        f"{prefix}/start_date=2024-01-02/*",
+        stage.hive_null_uri(prefix)
+    ]
+
+class FakeBigQuery:
+    def __init__(self):
+        self.loads = []
+
+    def create_table(self, table, exists_ok=False):
+        pass
+
+    def load_table_from_uri(self, uris, table_id, job_config=None):
+        self.loads.append((uris, table_id, job_config))
+
+def test_hive_incremental_load_appends_the_rows_without_a_date():
+    client = FakeBigQuery()
+    prefix = stage.hive_uri_prefix("aws_data_desafio")
+    uris = stage.hive_partition_uris(prefix, "start_date", ["2024-01-01", NULL_PARTITION])
+    jobs = stage.plan_incremental_load(client, billing_config(True), "p.d.t", uris, prefix, "p.d.t__incoming")
+
+    assert [(job["name"], job.get("depends_on", [])) for job in jobs] == [
+        ("p.d.t__incoming:load", []),
+        ("p.d.t__incoming:load_undated", ["p.d.t__incoming:load"]),
+        ("p.d.t__incoming:partitions", ["p.d.t__incoming:load_undated"]),
+        ("p.d.t:merge", ["p.d.t__incoming:partitions"])
+    ]
+    jobs[0]["submit"]()
+    jobs[1]["submit"]()
+    (hive_uris, _, hive_config), (plain_uris, _, plain_config) = client.loads
+    assert hive_uris == uris[:1] and hive_config.hive_partitioning is not None
+    assert hive_config.write_disposition == "WRITE_TRUNCATE"
+    assert plain_uris == uris[1:] and plain_config.hive_partitioning is None
+    assert plain_config.write_disposition == "WRITE_APPEND"
+
+def test_backfill_takes_each_partition_from_the_latest_day(monkeypatch):
+    duckdb = pytest.importorskip("duckdb")
+    merges = []
+    monkeypatch.setattr(stage, "replace_partitions", lambda client, table_id, source_sql, *args, **kwargs: merges.append(source_sql))
+    client = FakeBigQuery()
+    days = [
+        {"file_name": BILLING_FILE, "day_path": day_path, "table_id": "p.d.t", "backfill": True,
+         "parquet_uris": [f"gs://{stage.STAGE_BUCKET_NAME}/aws_data_desafio/{day_path}/aws_data_desafio.parquet"]}
+        for day_path in ("2024/05/02", "2024/05/01")
+    ]
+    memo = {}
+    jobs = stage.plan_backfill_load(client, days, memo, "backfill__2024-05-02")
+    jobs[0]["submit"]()
+    memo[BILLING_FILE]["partitions"] = ["2024-04-30", "2024-05-01", NULL_PARTITION]
+    jobs[-1]["submit"]()
+
+    uris, _, config = client.loads[0]
+    assert uris == [day["parquet_uris"][0] for day in reversed(days)]
+    assert config.hive_partitioning.source_uri_prefix == \
+        f"gs://{stage.STAGE_BUCKET_NAME}/aws_data_desafio/{{source_year:INTEGER}}/{{source_month:INTEGER}}/{{source_day:INTEGER}}"
+
+    # Both exports repeat 2024-04-30 and the undated rows, only the later one is kept
+    columns = [field.name for field in billing_config(True)["schema"]]
+    incoming = pa.table({
+        **{name: pa.nulls(5, pa.string()) for name in columns},
+        "start_date": pa.array([date(2024, 4, 30), None, date(2024, 4, 30), date(2024, 5, 1), None], pa.date32()),
+        "net_cost": pa.array([1.0, 2.0, 10.0, 20.0, 30.0]),
+        "source_year": [2024] * 5,
+        "source_month": [5] * 5,
+        "source_day": [1, 1, 2, 2, 2]
+    })
+    connection = duckdb.connect()
+    connection.register("incoming", incoming)
+    table_name = client.loads[0][1]
+    rows = connection.execute(merges[0].replace(f"`{table_name}`", "incoming")).fetchall()
+    assert {(row[columns.index("start_date")], row[columns.index("net_cost")]) for row in rows} == \
+        {(date(2024, 4, 30), 10.0), (date(2024, 5, 1), 20.0), (None, 30.0)}
+
+def test_backfill_counts_only_the_loaded_days(storage_client):
+    def dq_results(num_issues):
+        return [{"check_name": "product_code IS NULL", "num_issues": num_issues}]
+
+    days = [
+        {"file_name": file_name, "day_path": day_path, "table_id": f"p.d.{table_name}", "backfill": True,
+         "dq_results": dq_results(num_issues)}
+        for file_name, table_name in [(BILLING_FILE, "stage_aws_billing"), ("lista_precios.json", "stage_aws_prices")]
+        for day_path, num_issues in [("2024/05/01", 3), ("2024/05/02", 5)]
+    ]
+    memo = {
+        BILLING_FILE: {"partitions": ["2024-04-30", "2024-05-01"]},
+        "lista_precios.json": {"partitions": None}
+    }
+
+    loaded = stage.backfill_load_results(storage_client, days, memo)
+
+    # Both billing days hold 2024-04-30, only the later one's rows are loaded
+    assert loaded[BILLING_FILE]["dq_results"] is None
+    assert loaded["lista_precios.json"]["dq_results"] == dq_results(5)
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+from scripts.bq_job_graph import JobGraph, JobGraphError, run_job_graph
+
+class FakeJob:
+    """BigQuery job stand-in that finishes when told to"""
+
+    def __init__(self, name, error=None):
+        self.job_id = f"job_{name}"
+        self.project = "project"
+        self.location = "US"
+        self.job_type = "query"
+        self.finished = False
+        self.error = error
+
+    def done(self):
+        return self.finished
+
+    def result(self):
+        if self.error:
+            raise self.error
+        return self
+
+class FakeClient:
+    def __init__(self):
+        self.jobs = {}
+
+    def get_job(self, job_id, project, location):
+        return self.jobs[job_id]
+
+class Graph:
+    """Job definitions recording their submissions, with a job per name in ``client``"""
+
+    def __init__(self, dependencies, errors=None):
+        self.client = FakeClient()
+        self.submitted = []
+        self.completed = []
+        self.dependencies = dependencies
+        self.errors = errors or {}
+
+    def submit(self, name):
+        self.submitted.append(name)
+        job = FakeJob(name, self.errors.get(name))
+        self.client.jobs[job.job_id] = job
+        return job
+
+    def definitions(self):
+        return [
+            {
+                "name": name,
+                "submit": lambda name=name: self.submit(name),
+                "depends_on": depends_on,
+                "on_done": lambda job, name=name: self.completed.append(name)
+            }
+            for name, depends_on in self.dependencies.items()
+        ]
+
+    def finish(self, *names):
+        for name in names:
+            self.client.jobs[f"job_{name}"].finished = True
+
+DEPENDENCIES = {"base": [], "months": ["base"], "growth": ["months", "base"], "prices": []}
+
+def test_jobs_start_once_their_dependencies_are_done():
+    graph = Graph(DEPENDENCIES)
+    run = JobGraph(graph.definitions())
+
+    run.advance_until_waiting()
+    assert graph.submitted == ["base", "prices"]
+
+    graph.finish("prices")
+    run.advance_until_waiting()
+    assert graph.submitted == ["base", "prices"]
+
+    graph.finish("base")
+    run.advance_until_waiting()
+    assert graph.submitted == ["base", "prices", "months"]
+
+    graph.finish("months")
+    run.advance_until_waiting()
+    graph.finish("growth")
+    run.advance_until_waiting()
+    assert run.finished
+    assert graph.submitted == ["base", "prices", "months", "growth"]
+    assert graph.completed == ["prices", "base", "months", "growth"]
+    assert set(run.result()) == set(DEPENDENCIES)
+
+def test_resumed_graph_picks_running_jobs_up_by_id():
+    graph = Graph(DEPENDENCIES)
+    run = JobGraph(graph.definitions())
+    run.advance_until_waiting()
+    graph.finish("prices")
+    run.advance_until_waiting()
+    state = json.loads(json.dumps(run.state()))
+
+    resumed = JobGraph(graph.definitions(), state=state, client=graph.client)
+    graph.finish("base")
+    resumed.advance_until_waiting()
+    graph.finish("months")
+    resumed.advance_until_waiting()
+    graph.finish("growth")
+    resumed.advance_until_waiting()
+
+    # Neither the finished nor the running jobs of the state are submitted again
+    assert graph.submitted == ["base", "prices", "months", "growth"]
+    assert resumed.finished
+    assert set(resumed.result()) == set(DEPENDENCIES)
+
+def test_failed_job_skips_its_dependents_only():
+    graph = Graph(DEPENDENCIES, errors={"base": RuntimeError("Syntax error")})
+    run = JobGraph(graph.definitions())
+    run.advance_until_waiting()
+    graph.finish("base", "prices")
+    run.advance_until_waiting()
+
+    assert run.finished
+    assert graph.submitted == ["base", "prices"]
+    with pytest.raises(JobGraphError) as error:
+        run.result()
+    assert list(error.value.failures) == ["base"]
+    assert sorted(error.value.skipped) == ["growth", "months"]
+
+def test_job_without_work_counts_as_done():
+    graph = Graph({"noop": [], "after": ["noop"]})
+    definitions = graph.definitions()
+    definitions[0]["submit"] = lambda: None
+
+    run = JobGraph(definitions)
+    run.advance_until_waiting()
+
+    assert graph.submitted == ["after"]
+
+def test_run_job_graph_rejects_cycles():
+    with pytest.raises(ValueError, match="cycle"):
+        run_job_graph(Graph({"a": ["b"], "b": ["a"]}).definitions())
@@ -0,0 +1,59 @@
+from google.cloud import bigquery
+import pytest
+
+from scripts.bq_metrics import QueryBudgetExceededError, max_bytes_billed_from_config, submit_query
+
+class FakeQueryJob:
+    def __init__(self, total_bytes_processed):
+        self.total_bytes_processed = total_bytes_processed
+
+class FakeBigQuery:
+    """Records the queries sent, answering dry runs with ``estimated_bytes``"""
+
+    def __init__(self, estimated_bytes):
+        self.estimated_bytes = estimated_bytes
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        self.queries.append((sql, job_config))
+        return FakeQueryJob(self.estimated_bytes if job_config is not None and job_config.dry_run else None)
+
+QUERY = "SELECT * FROM `project.dataset.stage_aws_billing` WHERE start_date = @day"
+
+def parameters():
+    return bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("day", "DATE", "2024-05-01")])
+
+def test_query_over_the_budget_is_not_started():
+    client = FakeBigQuery(estimated_bytes=2 * 1024 ** 3)
+
+    with pytest.raises(QueryBudgetExceededError) as error:
+        submit_query(client, QUERY, parameters(), max_bytes_billed=1024 ** 3)
+
+    assert (error.value.estimated_bytes, error.value.max_bytes_billed) == (2 * 1024 ** 3, 1024 ** 3)
+    assert len(client.queries) == 1
+    _, dry_run_config = client.queries[0]
+    assert dry_run_config.dry_run and not dry_run_config.use_query_cache
+    assert dry_run_config.query_parameters[0].name == "day"
+
+def test_query_within_the_budget_runs_capped():
+    client = FakeBigQuery(estimated_bytes=1000)
+
+    submit_query(client, QUERY, parameters(), max_bytes_billed=1024 ** 3)
+
+    assert len(client.queries) == 2
+    _, job_config = client.queries[1]
+    assert not job_config.dry_run
+    assert job_config.maximum_bytes_billed == 1024 ** 3
+    assert job_config.labels == {"estimated_bytes": "1000"}
+    assert job_config.query_parameters[0].name == "day"
+
+def test_query_without_a_budget_is_not_dry_run():
+    client = FakeBigQuery(estimated_bytes=2 * 1024 ** 3)
+
+    submit_query(client, QUERY)
+
+    assert client.queries == [(QUERY, None)]
+
+@pytest.mark.parametrize("value, budget", [(None, None), ("", None), ("1073741824", 1024 ** 3), (5, 5)])
+def test_budget_from_config(value, budget):
+    assert max_bytes_billed_from_config({"max_bytes_billed": value}) == budget
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from scripts.concurrency import ConcurrentExecutionError, run_concurrently
+from scripts.tracing import span, trace
+
+def test_every_failure_is_reported_and_other_items_complete():
+    done = []
+
+    def process(item):
+        if item % 3 == 0:
+            raise ValueError(f"bad item {item}")
+        done.append(item)
+        return item * 10
+
+    with pytest.raises(ConcurrentExecutionError) as error:
+        run_concurrently(process, range(1, 10), max_workers=3)
+
+    assert sorted(done) == [1, 2, 4, 5, 7, 8]
+    assert sorted(error.value.failures) == ["3", "6", "9"]
+    assert all(isinstance(failure, ValueError) for failure in error.value.failures.values())
+    assert "3 item(s) failed" in str(error.value)
+
+def test_results_are_keyed_by_item_name():
+    results = run_concurrently(lambda name: name.upper(), ["a.csv", "b.json"], key=lambda name: name.split(".")[0])
+
+    assert results == {"a": "A.CSV", "b": "B.JSON"}
+    assert run_concurrently(lambda item: item, []) == {}
+
+def test_items_run_at_most_max_workers_at_a_time():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def process(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+
+    run_concurrently(process, range(12), max_workers=3)
+
+    assert max(peak) <= 3
+
+def test_items_run_in_the_callers_trace():
+    def process(item):
+        with span("file", file=item):
+            pass
+
+    with trace("stage") as tracer:
+        with span("files"):
+            run_concurrently(process, ["a", "b"])
+
+    files = [record for record in tracer.spans if record.name == "file"]
+    parent = next(record for record in tracer.spans if record.name == "files")
+    assert sorted(record.attributes["file"] for record in files) == ["a", "b"]
+    assert all(record.parent_id == parent.span_id for record in files)
@@ -0,0 +1,96 @@
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.create_bigquery_views import run_local_transformations
+
+BILLING_COLUMNS = [
+    "start_date", "service_code", "product_code", "product_name", "pricing_term",
+    "pricing_unit", "instance_type", "usage_type", "usage_amount", "net_cost"
+]
+BILLING = [
+    # EC2 is billed in January and March only, February is a gap
+    (date(2024, 1, 5), "AmazonEC2", "AmazonEC2", "EC2 Hrs", "OnDemand", "Hrs", "t3.micro", "Usage", 10.0, 4.0),
+    (date(2024, 1, 20), "AmazonEC2", "AmazonEC2", "EC2 Hrs", "OnDemand", "Hrs", "t3.micro", "Usage", 10.0, 6.0),
+    (date(2024, 3, 2), "AmazonEC2", "AmazonEC2", "EC2 Hrs", "OnDemand", "Hrs", "t3.micro", "Usage", 30.0, 15.0),
+    # S3 has no instance type and is priced by a list entry without one
+    (date(2024, 1, 7), "AmazonS3", "AmazonS3", "S3 Storage", "OnDemand", "GB-Mo", None, "Storage", 100.0, 2.0),
+    (date(2024, 2, 7), "AmazonS3", "AmazonS3", "S3 Storage", "OnDemand", "GB-Mo", None, "Storage", 200.0, 5.0),
+    # Lambda has no list price and a missing service code
+    (date(2024, 2, 9), None, "AWSLambda", "Lambda Requests", "OnDemand", "Requests", None, "Request", 2000000.0, 1.0)
+]
+PRICES = [
+    {"product_code": "AmazonEC2", "product_name": "EC2 Hrs", "pricing_term": "OnDemand",
+     "pricing_unit": "Hrs", "instance_type": "t3.micro", "precio_lista": 0.5},
+    {"product_code": "AmazonS3", "product_name": "S3 Storage", "pricing_term": "OnDemand",
+     "pricing_unit": "GB-Mo", "instance_type": None, "precio_lista": 0.02}
+]
+UNIT_FACTORS = [
+    {"pricing_unit": "Hrs", "unidad_factor": 1.0},
+    {"pricing_unit": "GB-Mo", "unidad_factor": 1.0},
+    {"pricing_unit": "Requests", "unidad_factor": 1000000.0}
+]
+
+@pytest.fixture
+def results(tmp_path):
+    inputs = {
+        "stage_aws_billing": pa.Table.from_pylist([dict(zip(BILLING_COLUMNS, row)) for row in BILLING]),
+        "stage_aws_prices": pa.Table.from_pylist(PRICES),
+        "stage_aws_unit_factor": pa.Table.from_pylist(UNIT_FACTORS)
+    }
+    paths = {}
+    for name, table in inputs.items():
+        paths[name] = str(tmp_path / f"{name}.parquet")
+        pq.write_table(table, paths[name])
+    return {name: table.to_pylist() for name, table in run_local_transformations(paths).items()}
+
+def by_key(rows, *keys):
+    return {tuple(row[key] for key in keys): row for row in rows}
+
+def test_billing_with_gross_cost(results):
+    rows = by_key(results["aws_billing_with_gross_cost"], "start_date", "product_code")
+
+    assert len(rows) == len(BILLING)
+    assert rows[(date(2024, 1, 5), "AmazonEC2")]["gross_cost"] == pytest.approx(5.0)
+    # NULL instance types match a price list entry without instance type
+    assert rows[(date(2024, 1, 7), "AmazonS3")]["has_price_match"] is True
+    assert rows[(date(2024, 1, 7), "AmazonS3")]["gross_cost"] == pytest.approx(2.0)
+    assert rows[(date(2024, 2, 9), "AWSLambda")]["has_price_match"] is False
+    assert rows[(date(2024, 2, 9), "AWSLambda")]["gross_cost"] is None
+
+def test_agg_cost_by_product_month(results):
+    rows = by_key(results["aws_agg_cost_by_product_month"], "month", "product_code")
+
+    # Only priced rows; with fewer than five products every product is top 5
+    assert sorted(rows) == [
+        (date(2024, 1, 1), "AmazonEC2"),
+        (date(2024, 1, 1), "AmazonS3"),
+        (date(2024, 2, 1), "AmazonS3"),
+        (date(2024, 3, 1), "AmazonEC2")
+    ]
+    january_ec2 = rows[(date(2024, 1, 1), "AmazonEC2")]
+    assert january_ec2["gross_cost"] == pytest.approx(10.0)
+    assert january_ec2["is_top5"] is True
+    assert january_ec2["expected_cost"] == pytest.approx(7.0)
+    assert january_ec2["diff_abs"] == pytest.approx(3.0)
+    assert january_ec2["needs_review"] is True
+
+def test_service_cost_growth_across_a_month_gap(results):
+    rows = by_key(results["aws_agg_service_cost_by_month"], "month", "service_code")
+
+    # Rows without a service code are left out
+    assert sorted(rows) == [
+        (date(2024, 1, 1), "AmazonEC2"),
+        (date(2024, 1, 1), "AmazonS3"),
+        (date(2024, 2, 1), "AmazonS3"),
+        (date(2024, 3, 1), "AmazonEC2")
+    ]
+    assert rows[(date(2024, 1, 1), "AmazonEC2")]["prev_net_cost"] is None
+    # Growth is measured against the previous month the service was billed in
+    march_ec2 = rows[(date(2024, 3, 1), "AmazonEC2")]
+    assert march_ec2["prev_net_cost"] == pytest.approx(10.0)
+    assert march_ec2["growth_abs"] == pytest.approx(5.0)
+    assert march_ec2["growth_pct"] == pytest.approx(50.0)
+    assert rows[(date(2024, 2, 1), "AmazonS3")]["growth_pct"] == pytest.approx(150.0)
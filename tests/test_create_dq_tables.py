@@ -0,0 +1,64 @@
+import os
+
+import duckdb
+import pytest
+
+from scripts import aws_billing_raw_to_stage as stage
+from scripts.bigquery_partitions import STAGING_TASK_ID
+from scripts.create_dq_tables import staged_dq_results
+from scripts.dq_rules import DQ_RULES, DQProfile, rule_predicate
+from synthetic_data import generate_billing_csv, generate_prices_file
+
+FILES = {
+    "stage_aws_billing": ("aws_data_desafio.csv", "aws_data_desafio/2024/01/01/aws_data_desafio.csv"),
+    "stage_aws_prices": ("lista_precios.json", "lista_precios/2024/01/01/lista_precios.json")
+}
+
+class FakeTaskInstance:
+    def __init__(self, results):
+        self.results = results
+
+    def xcom_pull(self, task_ids):
+        return self.results if task_ids == STAGING_TASK_ID else None
+
+@pytest.mark.parametrize("table_name", sorted(FILES))
+def test_profile_matches_the_sql_rules(storage_client, table_name):
+    file_name, source_path = FILES[table_name]
+    path = os.path.join(storage_client.root, stage.RAW_BUCKET_NAME, source_path)
+    os.makedirs(os.path.dirname(path))
+    if table_name == "stage_aws_billing":
+        generate_billing_csv(path, 3000)
+    else:
+        generate_prices_file(path, 3000)
+
+    rules = DQ_RULES[table_name]
+    profile = DQProfile(rules)
+    stage.convert_to_parquet(
+        storage_client,
+        next(f for f in stage.FILES if f["name"] == file_name),
+        source_path,
+        storage_client.bucket(stage.STAGE_BUCKET_NAME),
+        "profiled.parquet",
+        profile=profile
+    )
+
+    parquet = os.path.join(storage_client.root, stage.STAGE_BUCKET_NAME, "profiled.parquet")
+    expected = [
+        {
+            "check_name": rule["check_name"],
+            "num_issues": duckdb.sql(
+                f"SELECT COUNT(*) FROM read_parquet('{parquet}') WHERE {rule_predicate(rule)}"
+            ).fetchone()[0]
+        }
+        for rule in rules
+    ]
+    assert profile.results() == expected
+
+def test_counts_of_incremental_loads_are_not_used():
+    dq_results = [{"check_name": "account_id IS NULL", "num_issues": 1}]
+    context = {"ti": FakeTaskInstance([
+        {"billing": {"table_id": "p.d.stage_aws_billing", "partitions": ["2024-01-01"], "dq_results": dq_results}},
+        {"prices": {"table_id": "p.d.stage_aws_prices", "partitions": None, "dq_results": dq_results}}
+    ])}
+
+    assert staged_dq_results(context) == {"stage_aws_prices": dq_results}
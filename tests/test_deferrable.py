@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+from scripts.deferrable import GCSObjectsSensor
+
+class DagRun:
+    def __init__(self, conf):
+        self.conf = conf
+
+def sensor():
+    return GCSObjectsSensor(
+        task_id="check_files",
+        bucket="raw",
+        object_templates=["aws_data_desafio/{date_path}/aws_data_desafio.csv"],
+        max_age=timedelta(days=1)
+    )
+
+def test_freshness_is_anchored_to_the_logical_date():
+    logical_date = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+
+    objects, updated_after = sensor().required_objects({"logical_date": logical_date, "dag_run": DagRun({})})
+
+    assert objects == ["aws_data_desafio/2024/05/01/aws_data_desafio.csv"]
+    # The same whenever the run is retried or cleared
+    assert updated_after == (logical_date - timedelta(days=1)).timestamp()
+
+def test_backfill_does_not_check_freshness():
+    context = {
+        "logical_date": datetime(2024, 5, 3, tzinfo=timezone.utc),
+        "dag_run": DagRun({"backfill_start": "2024-05-01", "backfill_end": "2024-05-02"})
+    }
+
+    objects, updated_after = sensor().required_objects(context)
+
+    assert len(objects) == 2
+    assert updated_after is None
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scripts import drive_files_to_gcs
+from scripts.drive_files_to_gcs import DriveToGCSIngestionError, get_file_metadata, ranged_download_to_blob, stream_download_to_blob
+
+FILE_ID = "file-123"
+DESTINATION = "aws_data_desafio/2024/01/01/aws_data_desafio.csv"
+CHUNKS = 3  # Chunks transferred before a simulated failure
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the server's content at /files/{FILE_ID} and honours single byte ranges"""
+
+    def do_GET(self):
+        if self.path != f"/files/{FILE_ID}?alt=media":
+            self.send_error(404)
+            return
+        content = self.server.content
+        start, end = self.headers["Range"].removeprefix("bytes=").split("-")
+        body = content[int(start):int(end) + 1]
+        self.server.ranges.append((int(start), int(end)))
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def drive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.content = os.urandom(10000)
+    server.ranges = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def download(server, bucket, part_size, md5_checksum=None):
+    content = server.content
+    with requests.Session() as session:
+        ranged_download_to_blob(
+            session,
+            FILE_ID,
+            len(content),
+            md5_checksum if md5_checksum is not None else hashlib.md5(content).hexdigest(),
+            bucket,
+            DESTINATION,
+            part_size=part_size,
+            max_workers=4,
+            base_url=f"http://127.0.0.1:{server.server_port}/files"
+        )
+
+def bucket_objects(bucket):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), bucket.path)
+        for root, _, names in os.walk(bucket.path)
+        for name in names
+    )
+
+def test_ranges_on_part_boundaries(drive_server, storage_client):
+    bucket = storage_client.bucket("raw")
+    download(drive_server, bucket, part_size=2500)
+
+    assert sorted(drive_server.ranges) == [(0, 2499), (2500, 4999), (5000, 7499), (7500, 9999)]
+    assert bucket.blob(DESTINATION).download_as_bytes() == drive_server.content
+    assert bucket_objects(bucket) == [DESTINATION]
+
+def test_short_last_range_and_tiered_compose(drive_server, storage_client):
+    bucket = storage_client.bucket("raw")
+    # 34 parts: more than one compose request, the last range holds 100 bytes
+    download(drive_server, bucket, part_size=300)
+
+    assert len(drive_server.ranges) == 34
+    assert max(drive_server.ranges) == (9900, 9999)
+    assert bucket.blob(DESTINATION).download_as_bytes() == drive_server.content
+    assert bucket_objects(bucket) == [DESTINATION]
+
+def test_md5_mismatch_fails_without_creating_the_object(drive_server, storage_client):
+    bucket = storage_client.bucket("raw")
+
+    with pytest.raises(DriveToGCSIngestionError, match="MD5 mismatch"):
+        download(drive_server, bucket, part_size=3000, md5_checksum="0" * 32)
+
+    assert bucket_objects(bucket) == []
+
+class FakeStatus:
+    def progress(self):
+        return 0.5
+
+class FailingDownload:
+    """MediaIoBaseDownload stand-in writing CHUNKS chunks, then failing if ``fail`` is set, or writing forever"""
+
+    fail = True
+
+    def __init__(self, sink, request, chunksize):
+        self.sink = sink
+        self.written = 0
+
+    def next_chunk(self):
+        if self.written == CHUNKS and self.fail:
+            raise ConnectionError("Drive connection reset")
+        self.sink.write(b"x" * 1024)
+        self.written += 1
+        return FakeStatus(), False
+
+class FailingWriter:
+    """Blob writer whose upload fails on the CHUNKS-th chunk"""
+
+    def __init__(self):
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.writes == CHUNKS:
+            raise OSError("GCS upload failed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+def test_failed_download_aborts_the_upload(monkeypatch, storage_client):
+    monkeypatch.setattr(drive_files_to_gcs, "MediaIoBaseDownload", FailingDownload)
+    blob = storage_client.bucket("raw").blob(DESTINATION)
+
+    with pytest.raises(DriveToGCSIngestionError, match="connection reset"):
+        stream_download_to_blob(None, blob, "aws_data_desafio.csv", chunk_size=1024, max_inflight_chunks=1)
+
+    assert not blob.exists()
+    assert bucket_objects(storage_client.bucket("raw")) == []
+
+def test_failed_upload_stops_the_download(monkeypatch, storage_client):
+    # The download never ends on its own, only the cancellation stops it
+    monkeypatch.setattr(FailingDownload, "fail", False)
+    monkeypatch.setattr(drive_files_to_gcs, "MediaIoBaseDownload", FailingDownload)
+    blob = storage_client.bucket("raw").blob(DESTINATION)
+    blob.open = lambda mode, chunk_size=None: FailingWriter()
+
+    with pytest.raises(OSError, match="upload failed"):
+        stream_download_to_blob(None, blob, "aws_data_desafio.csv", chunk_size=1024, max_inflight_chunks=1)
+
+    assert not any(thread.name.startswith("download-") for thread in threading.enumerate())
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeFiles:
+    """Drive files() resource holding one live and one trashed copy of a file"""
+
+    def __init__(self):
+        self.files = {
+            "old-id": {"name": "lista_precios.json", "md5Checksum": "old", "trashed": True},
+            "new-id": {"name": "lista_precios.json", "md5Checksum": "new", "trashed": False}
+        }
+        self.queries = []
+
+    def get(self, fileId, fields):
+        assert "trashed" in fields
+        return FakeRequest(self.files[fileId])
+
+    def list(self, q, **kwargs):
+        self.queries.append(q)
+        return FakeRequest({"files": [
+            {"id": file_id, "name": item["name"]} for file_id, item in self.files.items() if not item["trashed"]
+        ]})
+
+class FakeDrive:
+    def __init__(self):
+        self.resource = FakeFiles()
+
+    def files(self):
+        return self.resource
+
+def test_trashed_cached_file_id_is_resolved_again():
+    drive = FakeDrive()
+    file_id, metadata = get_file_metadata(drive, "lista_precios.json", "old-id")
+
+    assert (file_id, metadata["md5Checksum"]) == ("new-id", "new")
+    assert len(drive.resource.queries) == 1
+
+def test_live_cached_file_id_is_used_as_is():
+    drive = FakeDrive()
+    file_id, metadata = get_file_metadata(drive, "lista_precios.json", "new-id")
+
+    assert (file_id, metadata["md5Checksum"]) == ("new-id", "new")
+    assert drive.resource.queries == []
+
+class FakeStorage:
+    def bucket(self, name):
+        return None
+
+class FakeDagRun:
+    def __init__(self, run_after):
+        self.run_after = run_after
+        self.conf = {}
+
+@pytest.mark.parametrize("logical_date, run_after, ingests", [
+    (datetime(2024, 5, 1, 12, tzinfo=timezone.utc), datetime(2024, 5, 1, 12, tzinfo=timezone.utc), True),
+    # Manual run at 23:50 whose task is retried after midnight
+    (datetime(2024, 5, 1, 23, 50, tzinfo=timezone.utc), datetime(2024, 5, 1, 23, 50, tzinfo=timezone.utc), True),
+    (datetime(2024, 4, 30, tzinfo=timezone.utc), datetime(2024, 5, 1, 12, tzinfo=timezone.utc), False),
+    (datetime(2024, 4, 1, tzinfo=timezone.utc), datetime(2024, 5, 1, 12, tzinfo=timezone.utc), False)
+])
+def test_only_runs_of_their_creation_day_ingest_from_drive(monkeypatch, logical_date, run_after, ingests):
+    calls = []
+    monkeypatch.setattr(drive_files_to_gcs, "initialize_clients", lambda path: calls.append(path) or {"drive": None, "storage": FakeStorage()})
+    monkeypatch.setattr(drive_files_to_gcs, "resolve_file_ids", lambda *args, **kwargs: {})
+    monkeypatch.setattr(drive_files_to_gcs, "run_concurrently", lambda *args, **kwargs: None)
+
+    drive_files_to_gcs.run_ingestion(
+        "credentials.json", "raw", logical_date=logical_date, dag_run=FakeDagRun(run_after)
+    )
+
+    assert bool(calls) == ingests
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+from scripts import gcp_clients
+
+class ServiceAccount(AnonymousCredentials):
+    def __init__(self, email, scopes):
+        super().__init__()
+        self.service_account_email = email
+        self.scopes = scopes
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    gcp_clients.clear_clients()
+    yield
+    gcp_clients.clear_clients()
+
+def in_threads(function, count=8):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        results[index] = function()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_clients_are_shared_across_threads():
+    credentials = AnonymousCredentials()
+    before = gcp_clients.client_stats().get("storage", {"created": 0, "reused": 0})
+
+    clients = in_threads(lambda: gcp_clients.get_storage_client("project", credentials))
+
+    assert len({id(client) for client in clients}) == 1
+    stats = gcp_clients.client_stats()["storage"]
+    assert stats["created"] - before["created"] == 1
+    assert stats["reused"] - before["reused"] == len(clients) - 1
+
+def test_drive_connections_are_per_thread_and_kept():
+    credentials = AnonymousCredentials()
+
+    connections = in_threads(lambda: (gcp_clients.thread_http(credentials), gcp_clients.thread_http(credentials)))
+
+    assert all(first is second for first, second in connections)
+    assert len({id(first) for first, _ in connections}) == len(connections)
+
+def test_service_accounts_are_keyed_by_account_and_scopes():
+    first = ServiceAccount("etl@project.iam.gserviceaccount.com", ["drive"])
+    again = ServiceAccount("etl@project.iam.gserviceaccount.com", ["drive"])
+    other_scopes = ServiceAccount("etl@project.iam.gserviceaccount.com", ["drive", "storage"])
+
+    assert gcp_clients.credentials_key(first) == gcp_clients.credentials_key(again)
+    assert gcp_clients.credentials_key(first) != gcp_clients.credentials_key(other_scopes)
+    assert gcp_clients.get_drive_session(first) is gcp_clients.get_drive_session(again)
+    # Other credentials are held by the cache, so their identity is never reused
+    anonymous = AnonymousCredentials()
+    assert gcp_clients.credentials_key(anonymous) is anonymous
+
+def test_drive_requests_use_the_connection_of_their_thread():
+    credentials = AnonymousCredentials()
+    service = gcp_clients.get_drive_service(credentials)
+
+    requests = in_threads(lambda: (service.files().get(fileId="file-123").http, gcp_clients.thread_http(credentials)))
+
+    assert all(request_http is own for request_http, own in requests)
+    assert gcp_clients.get_drive_service(credentials) is service
@@ -0,0 +1,97 @@
+import io
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from scripts.json_stream import (
+    JSONSchemaWidened, JSONStreamError, infer_arrow_schema, iter_inferred_batches, iter_json_records, iter_record_batches
+)
+
+def convert(records, batch_rows=2):
+    data = json.dumps(records).encode()
+    schema = infer_arrow_schema(iter_json_records(io.BytesIO(data)))
+    batches = list(iter_record_batches(iter_json_records(io.BytesIO(data)), schema, batch_rows=batch_rows))
+    return pa.Table.from_batches(batches, schema=schema)
+
+def test_key_first_seen_in_a_later_batch_is_kept():
+    table = convert([{"a": 1, "b": "x"}, {"a": 2, "b": "y"}, {"a": 3, "c": "new"}])
+
+    assert table.column_names == ["a", "b", "c"]
+    assert table.column("c").to_pylist() == [None, None, "new"]
+    assert table.column("b").to_pylist() == ["x", "y", None]
+
+def test_integer_columns_stay_integers():
+    table = convert([{"units": 1, "price": 1}, {"units": 2, "price": 2.5}, {"units": 3.0, "price": 3}])
+
+    assert table.schema.field("units").type == pa.int64()
+    assert table.column("units").to_pylist() == [1, 2, 3]
+    assert table.schema.field("price").type == pa.float64()
+    assert table.column("price").to_pylist() == [1.0, 2.5, 3.0]
+
+def test_text_in_a_numeric_column_makes_it_a_string():
+    table = convert([{"precio_lista": 1.5}, {"precio_lista": 2}, {"precio_lista": "N/A"}])
+
+    assert table.schema.field("precio_lista").type == pa.string()
+    assert table.column("precio_lista").to_pylist() == ["1.5", "2", "N/A"]
+
+PANDAS_TYPES = {"i": pa.int64(), "f": pa.float64(), "b": pa.bool_()}
+
+@pytest.mark.parametrize("records", [
+    [{"a": 1}, {"a": None}],
+    [{"a": 1}, {"b": 2}],
+    [{"a": True}, {"a": None}],
+    [{"a": True}, {"a": 2}],
+    [{"a": True}, {"a": 2.5}],
+    [{"a": 1.0}, {"a": 2}],
+    [{"a": None}, {"a": None}],
+    [{"a": "x"}, {"a": None}]
+])
+def test_types_match_pandas(records):
+    df = pd.read_json(io.StringIO(json.dumps(records)))
+    schema = infer_arrow_schema(records)
+
+    assert schema.names == list(df.columns)
+    for name, dtype in df.dtypes.items():
+        assert schema.field(name).type == PANDAS_TYPES.get(dtype.kind, pa.string()), name
+
+def test_ndjson_stream():
+    data = b'{"a": 1}\n{"a": 2, "b": true}\n'
+    schema = infer_arrow_schema(iter_json_records(io.BytesIO(data)))
+    batch, = iter_record_batches(iter_json_records(io.BytesIO(data)), schema)
+
+    assert batch.to_pylist() == [{"a": 1, "b": None}, {"a": 2, "b": True}]
+
+def test_record_outside_the_schema_fails():
+    schema = pa.schema([pa.field("a", pa.int64())])
+
+    with pytest.raises(JSONStreamError):
+        list(iter_record_batches(iter([{"a": 1, "b": 2}]), schema))
+
+def inferred_batches(records, batch_rows=2):
+    return list(iter_inferred_batches(iter_json_records(io.BytesIO(json.dumps(records).encode())), batch_rows=batch_rows))
+
+def test_schema_is_inferred_from_the_first_batch():
+    records = [{"a": 1, "b": "x"}, {"a": 2, "b": None}, {"a": 3, "b": "y"}, {"a": 4, "b": "z"}, {"a": 5, "b": None}]
+
+    batches = inferred_batches(records)
+
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert all(batch.schema == infer_arrow_schema(records) for batch in batches)
+    assert pa.Table.from_batches(batches).to_pylist() == records
+
+@pytest.mark.parametrize("late, field", [
+    ({"a": None}, pa.field("a", pa.float64())),
+    ({"a": 2.5}, pa.field("a", pa.float64())),
+    ({"a": 3, "c": "new"}, pa.field("c", pa.string()))
+])
+def test_records_widening_the_schema_after_the_first_batch(late, field):
+    records = [{"a": 1}, {"a": 2}, {"a": 3}, late, {"a": 4}, {"a": 5, "d": True}]
+
+    with pytest.raises(JSONSchemaWidened) as widened:
+        inferred_batches(records)
+
+    # The schema of the whole document, the records after the widening included
+    assert widened.value.schema == infer_arrow_schema(records)
+    assert widened.value.schema.field(field.name) == field
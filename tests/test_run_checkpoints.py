@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+
+import pytest
+
+from scripts import aws_billing_raw_to_stage as stage
+from scripts.run_checkpoints import (
+    MAX_UPDATE_ATTEMPTS, PARQUET_WRITTEN, TABLE_LOADED, checkpoint_path, completed_stage, load_checkpoints, record_stage
+)
+from synthetic_data import generate_billing_csv
+
+RUN_ID = "manual__2024-05-01T00:00:00+00:00"
+DAY_PATH = "2024/05/01"
+SOURCE_PATH = f"aws_data_desafio/{DAY_PATH}/aws_data_desafio.csv"
+
+class RacingBucket:
+    """Bucket where another task rewrites the checkpoint after each of the first ``races`` reads"""
+
+    def __init__(self, bucket, races):
+        self.bucket = bucket
+        self.races = races
+
+    def get_blob(self, name):
+        blob = self.bucket.get_blob(name)
+        if self.races:
+            self.races -= 1
+            checkpoints = json.loads(blob.download_as_bytes()) if blob else {}
+            checkpoints.setdefault("other.csv", {})[PARQUET_WRITTEN] = {"race": self.races}
+            self.bucket.blob(name).upload_from_string(json.dumps(checkpoints))
+        return blob
+
+    def blob(self, name):
+        return self.bucket.blob(name)
+
+@pytest.fixture
+def raw_bucket(storage_client):
+    return storage_client.bucket(stage.RAW_BUCKET_NAME)
+
+def test_concurrent_update_is_retried_without_losing_it(raw_bucket):
+    record_stage(raw_bucket, RUN_ID, "first.csv", PARQUET_WRITTEN, parquet_uris=["gs://stage/first.parquet"])
+
+    record_stage(RacingBucket(raw_bucket, races=2), RUN_ID, SOURCE_PATH, TABLE_LOADED, result={"partitions": []})
+
+    checkpoints = load_checkpoints(raw_bucket, RUN_ID)
+    assert completed_stage(checkpoints, "first.csv", PARQUET_WRITTEN)["parquet_uris"] == ["gs://stage/first.parquet"]
+    assert completed_stage(checkpoints, "other.csv", PARQUET_WRITTEN)["race"] == 0
+    assert completed_stage(checkpoints, SOURCE_PATH, TABLE_LOADED)["result"] == {"partitions": []}
+
+def test_checkpoint_changing_under_every_attempt_fails(raw_bucket):
+    with pytest.raises(RuntimeError, match="after"):
+        record_stage(RacingBucket(raw_bucket, races=MAX_UPDATE_ATTEMPTS), RUN_ID, SOURCE_PATH, TABLE_LOADED)
+
+def test_updates_from_concurrent_tasks_are_all_kept(raw_bucket):
+    keys = [f"file_{index}.csv" for index in range(8)]
+    threads = [
+        threading.Thread(target=record_stage, args=(raw_bucket, RUN_ID, key, PARQUET_WRITTEN), kwargs={"parquet_uris": [key]})
+        for key in keys
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(load_checkpoints(raw_bucket, RUN_ID)) == keys
+
+def test_nothing_is_recorded_outside_a_run(raw_bucket):
+    record_stage(raw_bucket, None, SOURCE_PATH, TABLE_LOADED)
+
+    assert raw_bucket.get_blob(checkpoint_path("None")) is None
+    assert load_checkpoints(raw_bucket, None) == {}
+
+@pytest.fixture
+def retried_run(storage_client, monkeypatch):
+    """Billing file of a run, with the conversions and loads of process_file recorded"""
+    path = os.path.join(storage_client.root, stage.RAW_BUCKET_NAME, SOURCE_PATH)
+    os.makedirs(os.path.dirname(path))
+    generate_billing_csv(path, 500)
+    calls = {"convert": 0, "load": []}
+    convert_to_parquet = stage.convert_to_parquet
+
+    def convert(*args, **kwargs):
+        calls["convert"] += 1
+        return convert_to_parquet(*args, **kwargs)
+
+    monkeypatch.setattr(stage, "convert_to_parquet", convert)
+    monkeypatch.setattr(stage, "load_to_bigquery", lambda client, config, table_id, uris, *args: calls["load"].append(uris) or ["2024-05-01"])
+
+    def process():
+        return stage.process_file(
+            {"storage": storage_client, "bigquery": None},
+            stage.file_config_by_name("aws_data_desafio.csv"),
+            DAY_PATH,
+            force_refresh=True,
+            run_id=RUN_ID
+        )
+    return process, calls
+
+def test_retry_after_the_load_skips_every_stage(retried_run):
+    process, calls = retried_run
+    first = process()
+
+    # A retry, also with force_refresh, neither converts nor loads again
+    assert process() == first
+    assert calls["convert"] == 1
+    assert len(calls["load"]) == 1
+
+def test_retry_after_a_failed_load_reuses_the_parquet_data(retried_run, monkeypatch):
+    process, calls = retried_run
+    load = stage.load_to_bigquery
+
+    def failing_load(*args):
+        raise RuntimeError("load failed")
+
+    monkeypatch.setattr(stage, "load_to_bigquery", failing_load)
+    with pytest.raises(stage.AirflowException, match="load failed"):
+        process()
+    monkeypatch.setattr(stage, "load_to_bigquery", load)
+
+    result = process()
+
+    assert calls["convert"] == 1
+    assert calls["load"] == [[f"gs://{stage.STAGE_BUCKET_NAME}/aws_data_desafio/{DAY_PATH}/aws_data_desafio.parquet"]]
+    assert result["partitions"] == ["2024-05-01"]
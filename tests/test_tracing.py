@@ -0,0 +1,81 @@
+import pytest
+
+from scripts.tracing import TRACE_XCOM_KEY, OTLPHttpExporter, record_span, span, trace
+
+class FakeTaskInstance:
+    def __init__(self):
+        self.pushed = {}
+
+    def xcom_push(self, key, value):
+        self.pushed[key] = value
+
+class FakeExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, tracer):
+        self.exported.append(tracer)
+
+def spans_by_name(tracer):
+    return {record.name: record for record in tracer.spans}
+
+def test_spans_nest_and_inherit_the_file():
+    with trace("stage_files", {"run_id": "manual__1"}, exporter=FakeExporter()) as tracer:
+        with span("process_file", file="aws_data_desafio.csv"):
+            with span("download", bytes=100) as download:
+                download.add(bytes=50)
+            with span("upload", file="other.csv"):
+                pass
+        record_span("query_wait", 0, 1.5, job="stage_aws_billing")
+
+    spans = spans_by_name(tracer)
+    root = spans["stage_files"]
+    assert root.parent_id is None
+    assert spans["process_file"].parent_id == root.span_id
+    assert spans["download"].parent_id == spans["process_file"].span_id
+    assert spans["query_wait"].parent_id == root.span_id
+    assert {record.trace_id for record in tracer.spans} == {tracer.trace_id}
+    assert spans["download"].attributes == {"file": "aws_data_desafio.csv", "bytes": 150}
+    assert spans["upload"].attributes["file"] == "other.csv"
+    assert spans["query_wait"].seconds == 1.5
+
+def test_summary_is_pushed_to_xcom_also_on_failure():
+    ti = FakeTaskInstance()
+    exporter = FakeExporter()
+
+    with pytest.raises(ValueError):
+        with trace("stage_files", {"run_id": "manual__1", "ti": ti}, exporter=exporter):
+            for rows in (10, 20):
+                with span("parse", file="aws_data_desafio.csv", rows=rows):
+                    pass
+            with span("upload", file="lista_precios.json", bytes=5):
+                raise ValueError("upload failed")
+
+    summary = ti.pushed[TRACE_XCOM_KEY]
+    assert summary["run_id"] == "manual__1"
+    assert summary["seconds"] is not None
+    assert {key: summary["stages"]["parse"][key] for key in ("count", "errors", "rows")} == {"count": 2, "errors": 0, "rows": 30}
+    assert summary["stages"]["upload"]["errors"] == 1
+    assert summary["stages"]["stage_files"]["errors"] == 1
+    assert set(summary["files"]) == {"aws_data_desafio.csv", "lista_precios.json"}
+    assert summary["files"]["aws_data_desafio.csv"]["parse"]["rows"] == 30
+    assert len(exporter.exported) == 1
+
+def test_spans_outside_a_trace_are_not_recorded():
+    with span("download", bytes=1) as download:
+        pass
+    record_span("query_wait", 0, 1.0)
+
+    assert download.seconds is not None
+
+def test_otlp_payload_links_parents():
+    with trace("stage_files", {"run_id": "manual__1"}, exporter=FakeExporter()) as tracer:
+        with span("parse", rows=3):
+            pass
+
+    payload = OTLPHttpExporter("http://collector:4318").payload(tracer)
+    spans = {record["name"]: record for record in payload["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert spans["parse"]["parentSpanId"] == spans["stage_files"]["spanId"]
+    assert "parentSpanId" not in spans["stage_files"]
+    assert {"key": "rows", "value": {"intValue": "3"}} in spans["parse"]["attributes"]
+    assert {"key": "run_id", "value": {"stringValue": "manual__1"}} in spans["parse"]["attributes"]